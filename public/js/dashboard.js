@@ -7,7 +7,10 @@ class CyberkittyDashboard {
     constructor() {
         this.components = {};
         this.refreshInterval = 30000; // 30 секунд
-        this.intervalId = null;
+        this.stopAutoRefresh = null;
+        // ETag и данные последних GET ответов: на 304 отдаётся тот же объект
+        this.apiCache = new Map();
+        this.apiCacheLimit = 32;
         
         this.init();
     }
@@ -116,37 +119,41 @@ class CyberkittyDashboard {
             }
         };
         
-        // Обновляем каждую секунду
+        // Обновляем каждую секунду, пока дашборд виден
         updateTime();
-        setInterval(updateTime, 1000);
+        window.dashboardData.every(1000, updateTime);
     }
     
     async initializeSystemInfo() {
+        const renderSystemInfo = (info) => {
+            const systemElement = document.getElementById('system-info');
+            if (systemElement) {
+                systemElement.textContent = `💻 CPU: ${info.cpu}% | RAM: ${info.memory}%`;
+            }
+        };
+        
         const updateSystemInfo = async () => {
             const systemElement = document.getElementById('system-info');
             if (systemElement) {
                 try {
                     // Получаем базовую системную информацию
-                    const info = await this.getSystemInfo();
-                    systemElement.textContent = `💻 CPU: ${info.cpu}% | RAM: ${info.memory}%`;
+                    renderSystemInfo(await this.getSystemInfo());
                 } catch (error) {
                     systemElement.textContent = '💻 Система: OK';
                 }
             }
         };
         
+        window.dashboardData.subscribe('system', renderSystemInfo);
+        
         updateSystemInfo();
-        // Обновляем каждые 5 секунд
-        setInterval(updateSystemInfo, 5000);
+        window.dashboardData.poll(5000, updateSystemInfo); // Обновляем каждые 5 секунд
     }
     
     async getSystemInfo() {
         // Базовая системная информация (в реальном приложении через API)
         try {
-            const response = await fetch('/api/system-info');
-            if (response.ok) {
-                return await response.json();
-            }
+            return await window.dashboardData.get('system');
         } catch (error) {
             console.log('API недоступен, используем заглушку');
         }
@@ -159,9 +166,9 @@ class CyberkittyDashboard {
     }
     
     startAutoRefresh() {
-        this.intervalId = setInterval(() => {
+        this.stopAutoRefresh = window.dashboardData.every(this.refreshInterval, () => {
             this.refreshData();
-        }, this.refreshInterval);
+        });
     }
     
     async refreshData() {
@@ -203,15 +210,13 @@ class CyberkittyDashboard {
             }
         });
         
-        // Обработка visibility change для паузы/возобновления
+        // Таймеры шины данных и SSE поток сами встают на паузу, пока дашборд скрыт,
+        // а при возврате просроченные обновления срабатывают сразу
         document.addEventListener('visibilitychange', () => {
             if (document.hidden) {
                 console.log('🌙 Dashboard скрыт');
-                // Можно приостановить некоторые обновления
             } else {
                 console.log('🌅 Dashboard снова видим');
-                // Возобновляем обновления
-                this.refreshData();
             }
         });
         
@@ -339,6 +344,8 @@ class CyberkittyDashboard {
     }
     
     // Методы для API интеграции
+    // GET запросы идут с If-None-Match: на 304 возвращается тот же объект, что и в
+    // прошлый раз, так что виджеты могут пропустить перерисовку сравнением data === old
     async callAPI(endpoint, options = {}) {
         const defaultOptions = {
             method: 'GET',
@@ -348,15 +355,35 @@ class CyberkittyDashboard {
         };
         
         const finalOptions = { ...defaultOptions, ...options };
+        const cacheable = finalOptions.method.toUpperCase() === 'GET';
+        const cached = cacheable ? this.apiCache.get(endpoint) : null;
+        if (cached) {
+            // Валидатор ставим сами: HTTP кеш браузера вернул бы 200 из своей копии
+            finalOptions.headers = { ...finalOptions.headers, 'If-None-Match': cached.etag };
+            finalOptions.cache = 'no-store';
+        }
         
         try {
             const response = await fetch(endpoint, finalOptions);
             
+            if (response.status === 304 && cached) {
+                return cached.data;
+            }
             if (!response.ok) {
                 throw new Error(`HTTP ${response.status}: ${response.statusText}`);
             }
             
-            return await response.json();
+            const data = await response.json();
+            const etag = response.headers.get('ETag');
+            if (cacheable && etag) {
+                // Map хранит порядок вставки - вытесняем самый старый адрес
+                this.apiCache.delete(endpoint);
+                this.apiCache.set(endpoint, { etag, data });
+                if (this.apiCache.size > this.apiCacheLimit) {
+                    this.apiCache.delete(this.apiCache.keys().next().value);
+                }
+            }
+            return data;
         } catch (error) {
             console.error(`API Error (${endpoint}):`, error);
             throw error;
@@ -388,8 +415,16 @@ class CyberkittyDashboard {
     
     // Методы для cleanup
     destroy() {
-        if (this.intervalId) {
-            clearInterval(this.intervalId);
+        if (this.stopAutoRefresh) {
+            this.stopAutoRefresh();
+        }
+        
+        if (window.dashboardData) {
+            window.dashboardData.destroy();
+        }
+        
+        if (window.dashboardStream) {
+            window.dashboardStream.destroy();
         }
         
         // Очищаем компоненты
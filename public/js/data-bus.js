@@ -0,0 +1,217 @@
+/**
+ * 🚌 DASHBOARD DATA
+ * Общий слой данных поверх Dashboard.callAPI: один запрос на ресурс для всех виджетов,
+ * общий закешированный результат и опрос, который останавливается на скрытой странице
+ */
+
+class DashboardData {
+    constructor() {
+        this.resources = {};
+        this.timers = new Set();
+        this.defaultMaxAge = 2000; // Результат моложе 2 секунд отдаётся без запроса
+
+        // Скрытая вкладка или воркспейс i3 - таймеры стоят, при возврате просроченные срабатывают сразу
+        document.addEventListener('visibilitychange', () => {
+            this.timers.forEach(timer => this.schedule(timer));
+        });
+
+        console.log('🚌 Data bus инициализирован');
+    }
+
+    // Ресурс: endpoint для запроса, topic SSE потока с теми же данными, maxAge - сколько
+    // миллисекунд результат считается свежим, load(resource) - своя загрузка вместо callAPI.
+    // sections - разделы ответа, которые раздаются одноимённым ресурсам; via - ресурс,
+    // запрос которого приносит этот раздел, merge(resource, value) - сборка раздела
+    define(key, options = {}) {
+        const resource = this.resource(key);
+        Object.assign(resource, options);
+        return resource;
+    }
+
+    resource(key) {
+        if (!this.resources[key]) {
+            this.resources[key] = {
+                endpoint: key,
+                topic: null,
+                maxAge: this.defaultMaxAge,
+                load: null,
+                sections: [],
+                via: null,
+                merge: null,
+                data: undefined,
+                updated: 0,
+                pending: null,
+                subscribers: [],
+                streaming: false
+            };
+        }
+        return this.resources[key];
+    }
+
+    // Данные ресурса: запрос в полёте и недавний результат разделяются между всеми вызовами.
+    // Недавний результат и ответ 304 - тот же объект, виджет сравнивает его через ===
+    get(key, maxAge) {
+        const resource = this.resource(key);
+        if (resource.pending) {
+            return resource.pending;
+        }
+
+        const freshFor = maxAge !== undefined ? maxAge : resource.maxAge;
+        if (resource.data !== undefined && Date.now() - resource.updated < freshFor) {
+            return Promise.resolve(resource.data);
+        }
+
+        let loading;
+        if (resource.via) {
+            // Раздел приходит вместе со снимком и уже опубликован им
+            loading = this.get(resource.via, freshFor).then(() => resource.data);
+        } else if (resource.load) {
+            loading = resource.load(resource);
+        } else {
+            loading = window.dashboard.callAPI(resource.endpoint);
+        }
+        resource.pending = loading
+            .then(data => {
+                this.publish(key, data);
+                return resource.data;
+            })
+            .finally(() => {
+                resource.pending = null;
+            });
+        return resource.pending;
+    }
+
+    // Новые данные ресурса из запроса или SSE потока
+    publish(key, data) {
+        const resource = this.resource(key);
+        resource.updated = Date.now();
+        // 304 от сервера - тот же объект, подписчикам сообщать нечего
+        if (data === resource.data) return;
+
+        resource.data = data;
+        resource.sections.forEach(section => {
+            if (data && data[section] !== undefined) {
+                const target = this.resource(section);
+                this.publish(section, target.merge ? target.merge(target, data[section]) : data[section]);
+            }
+        });
+        resource.subscribers.forEach(callback => {
+            try {
+                callback(data);
+            } catch (error) {
+                console.error(`❌ Ошибка подписчика ресурса ${key}:`, error);
+            }
+        });
+    }
+
+    // callback получает данные ресурса из любого источника: запросов всех виджетов и SSE потока.
+    // Виджеты подписываются до первого get() - тогда SSE поток открывается один на всех
+    subscribe(key, callback) {
+        const resource = this.resource(key);
+        resource.subscribers.push(callback);
+
+        // Тема SSE подписывается один раз на ресурс, а не в каждом виджете
+        const stream = window.dashboardStream;
+        if (resource.topic && !resource.streaming && stream && stream.isSupported()) {
+            resource.streaming = true;
+            stream.subscribe(resource.topic, data => this.publish(key, data));
+        }
+
+        return () => {
+            resource.subscribers = resource.subscribers.filter(handler => handler !== callback);
+        };
+    }
+
+    isStreaming() {
+        return Boolean(window.dashboardStream && window.dashboardStream.isConnected());
+    }
+
+    // setInterval с учётом видимости страницы
+    every(interval, callback) {
+        const timer = { interval, callback, last: Date.now(), id: null };
+        this.timers.add(timer);
+        this.schedule(timer);
+
+        return () => {
+            clearTimeout(timer.id);
+            this.timers.delete(timer);
+        };
+    }
+
+    // Опрос ресурсов виджета: пока SSE поток подключен, данные приходят из него,
+    // и тики пропускаются - запросы только как запасной вариант
+    poll(interval, callback) {
+        return this.every(interval, () => {
+            if (!this.isStreaming()) {
+                callback();
+            }
+        });
+    }
+
+    schedule(timer) {
+        clearTimeout(timer.id);
+        timer.id = null;
+        if (document.hidden || !this.timers.has(timer)) return;
+
+        const delay = Math.max(0, timer.last + timer.interval - Date.now());
+        timer.id = setTimeout(() => {
+            timer.last = Date.now();
+            try {
+                timer.callback();
+            } catch (error) {
+                console.error('❌ Ошибка таймера опроса:', error);
+            }
+            this.schedule(timer);
+        }, delay);
+    }
+
+    destroy() {
+        this.timers.forEach(timer => clearTimeout(timer.id));
+        this.timers.clear();
+    }
+}
+
+// Снимок просит у сервера только изменения процессов с последней известной выборки
+function loadSnapshot(resource) {
+    const processes = window.dashboardData.resource('processes');
+    return window.dashboard.callAPI(`${resource.endpoint}&since=${processes.seq || 0}`);
+}
+
+// Список процессов собирается из диффов since= поверх списка выборки seq. Дифф
+// накладывается только на него: SSE поток публикует полные списки других выборок
+function mergeProcessDiff(resource, update) {
+    // Новой выборки на сервере ещё не было - остаётся прежний список
+    if (!update.full && update.seq === resource.seq) {
+        return resource.data;
+    }
+
+    let processes;
+    if (update.full) {
+        processes = update.processes;
+    } else {
+        const rows = new Map(resource.base.map(process => [process.pid, process]));
+        update.removed.forEach(pid => rows.delete(pid));
+        update.added.concat(update.changed).forEach(process => rows.set(process.pid, process));
+        processes = update.order.map(pid => rows.get(pid));
+    }
+
+    resource.seq = update.seq;
+    resource.base = processes;
+    return processes;
+}
+
+window.dashboardData = new DashboardData();
+window.dashboardData.define('system', { endpoint: '/api/system-info', topic: 'system' });
+// Системная панель, процессы и монитор обновляются одним запросом снимка
+window.dashboardData.define('snapshot', { endpoint: '/api/snapshot?sections=details,temperatures,disk,processes',
+                                          maxAge: 5000, load: loadSnapshot,
+                                          sections: ['details', 'temperatures', 'disk', 'processes'] });
+window.dashboardData.define('processes', { topic: 'processes', via: 'snapshot', maxAge: 5000,
+                                           merge: mergeProcessDiff });
+['details', 'temperatures', 'disk'].forEach(section => {
+    window.dashboardData.define(section, { topic: section, via: 'snapshot', maxAge: 5000 });
+});
+window.dashboardData.define('docker', { endpoint: '/api/docker-containers?stats=1', topic: 'docker', maxAge: 5000 });
+window.dashboardData.define('ssh', { endpoint: '/api/ssh-connections', topic: 'ssh', maxAge: 5000 });
+
+console.log('🚌 Data bus загружен');
@@ -22,6 +22,8 @@ class DockerWidget {
             this.renderDockerContainers();
         }
         
+        this.subscribeToStream();
+        
         // Загружаем свежие данные
         await this.loadDockerData();
         this.startAutoRefresh();
@@ -57,16 +59,7 @@ class DockerWidget {
     
     async loadDockerData() {
         try {
-            const response = await fetch('/api/docker-containers');
-            const data = await response.json();
-            
-            // Обновляем только если данные изменились
-            if (JSON.stringify(this.dockerData) !== JSON.stringify(data)) {
-                this.dockerData = data;
-                this.lastUpdate = Date.now();
-                this.saveToCache();
-                this.renderDockerContainers();
-            }
+            this.applyDockerData(await window.dashboardData.get('docker'));
             
         } catch (error) {
             console.error('❌ Ошибка загрузки Docker данных:', error);
@@ -74,6 +67,21 @@ class DockerWidget {
         }
     }
     
+    applyDockerData(data) {
+        if (data === this.dockerData) return;
+        // Обновляем только если данные изменились
+        if (JSON.stringify(this.dockerData) !== JSON.stringify(data)) {
+            this.dockerData = data;
+            this.lastUpdate = Date.now();
+            this.saveToCache();
+            this.renderDockerContainers();
+        }
+    }
+    
+    subscribeToStream() {
+        window.dashboardData.subscribe('docker', data => this.applyDockerData(data));
+    }
+    
     renderDockerContainers() {
         const container = document.getElementById('docker-containers');
         if (!this.dockerData) {
@@ -81,76 +89,155 @@ class DockerWidget {
             return;
         }
         
-        let dockerHtml = `
-            <div class="docker-sections">
-                <div class="docker-section local-docker">
-                    <h3>🖥️ Локальные контейнеры</h3>
-                    ${this.renderDockerTable(this.dockerData.local, 'local')}
+        // Каркас разделов строится один раз, дальше серверы и строки обновляются по ключу.
+        // Разметку без подвала оставил MonitorWidget до загрузки этого виджета - её пересоздаём
+        let sections = container.querySelector('.docker-sections');
+        if (!sections || !container.querySelector('.widget-footer .last-update')) {
+            container.innerHTML = `
+                <div class="docker-sections">
+                    <div class="docker-section local-docker">
+                        <h3>🖥️ Локальные контейнеры</h3>
+                    </div>
+                    <div class="docker-section remote-docker">
+                        <h3>🌐 Удаленные серверы</h3>
+                    </div>
                 </div>
-                <div class="docker-section remote-docker">
-                    <h3>🌐 Удаленные серверы</h3>
-                    ${this.renderRemoteDockerServers(this.dockerData.servers)}
+                <div class="widget-footer">
+                    <span class="last-update"></span>
                 </div>
-            </div>
-        `;
+            `;
+            sections = container.querySelector('.docker-sections');
+        }
         
-        // Добавляем информацию о последнем обновлении
-        dockerHtml += `
-            <div class="widget-footer">
-                <span class="last-update">Обновлено: ${new Date(this.lastUpdate).toLocaleTimeString()}</span>
-            </div>
-        `;
+        this.renderDockerTable(sections.querySelector('.local-docker'), this.dockerData.local, 'local');
+        this.renderRemoteDockerServers(sections.querySelector('.remote-docker'), this.dockerData.servers,
+                                       this.dockerData.query_status, this.dockerData.hosts);
         
-        container.innerHTML = dockerHtml;
+        // Добавляем информацию о последнем обновлении
+        window.keyedRenderer.patch(container.querySelector('.widget-footer .last-update'), {
+            className: 'last-update',
+            text: `Обновлено: ${new Date(this.lastUpdate).toLocaleTimeString()}`
+        });
     }
     
-    renderDockerTable(containers, location) {
+    // Таблица контейнеров в конце section; строки по ID контейнера
+    renderDockerTable(section, containers, location) {
+        const current = section.querySelector(':scope > .docker-table, :scope > .empty-state');
         if (!containers || containers.length === 0) {
-            return `<div class="empty-state">Контейнеры не найдены</div>`;
+            if (!current || !current.classList.contains('empty-state')) {
+                const empty = document.createElement('div');
+                empty.className = 'empty-state';
+                empty.textContent = 'Контейнеры не найдены';
+                this.replaceOrAppend(section, current, empty);
+            }
+            return;
         }
         
-        let tableHtml = `
-            <div class="docker-table">
-                <div class="docker-header">
-                    <span class="docker-col name">Имя</span>
-                    <span class="docker-col image">Образ</span>
-                    <span class="docker-col status">Статус</span>
-                    <span class="docker-col ports">Порты</span>
-                </div>
-        `;
+        // Ресурсы приходят из потока docker stats хоста, пока он не запустился - колонки нет
+        const hostStats = this.dockerData.stats && this.dockerData.stats[location];
+        const stats = hostStats ? hostStats.containers : null;
         
-        containers.forEach((container, index) => {
-            const statusClass = this.getDockerStatusClass(container.state);
-            
-            tableHtml += `
-                <div class="docker-row ${index % 2 === 0 ? 'even' : 'odd'}">
-                    <span class="docker-col name" title="${container.name}">${this.truncateText(container.name, 20)}</span>
-                    <span class="docker-col image" title="${container.image}">${this.truncateText(container.image, 25)}</span>
-                    <span class="docker-col status ${statusClass}">${this.formatDockerStatus(container.state)}</span>
-                    <span class="docker-col ports" title="${container.ports}">${this.truncateText(container.ports || 'Нет', 15)}</span>
-                </div>
-            `;
+        let table = current && current.classList.contains('docker-table') ? current : null;
+        if (!table) {
+            const header = document.createElement('div');
+            header.className = 'docker-header';
+            table = document.createElement('div');
+            table.appendChild(header);
+            this.replaceOrAppend(section, current, table);
+        }
+        window.keyedRenderer.patch(table, { className: stats ? 'docker-table with-stats' : 'docker-table' });
+        window.keyedRenderer.html(table.firstElementChild, `
+            <span class="docker-col name">Имя</span>
+            <span class="docker-col image">Образ</span>
+            <span class="docker-col status">Статус</span>
+            <span class="docker-col ports">Порты</span>
+            ${stats ? '<span class="docker-col resources">CPU / ОЗУ</span>' : ''}
+        `);
+        
+        window.keyedRenderer.list(table, containers, {
+            key: container => container.id || container.name,
+            create: () => document.createElement('div'),
+            update: (row, container, index) => {
+                const cells = [
+                    { className: 'docker-col name', text: this.truncateText(container.name, 20), title: container.name },
+                    { className: 'docker-col image', text: this.truncateText(container.image, 25), title: container.image },
+                    { className: `docker-col status ${this.getDockerStatusClass(container.state)}`,
+                      text: this.formatDockerStatus(container.state) },
+                    { className: 'docker-col ports', text: this.truncateText(container.ports || 'Нет', 15),
+                      title: container.ports || '' }
+                ];
+                if (stats) {
+                    cells.push(this.containerStatsCell(stats[container.name]));
+                }
+                window.keyedRenderer.patch(row, { className: `docker-row ${index % 2 === 0 ? 'even' : 'odd'}` });
+                window.keyedRenderer.cells(row, cells);
+            }
+        });
+    }
+    
+    replaceOrAppend(section, current, element) {
+        if (current) {
+            current.replaceWith(element);
+        } else {
+            section.appendChild(element);
+        }
+    }
+    
+    renderRemoteDockerServers(section, servers, queryStatus = {}, hosts = {}) {
+        window.keyedRenderer.list(section, Object.entries(servers), {
+            key: ([serverName]) => serverName,
+            create: () => {
+                const serverSection = document.createElement('div');
+                serverSection.className = 'server-section';
+                serverSection.appendChild(document.createElement('h4'));
+                return serverSection;
+            },
+            update: (serverSection, [serverName, containers]) => {
+                // Имена хостов приходят из hosts.json на сервере
+                const displayName = hosts[serverName] ? hosts[serverName].name : serverName;
+                window.keyedRenderer.html(serverSection.firstElementChild,
+                                          `${displayName}${this.formatQueryStatus(queryStatus[serverName])}`);
+                this.renderDockerTable(serverSection, containers, serverName);
+            }
         });
+    }
+    
+    containerStatsCell(stats) {
+        if (!stats) {
+            return { className: 'docker-col resources', text: '—' };
+        }
         
-        tableHtml += '</div>';
-        return tableHtml;
+        const cpu = stats.cpu !== null ? `${stats.cpu.toFixed(1)}%` : 'N/A';
+        const memory = stats.memory_usage !== null ? this.formatBytes(stats.memory_usage) : 'N/A';
+        const title = `Сеть: ↓${this.formatBytes(stats.net_rx)} ↑${this.formatBytes(stats.net_tx)}, `
+            + `диск: ${this.formatBytes(stats.block_read)} / ${this.formatBytes(stats.block_write)}`;
+        return { className: 'docker-col resources', text: `${cpu} / ${memory}`, title };
+    }
+    
+    formatBytes(bytes) {
+        if (bytes === null || bytes === undefined) return 'N/A';
+        const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+        let value = bytes;
+        let unit = 0;
+        while (value >= 1024 && unit < units.length - 1) {
+            value /= 1024;
+            unit++;
+        }
+        return `${value.toFixed(unit === 0 ? 0 : 1)} ${units[unit]}`;
     }
     
-    renderRemoteDockerServers(servers) {
-        let serversHtml = '';
+    formatQueryStatus(status) {
+        // Сервер не ответил на последний опрос - показываем последние известные данные
+        if (!status || status.status === 'ok') return '';
         
-        Object.entries(servers).forEach(([serverName, containers]) => {
-            const displayName = serverName === 'got_is_tod' ? '🚀 Got Is Tod' : '💎 Azure Aluminium';
-            
-            serversHtml += `
-                <div class="server-section">
-                    <h4>${displayName}</h4>
-                    ${this.renderDockerTable(containers, serverName)}
-                </div>
-            `;
-        });
+        if (status.status === 'circuit_open') {
+            return ` <small class="stale-data" title="Сервер недоступен, проверка через ${status.next_poll} с">🔌 недоступен</small>`;
+        }
         
-        return serversHtml;
+        const updated = status.updated
+            ? `данные от ${new Date(status.updated * 1000).toLocaleTimeString()}`
+            : 'данных ещё нет';
+        return ` <small class="stale-data" title="${updated}">⏳ ${updated}</small>`;
     }
     
     renderError() {
@@ -191,9 +278,7 @@ class DockerWidget {
     }
     
     startAutoRefresh() {
-        setInterval(() => {
-            this.loadDockerData();
-        }, 15000); // Обновляем каждые 15 секунд (Docker медленнее)
+        window.dashboardData.poll(15000, () => this.loadDockerData()); // Обновляем каждые 15 секунд (Docker медленнее)
     }
 }
 
@@ -0,0 +1,127 @@
+/**
+ * 🧩 KEYED RENDERER
+ * Инкрементальная отрисовка списков по ключу (PID, ID контейнера): строки переиспользуются,
+ * меняются только ячейки с новыми значениями, а изменения DOM идут кадрами requestAnimationFrame
+ */
+
+class KeyedRenderer {
+    constructor(frameBudget = 8) {
+        this.frameBudget = frameBudget; // мс на кадр, остальное доделывается в следующем
+        this.jobs = new Map();
+        this.frame = null;
+        this.renderedHTML = new WeakMap();
+
+        console.log('🧩 Keyed renderer инициализирован');
+    }
+
+    // Строки списка - дочерние элементы container с data-key после заголовка (элементов без ключа).
+    // create(item) создаёт строку, update(row, item, index) приводит её к новым данным
+    list(container, items, { key, create, update }) {
+        // Новое обновление списка заменяет ещё не доделанное
+        this.jobs.delete(container);
+        this.jobs.set(container, this.patchList(container, items, key, create, update));
+
+        if (this.frame === null) {
+            this.frame = requestAnimationFrame(() => this.flush());
+        }
+    }
+
+    * patchList(container, items, key, create, update) {
+        // Состояние берётся из DOM: строки мог оставить и другой виджет с тем же контейнером
+        const rows = new Map();
+        let previous = null;
+        for (const child of container.children) {
+            if (child.dataset.key !== undefined) {
+                rows.set(child.dataset.key, child);
+            } else if (rows.size === 0) {
+                previous = child;
+            }
+        }
+
+        for (let index = 0; index < items.length; index++) {
+            const item = items[index];
+            const itemKey = String(key(item));
+            let row = rows.get(itemKey);
+            if (row) {
+                rows.delete(itemKey);
+            } else {
+                row = create(item);
+                row.dataset.key = itemKey;
+            }
+            update(row, item, index);
+
+            // Узел двигается, только если стоит не на своём месте
+            const expected = previous ? previous.nextElementSibling : container.firstElementChild;
+            if (row !== expected) {
+                container.insertBefore(row, expected);
+            }
+            previous = row;
+            yield;
+        }
+
+        rows.forEach(row => row.remove());
+    }
+
+    flush() {
+        this.frame = null;
+        const deadline = performance.now() + this.frameBudget;
+
+        for (const [container, job] of this.jobs) {
+            let step = job.next();
+            while (!step.done && performance.now() < deadline) {
+                step = job.next();
+            }
+            if (step.done && this.jobs.get(container) === job) {
+                this.jobs.delete(container);
+            }
+            if (performance.now() >= deadline) break;
+        }
+
+        if (this.jobs.size > 0) {
+            this.frame = requestAnimationFrame(() => this.flush());
+        }
+    }
+
+    // Меняет только отличающиеся className, текст и title
+    patch(element, { className, text, title }) {
+        if (className !== undefined && element.className !== className) {
+            element.className = className;
+        }
+        if (text !== undefined && element.textContent !== String(text)) {
+            element.textContent = text;
+        }
+        if (title !== undefined) {
+            if (element.title !== String(title)) {
+                element.title = title;
+            }
+        } else if (element.hasAttribute('title')) {
+            element.removeAttribute('title');
+        }
+    }
+
+    // Ячейки строки: [{ className, text, title }], по одному span на ячейку
+    cells(row, cells) {
+        while (row.children.length > cells.length) {
+            row.lastElementChild.remove();
+        }
+        cells.forEach((cell, index) => {
+            let element = row.children[index];
+            if (!element) {
+                element = row.appendChild(document.createElement('span'));
+            }
+            this.patch(element, cell);
+        });
+    }
+
+    // Разметка пересоздаётся, только если строка шаблона изменилась
+    html(element, html) {
+        if (this.renderedHTML.get(element) !== html) {
+            element.innerHTML = html;
+            this.renderedHTML.set(element, html);
+        }
+    }
+}
+
+window.keyedRenderer = new KeyedRenderer();
+
+console.log('🧩 Keyed renderer загружен');
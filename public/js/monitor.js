@@ -15,6 +15,7 @@ class MonitorWidget {
     
     async init() {
         this.initializeTabs();
+        this.subscribeToStream();
         await this.loadProcesses();
         this.startAutoRefresh();
     }
@@ -61,80 +62,56 @@ class MonitorWidget {
     
     async loadProcesses() {
         try {
-            const response = await fetch('/api/processes');
-            this.processes = await response.json();
-            
-            if (this.currentTab === 'processes') {
-                this.renderProcesses();
-            }
+            // Общий с виджетом процессов запрос через шину данных
+            this.applyProcesses(await window.dashboardData.get('processes'));
             
         } catch (error) {
             console.error('❌ Ошибка загрузки процессов:', error);
         }
     }
     
-    renderProcesses() {
-        const container = document.getElementById('process-list');
-        if (!this.processes) {
-            container.innerHTML = '<div class="loading">Загрузка процессов...</div>';
-            return;
-        }
+    applyProcesses(processes) {
+        // Тот же объект из общего кеша - таблица уже нарисована
+        if (processes === this.processes) return;
+        this.processes = processes;
         
-        let processHtml = `
-            <div class="process-header">
-                <div class="process-table-header">
-                    <span class="process-col pid">PID</span>
-                    <span class="process-col name">Процесс</span>
-                    <span class="process-col cpu">CPU %</span>
-                    <span class="process-col memory">RAM %</span>
-                    <span class="process-col status">Статус</span>
-                </div>
-            </div>
-            <div class="process-table">
-        `;
-        
-        this.processes.forEach((process, index) => {
-            const cpuClass = this.getCpuClass(process.cpu);
-            const memoryClass = this.getMemoryClass(process.memory);
-            const statusClass = this.getStatusClass(process.status);
-            
-            processHtml += `
-                <div class="process-row ${index % 2 === 0 ? 'even' : 'odd'}">
-                    <span class="process-col pid">${process.pid}</span>
-                    <span class="process-col name" title="${process.name}">${this.truncateText(process.name, 15)}</span>
-                    <span class="process-col cpu ${cpuClass}">${process.cpu}%</span>
-                    <span class="process-col memory ${memoryClass}">${process.memory}%</span>
-                    <span class="process-col status ${statusClass}">${this.formatStatus(process.status)}</span>
-                </div>
-            `;
+        if (this.currentTab === 'processes') {
+            this.renderProcesses();
+        }
+    }
+    
+    subscribeToStream() {
+        window.dashboardData.subscribe('processes', data => this.applyProcesses(data));
+        window.dashboardData.subscribe('docker', data => {
+            this.dockerContainers = data;
+            if (this.currentTab === 'docker') {
+                this.renderDockerContent();
+            }
         });
-        
-        processHtml += '</div>';
-        container.innerHTML = processHtml;
+    }
+    
+    renderProcesses() {
+        ProcessesWidget.renderTable(document.getElementById('process-list'), this.processes);
     }
     
     async renderDockerContainers() {
+        // Данные из SSE потока уже есть - просто рисуем их
+        if (this.dockerContainers && window.dashboardData.isStreaming()) {
+            this.renderDockerContent();
+            return;
+        }
+        
         const container = document.getElementById('docker-containers');
-        container.innerHTML = '<div class="loading">Загрузка Docker контейнеров...</div>';
+        if (!this.dockerContainers) {
+            container.innerHTML = '<div class="loading">Загрузка Docker контейнеров...</div>';
+        }
         
         try {
-            const response = await fetch('/api/docker-containers');
-            this.dockerContainers = await response.json();
-            
-            let dockerHtml = `
-                <div class="docker-sections">
-                    <div class="docker-section local-docker">
-                        <h3>🖥️ Локальные контейнеры</h3>
-                        ${this.renderDockerTable(this.dockerContainers.local, 'local')}
-                    </div>
-                    <div class="docker-section remote-docker">
-                        <h3>🌐 Удаленные серверы</h3>
-                        ${this.renderRemoteDockerServers(this.dockerContainers.servers)}
-                    </div>
-                </div>
-            `;
-            
-            container.innerHTML = dockerHtml;
+            const data = await window.dashboardData.get('docker');
+            // Контейнеры не изменились - оставляем уже нарисованную разметку
+            if (data === this.dockerContainers && container.querySelector('.docker-sections')) return;
+            this.dockerContainers = data;
+            this.renderDockerContent();
             
         } catch (error) {
             console.error('❌ Ошибка загрузки Docker контейнеров:', error);
@@ -148,6 +125,19 @@ class MonitorWidget {
         }
     }
     
+    renderDockerContent() {
+        // Вкладка общая с виджетом Docker - строки обновляет его код, иначе две разные
+        // разметки перестраивали бы таблицу друг за другом. Пока виджет не создан,
+        // рисует свой экземпляр DockerWidget без init
+        const dockerWidget = (window.dashboard && window.dashboard.components.docker)
+            || this.dockerRenderer || (this.dockerRenderer = new DockerWidget());
+        if (dockerWidget.dockerData !== this.dockerContainers) {
+            dockerWidget.dockerData = this.dockerContainers;
+            dockerWidget.lastUpdate = Date.now();
+        }
+        dockerWidget.renderDockerContainers();
+    }
+    
     // async renderSSHConnections() {
     //     const container = document.getElementById('ssh-connections');
     //     container.innerHTML = '<div class="loading">Загрузка SSH подключений...</div>';
@@ -183,98 +173,11 @@ class MonitorWidget {
     //     }
     // }
     
-    getCpuClass(cpu) {
-        if (cpu >= 50) return 'high-usage';
-        if (cpu >= 20) return 'medium-usage';
-        return 'low-usage';
-    }
-    
-    getMemoryClass(memory) {
-        if (memory >= 30) return 'high-usage';
-        if (memory >= 10) return 'medium-usage';
-        return 'low-usage';
-    }
-    
-    getStatusClass(status) {
-        switch(status) {
-            case 'running': return 'status-running';
-            case 'sleeping': return 'status-sleeping';
-            case 'idle': return 'status-idle';
-            case 'zombie': return 'status-zombie';
-            default: return 'status-unknown';
-        }
-    }
-    
-    formatStatus(status) {
-        const statusMap = {
-            'running': '🟢 Работает',
-            'sleeping': '😴 Спит',
-            'idle': '⏸️ Простой',
-            'zombie': '🧟 Зомби',
-            'stopped': '⏹️ Остановлен'
-        };
-        return statusMap[status] || '❓ ' + status;
-    }
-    
-    truncateText(text, maxLength) {
-        if (text.length <= maxLength) return text;
-        return text.substring(0, maxLength - 3) + '...';
-    }
-    
-    renderDockerTable(containers, location) {
-        if (!containers || containers.length === 0) {
-            return `<div class="empty-state">Контейнеры не найдены</div>`;
-        }
-        
-        let tableHtml = `
-            <div class="docker-table">
-                <div class="docker-header">
-                    <span class="docker-col name">Имя</span>
-                    <span class="docker-col image">Образ</span>
-                    <span class="docker-col status">Статус</span>
-                    <span class="docker-col ports">Порты</span>
-                </div>
-        `;
-        
-        containers.forEach((container, index) => {
-            const statusClass = this.getDockerStatusClass(container.state);
-            
-            tableHtml += `
-                <div class="docker-row ${index % 2 === 0 ? 'even' : 'odd'}">
-                    <span class="docker-col name" title="${container.name}">${this.truncateText(container.name, 20)}</span>
-                    <span class="docker-col image" title="${container.image}">${this.truncateText(container.image, 25)}</span>
-                    <span class="docker-col status ${statusClass}">${this.formatDockerStatus(container.state)}</span>
-                    <span class="docker-col ports" title="${container.ports}">${this.truncateText(container.ports || 'Нет', 15)}</span>
-                </div>
-            `;
-        });
-        
-        tableHtml += '</div>';
-        return tableHtml;
-    }
-    
-    renderRemoteDockerServers(servers) {
-        let serversHtml = '';
-        
-        Object.entries(servers).forEach(([serverName, containers]) => {
-            const displayName = serverName === 'got_is_tod' ? '🚀 Got Is Tod' : '💎 Azure Aluminium';
-            
-            serversHtml += `
-                <div class="server-section">
-                    <h4>${displayName}</h4>
-                    ${this.renderDockerTable(containers, serverName)}
-                </div>
-            `;
-        });
-        
-        return serversHtml;
-    }
-    
-    renderServersStatus(serversStatus) {
+    renderServersStatus(serversStatus, hosts = {}) {
         let statusHtml = '<div class="servers-grid">';
         
         Object.entries(serversStatus).forEach(([serverName, status]) => {
-            const displayName = serverName === 'got_is_tod' ? '🚀 Got Is Tod' : '💎 Azure Aluminium';
+            const displayName = hosts[serverName] ? hosts[serverName].name : serverName;
             const statusClass = this.getServerStatusClass(status.status);
             
             statusHtml += `
@@ -337,27 +240,6 @@ class MonitorWidget {
         return tableHtml;
     }
     
-    getDockerStatusClass(state) {
-        switch(state) {
-            case 'running': return 'docker-running';
-            case 'exited': return 'docker-exited';
-            case 'paused': return 'docker-paused';
-            case 'created': return 'docker-created';
-            default: return 'docker-unknown';
-        }
-    }
-    
-    formatDockerStatus(state) {
-        const statusMap = {
-            'running': '🟢 Запущен',
-            'exited': '🔴 Остановлен',
-            'paused': '⏸️ Приостановлен',
-            'created': '🆕 Создан',
-            'restarting': '🔄 Перезапуск'
-        };
-        return statusMap[state] || '❓ ' + state;
-    }
-    
     getServerStatusClass(status) {
         switch(status) {
             case 'online': return 'server-online';
@@ -385,7 +267,7 @@ class MonitorWidget {
     }
 
     startAutoRefresh() {
-        setInterval(() => {
+        window.dashboardData.poll(10000, () => {
             switch(this.currentTab) {
                 case 'processes':
                     this.loadProcesses();
@@ -397,7 +279,7 @@ class MonitorWidget {
                     this.renderSSHConnections();
                     break;
             }
-        }, 10000); // Обновляем каждые 10 секунд
+        }); // Обновляем каждые 10 секунд
     }
 }
 
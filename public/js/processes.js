@@ -22,6 +22,8 @@ class ProcessesWidget {
             this.renderProcesses();
         }
         
+        this.subscribeToStream();
+        
         // Загружаем свежие данные
         await this.loadProcesses();
         this.startAutoRefresh();
@@ -57,16 +59,8 @@ class ProcessesWidget {
     
     async loadProcesses() {
         try {
-            const response = await fetch('/api/processes');
-            const data = await response.json();
-            
-            // Обновляем только если данные изменились
-            if (JSON.stringify(this.processes) !== JSON.stringify(data)) {
-                this.processes = data;
-                this.lastUpdate = Date.now();
-                this.saveToCache();
-                this.renderProcesses();
-            }
+            // Шина запрашивает только изменения с прошлой выборки сервера
+            this.applyProcesses(await window.dashboardData.get('processes'));
             
         } catch (error) {
             console.error('❌ Ошибка загрузки процессов:', error);
@@ -74,52 +68,78 @@ class ProcessesWidget {
         }
     }
     
+    applyProcesses(data) {
+        if (data === this.processes) return;
+        // Обновляем только если данные изменились
+        if (JSON.stringify(this.processes) !== JSON.stringify(data)) {
+            this.processes = data;
+            this.lastUpdate = Date.now();
+            this.saveToCache();
+            this.renderProcesses();
+        }
+    }
+    
+    subscribeToStream() {
+        window.dashboardData.subscribe('processes', data => this.applyProcesses(data));
+    }
+    
     renderProcesses() {
         const container = document.getElementById('process-list');
-        if (!this.processes) {
+        ProcessesWidget.renderTable(container, this.processes);
+        if (!this.processes) return;
+        
+        // Добавляем информацию о последнем обновлении
+        let lastUpdate = container.querySelector('.widget-footer .last-update');
+        if (!lastUpdate) {
+            container.insertAdjacentHTML('beforeend', '<div class="widget-footer"><span class="last-update"></span></div>');
+            lastUpdate = container.querySelector('.widget-footer .last-update');
+        }
+        window.keyedRenderer.patch(lastUpdate, {
+            className: 'last-update',
+            text: `Обновлено: ${new Date(this.lastUpdate).toLocaleTimeString()}`
+        });
+    }
+    
+    // Таблица процессов в container; ею же рисует вкладка процессов MonitorWidget
+    static renderTable(container, processes) {
+        if (!processes) {
             container.innerHTML = '<div class="loading">Загрузка процессов...</div>';
             return;
         }
         
-        let processHtml = `
-            <div class="process-header">
-                <div class="process-table-header">
-                    <span class="process-col pid">PID</span>
-                    <span class="process-col name">Процесс</span>
-                    <span class="process-col cpu">CPU %</span>
-                    <span class="process-col memory">RAM %</span>
-                    <span class="process-col status">Статус</span>
-                </div>
-            </div>
-            <div class="process-table">
-        `;
-        
-        this.processes.forEach((process, index) => {
-            const cpuClass = this.getCpuClass(process.cpu);
-            const memoryClass = this.getMemoryClass(process.memory);
-            const statusClass = this.getStatusClass(process.status);
-            
-            processHtml += `
-                <div class="process-row ${index % 2 === 0 ? 'even' : 'odd'}">
-                    <span class="process-col pid">${process.pid}</span>
-                    <span class="process-col name" title="${process.name}">${this.truncateText(process.name, 15)}</span>
-                    <span class="process-col cpu ${cpuClass}">${process.cpu}%</span>
-                    <span class="process-col memory ${memoryClass}">${process.memory}%</span>
-                    <span class="process-col status ${statusClass}">${this.formatStatus(process.status)}</span>
+        // Каркас таблицы строится один раз, дальше строки обновляются по PID
+        let table = container.querySelector('.process-table');
+        if (!table) {
+            container.innerHTML = `
+                <div class="process-header">
+                    <div class="process-table-header">
+                        <span class="process-col pid">PID</span>
+                        <span class="process-col name">Процесс</span>
+                        <span class="process-col cpu">CPU %</span>
+                        <span class="process-col memory">RAM %</span>
+                        <span class="process-col status">Статус</span>
+                    </div>
                 </div>
+                <div class="process-table"></div>
             `;
-        });
-        
-        processHtml += '</div>';
-        
-        // Добавляем информацию о последнем обновлении
-        processHtml += `
-            <div class="widget-footer">
-                <span class="last-update">Обновлено: ${new Date(this.lastUpdate).toLocaleTimeString()}</span>
-            </div>
-        `;
+            table = container.querySelector('.process-table');
+        }
         
-        container.innerHTML = processHtml;
+        window.keyedRenderer.list(table, processes, {
+            key: process => process.pid,
+            create: () => document.createElement('div'),
+            update: (row, process, index) => {
+                window.keyedRenderer.patch(row, { className: `process-row ${index % 2 === 0 ? 'even' : 'odd'}` });
+                window.keyedRenderer.cells(row, [
+                    { className: 'process-col pid', text: process.pid },
+                    { className: 'process-col name', text: this.truncateText(process.name, 15), title: process.name },
+                    { className: `process-col cpu ${this.getCpuClass(process.cpu)}`, text: `${process.cpu}%` },
+                    { className: `process-col memory ${this.getMemoryClass(process.memory)}`, text: `${process.memory}%` },
+                    { className: `process-col status ${this.getStatusClass(process.status)}`,
+                      text: this.formatStatus(process.status) }
+                ]);
+            }
+        });
     }
     
     renderError() {
@@ -133,19 +153,19 @@ class ProcessesWidget {
         `;
     }
     
-    getCpuClass(cpu) {
+    static getCpuClass(cpu) {
         if (cpu >= 50) return 'high-usage';
         if (cpu >= 20) return 'medium-usage';
         return 'low-usage';
     }
     
-    getMemoryClass(memory) {
+    static getMemoryClass(memory) {
         if (memory >= 30) return 'high-usage';
         if (memory >= 10) return 'medium-usage';
         return 'low-usage';
     }
     
-    getStatusClass(status) {
+    static getStatusClass(status) {
         switch(status) {
             case 'running': return 'status-running';
             case 'sleeping': return 'status-sleeping';
@@ -155,7 +175,7 @@ class ProcessesWidget {
         }
     }
     
-    formatStatus(status) {
+    static formatStatus(status) {
         const statusMap = {
             'running': '🟢 Работает',
             'sleeping': '😴 Спит',
@@ -166,15 +186,13 @@ class ProcessesWidget {
         return statusMap[status] || '❓ ' + status;
     }
     
-    truncateText(text, maxLength) {
+    static truncateText(text, maxLength) {
         if (text.length <= maxLength) return text;
         return text.substring(0, maxLength - 3) + '...';
     }
     
     startAutoRefresh() {
-        setInterval(() => {
-            this.loadProcesses();
-        }, 10000); // Обновляем каждые 10 секунд
+        window.dashboardData.poll(10000, () => this.loadProcesses()); // Обновляем каждые 10 секунд
     }
 }
 
@@ -22,6 +22,8 @@ class SSHWidget {
             this.renderSSHConnections();
         }
         
+        this.subscribeToStream();
+        
         // Загружаем свежие данные
         await this.loadSSHData();
         this.startAutoRefresh();
@@ -57,16 +59,7 @@ class SSHWidget {
     
     async loadSSHData() {
         try {
-            const response = await fetch('/api/ssh-connections');
-            const data = await response.json();
-            
-            // Обновляем только если данные изменились
-            if (JSON.stringify(this.sshData) !== JSON.stringify(data)) {
-                this.sshData = data;
-                this.lastUpdate = Date.now();
-                this.saveToCache();
-                this.renderSSHConnections();
-            }
+            this.applySSHData(await window.dashboardData.get('ssh'));
             
         } catch (error) {
             console.error('❌ Ошибка загрузки SSH данных:', error);
@@ -74,6 +67,21 @@ class SSHWidget {
         }
     }
     
+    applySSHData(data) {
+        if (data === this.sshData) return;
+        // Обновляем только если данные изменились
+        if (JSON.stringify(this.sshData) !== JSON.stringify(data)) {
+            this.sshData = data;
+            this.lastUpdate = Date.now();
+            this.saveToCache();
+            this.renderSSHConnections();
+        }
+    }
+    
+    subscribeToStream() {
+        window.dashboardData.subscribe('ssh', data => this.applySSHData(data));
+    }
+    
     renderSSHConnections() {
         const container = document.getElementById('ssh-connections');
         if (!this.sshData) {
@@ -163,6 +171,10 @@ class SSHWidget {
     }
     
     renderServerDetails(serverData) {
+        if (serverData.query_status === 'circuit_open') {
+            return '<div class="error">🔌 Сервер недоступен, проверяется редко</div>';
+        }
+        
         if (serverData.status === 'offline') {
             return '<div class="error">❌ Сервер недоступен</div>';
         }
@@ -171,6 +183,11 @@ class SSHWidget {
             return `<div class="error">⚠️ ${serverData.error || 'Ошибка подключения'}</div>`;
         }
         
+        if (serverData.status === 'pending' || serverData.status === 'timeout') {
+            return '<div class="error">⏳ Сервер ещё не ответил</div>';
+        }
+
+        
         return `
             <div class="ping">🏓 Пинг: ${serverData.ping || 'N/A'} мс</div>
             <div class="uptime">⏱️ Время работы: ${serverData.uptime || 'Неизвестно'}</div>
@@ -191,11 +208,9 @@ class SSHWidget {
     }
     
     getServerDisplayName(serverName) {
-        const nameMap = {
-            'got_is_tod': '🚀 Got Is Tod',
-            'azure-aluminium': '💎 Azure Aluminium'
-        };
-        return nameMap[serverName] || serverName;
+        // Имена хостов приходят из hosts.json на сервере
+        const hosts = this.sshData.hosts || {};
+        return hosts[serverName] ? hosts[serverName].name : serverName;
     }
     
     getServerStatusClass(status) {
@@ -211,7 +226,9 @@ class SSHWidget {
         const statusMap = {
             'online': '🟢 Онлайн',
             'offline': '🔴 Офлайн',
-            'error': '⚠️ Ошибка'
+            'error': '⚠️ Ошибка',
+            'pending': '⏳ Ожидание',
+            'timeout': '⏳ Таймаут'
         };
         return statusMap[status] || '❓ Неизвестно';
     }
@@ -222,9 +239,7 @@ class SSHWidget {
     }
     
     startAutoRefresh() {
-        setInterval(() => {
-            this.loadSSHData();
-        }, 12000); // Обновляем каждые 12 секунд
+        window.dashboardData.poll(12000, () => this.loadSSHData()); // Обновляем каждые 12 секунд
     }
 }
 
@@ -0,0 +1,143 @@
+/**
+ * 📡 DASHBOARD STREAM
+ * Общий SSE поток /api/stream вместо отдельных таймеров опроса в каждом виджете
+ */
+
+class DashboardStream {
+    constructor(url = '/api/stream') {
+        this.url = url;
+        this.handlers = {};
+        this.source = null;
+        this.sourceTopics = [];
+        this.connected = false;
+        this.connectTimer = null;
+        this.pauseTimer = null;
+        this.paused = false;
+        this.hiddenGrace = 30000; // Короткие переключения воркспейса не рвут соединение
+
+        // Скрытому дашборду поток не нужен - закрываем его и открываем снова при возврате
+        document.addEventListener('visibilitychange', () => this.handleVisibility());
+
+        console.log('📡 Stream инициализирован');
+    }
+
+    isSupported() {
+        return typeof EventSource !== 'undefined';
+    }
+
+    isConnected() {
+        return this.connected;
+    }
+
+    subscribe(topic, callback) {
+        if (!this.handlers[topic]) {
+            this.handlers[topic] = [];
+        }
+        this.handlers[topic].push(callback);
+
+        // Виджеты подписываются по очереди при инициализации -
+        // откладываем подключение, чтобы открыть одно соединение на все темы
+        if (!this.sourceTopics.includes(topic)) {
+            this.scheduleConnect();
+        }
+
+        return () => {
+            this.handlers[topic] = this.handlers[topic].filter(handler => handler !== callback);
+        };
+    }
+
+    scheduleConnect() {
+        if (!this.isSupported() || this.connectTimer) return;
+
+        this.connectTimer = setTimeout(() => {
+            this.connectTimer = null;
+            this.connect();
+        }, 0);
+    }
+
+    handleVisibility() {
+        clearTimeout(this.pauseTimer);
+        this.pauseTimer = null;
+
+        if (document.hidden) {
+            this.pauseTimer = setTimeout(() => this.pause(), this.hiddenGrace);
+        } else if (this.paused) {
+            this.paused = false;
+            // Сервер сразу присылает последние данные по каждой теме
+            this.connect();
+        }
+    }
+
+    pause() {
+        this.pauseTimer = null;
+        if (!this.source) return;
+
+        this.source.close();
+        this.source = null;
+        this.connected = false;
+        this.paused = true;
+        console.log('🌙 SSE поток приостановлен, пока дашборд скрыт');
+    }
+
+    connect() {
+        if (this.paused) return;
+
+        const topics = Object.keys(this.handlers).filter(topic => this.handlers[topic].length > 0);
+        if (topics.length === 0) return;
+
+        if (this.source) {
+            this.source.close();
+        }
+
+        this.sourceTopics = topics;
+        this.source = new EventSource(`${this.url}?topics=${topics.join(',')}`);
+
+        this.source.onopen = () => {
+            this.connected = true;
+            console.log(`📡 Подключен SSE поток: ${topics.join(', ')}`);
+        };
+
+        // EventSource переподключается сам, а пока его нет - виджеты опрашивают API
+        this.source.onerror = () => {
+            if (this.connected) {
+                console.warn('⚠️ SSE поток прерван, виджеты переходят на опрос');
+            }
+            this.connected = false;
+        };
+
+        topics.forEach(topic => {
+            this.source.addEventListener(topic, (event) => this.dispatch(topic, event.data));
+        });
+    }
+
+    dispatch(topic, rawData) {
+        let data;
+        try {
+            data = JSON.parse(rawData);
+        } catch (error) {
+            console.error(`❌ Некорректные данные темы ${topic}:`, error);
+            return;
+        }
+
+        (this.handlers[topic] || []).forEach(handler => {
+            try {
+                handler(data);
+            } catch (error) {
+                console.error(`❌ Ошибка обработчика темы ${topic}:`, error);
+            }
+        });
+    }
+
+    destroy() {
+        clearTimeout(this.pauseTimer);
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+        this.connected = false;
+    }
+}
+
+window.dashboardStream = new DashboardStream();
+
+console.log('📡 Stream загружен');
@@ -15,6 +15,7 @@ class SystemWidget {
     
     async init() {
         this.initializeTabs();
+        this.subscribeToStream();
         await this.loadAllData();
         this.startAutoRefresh();
     }
@@ -67,25 +68,35 @@ class SystemWidget {
     
     async loadAllData() {
         try {
-            // Загружаем все данные параллельно
-            const [detailsResponse, tempResponse, diskResponse] = await Promise.all([
-                fetch('/api/system-details'),
-                fetch('/api/temperatures'),
-                fetch('/api/disk-activity')
-            ]);
-            
-            this.systemDetails = await detailsResponse.json();
-            this.temperatures = await tempResponse.json();
-            this.diskActivity = await diskResponse.json();
-            
-            // Рендерим активную вкладку
-            this.renderCurrentTab();
+            // Все разделы одним запросом снимка - шина раздаёт их подписчикам ниже
+            await window.dashboardData.get('snapshot');
             
         } catch (error) {
             console.error('❌ Ошибка загрузки системных данных:', error);
         }
     }
     
+    subscribeToStream() {
+        window.dashboardData.subscribe('details', data => {
+            this.systemDetails = data;
+            if (this.currentTab === 'overview' || this.currentTab === 'memory') {
+                this.renderCurrentTab();
+            }
+        });
+        window.dashboardData.subscribe('temperatures', data => {
+            this.temperatures = data;
+            if (this.currentTab === 'temp') {
+                this.renderCurrentTab();
+            }
+        });
+        window.dashboardData.subscribe('disk', data => {
+            this.diskActivity = data;
+            if (this.currentTab === 'disks') {
+                this.renderCurrentTab();
+            }
+        });
+    }
+    
     renderCurrentTab() {
         switch(this.currentTab) {
             case 'overview':
@@ -207,6 +218,12 @@ class SystemWidget {
             return;
         }
         
+        // Пустой ответ - на машине нет доступных датчиков, а не ошибка загрузки
+        if (Object.keys(this.temperatures).length === 0) {
+            container.innerHTML = '<div class="empty-state">🌡️ Датчики недоступны</div>';
+            return;
+        }
+        
         let tempHtml = '<div class="temperature-grid">';
         
         for (const [sensor, data] of Object.entries(this.temperatures)) {
@@ -280,11 +297,14 @@ class SystemWidget {
                     <div class="io-grid">
             `;
             
+            const rates = this.diskActivity.rates || {};
+            
             for (const [device, stats] of Object.entries(this.diskActivity.io_stats)) {
                 diskHtml += `
                     <div class="io-card">
                         <div class="io-device">${device}</div>
                         <div class="io-stats">
+                            ${this.renderDiskRates(rates[device])}
                             <div class="io-stat">
                                 <span class="io-label">Чтение:</span>
                                 <span class="io-value">${this.formatBytes(stats.read_bytes)}</span>
@@ -313,6 +333,32 @@ class SystemWidget {
         container.innerHTML = diskHtml;
     }
     
+    renderDiskRates(deviceRates) {
+        // Скорость считает сервер по своему буферу счётчиков - берём окно 10 секунд
+        const rate = deviceRates && (deviceRates['10s'] || deviceRates['1s']);
+        if (!rate) return '';
+        
+        return `
+            <div class="io-stat">
+                <span class="io-label">Скорость чтения:</span>
+                <span class="io-value">${this.formatBytes(rate.read_bps)}/s</span>
+            </div>
+            <div class="io-stat">
+                <span class="io-label">Скорость записи:</span>
+                <span class="io-value">${this.formatBytes(rate.write_bps)}/s</span>
+            </div>
+            <div class="io-stat">
+                <span class="io-label">IOPS:</span>
+                <span class="io-value">${rate.read_iops} / ${rate.write_iops}</span>
+            </div>
+            ${rate.busy_percent !== null ? `
+            <div class="io-stat">
+                <span class="io-label">Занятость:</span>
+                <span class="io-value">${rate.busy_percent}%</span>
+            </div>` : ''}
+        `;
+    }
+    
     formatUptime(timestamp) {
         const now = Date.now() / 1000;
         const uptimeSeconds = now - timestamp;
@@ -440,9 +486,7 @@ class SystemWidget {
     }
 
     startAutoRefresh() {
-        setInterval(() => {
-            this.loadAllData();
-        }, 10000); // Обновляем каждые 10 секунд
+        window.dashboardData.poll(10000, () => this.loadAllData()); // Обновляем каждые 10 секунд
     }
 }
 
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+⏱️ BENCH: PROCESS SCANNER
+Сравнение бэкендов ProcessTracker (procfs и psutil) на синтетическом /proc
+
+Для каждого числа процессов создаётся временное дерево /proc с файлами
+stat и statm (плюс meminfo, stat, uptime, которые нужны psutil), и обоими
+бэкендами снимается несколько выборок. psutil направляется на дерево
+через psutil.PROCFS_PATH.
+
+    python3 scripts/bench_proc_scanner.py
+    python3 scripts/bench_proc_scanner.py --counts 1000 10000 50000 --rounds 10
+"""
+
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import server  # noqa: E402
+
+NAMES = ['chrome', 'code', 'firefox', 'python3', 'kitty', 'node', 'postgres', 'nginx', 'dockerd', 'kworker/0:1']
+STATES = 'RSSSSDIS'
+
+
+def build_proc_tree(root, count):
+    """Синтетический /proc на count процессов"""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    # Системные файлы берём с текущей машины - psutil разбирает их целиком
+    for name in ('meminfo', 'stat', 'uptime'):
+        shutil.copy(f'/proc/{name}', root / name)
+
+    for pid in range(1, count + 1):
+        directory = root / str(pid)
+        directory.mkdir()
+        name = NAMES[pid % len(NAMES)]
+        utime, stime = pid * 7 % 50000, pid * 3 % 20000
+        rss_pages = 500 + pid % 20000
+        fields = [STATES[pid % len(STATES)], '1', str(pid), str(pid), '0', '-1', '4194560',
+                  '1000', '0', '0', '0', str(utime), str(stime), '0', '0', '20', '0', '1', '0',
+                  str(1000 + pid), str(rss_pages * 4 * 4096), str(rss_pages)] + ['0'] * 30
+        (directory / 'stat').write_text(f'{pid} ({name}) ' + ' '.join(fields) + '\n')
+        (directory / 'statm').write_text(f'{rss_pages * 4} {rss_pages} 300 100 0 {rss_pages} 0\n')
+
+
+def touch_cpu_times(root, count, round_number):
+    """Сдвигает utime части процессов, чтобы между выборками был прирост CPU"""
+    for pid in range(1, count + 1, 7):
+        path = Path(root) / str(pid) / 'stat'
+        text = path.read_text()
+        head, _, tail = text.rpartition(') ')
+        fields = tail.split()
+        fields[11] = str(int(fields[11]) + round_number + pid % 13)
+        path.write_text(f'{head}) ' + ' '.join(fields) + '\n')
+
+
+def bench_backend(backend, root, count, rounds):
+    if backend == 'psutil':
+        server.psutil.PROCFS_PATH = str(root)
+        # process_iter кеширует объекты Process вместе с путём к прошлому дереву
+        if hasattr(server.psutil.process_iter, 'cache_clear'):
+            server.psutil.process_iter.cache_clear()
+        else:
+            server.psutil._pmap.clear()
+    tracker = server.ProcessTracker(backend=backend, proc_dir=str(root))
+    tracker.sample()
+
+    timings = []
+    for round_number in range(rounds):
+        touch_cpu_times(root, count, round_number)
+        started = time.perf_counter()
+        tracker.sample()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    total = tracker.stats()['total']
+    if total != count:
+        print(f"⚠️ {backend}: найдено {total} процессов из {count}")
+    # Проценты CPU зависят от времени между выборками, сравниваем остальные поля
+    rows = {pid: (row['name'], row['memory'], row['status']) for pid, row in tracker._rows.items()}
+    return timings, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк бэкендов сканера процессов')
+    parser.add_argument('--counts', type=int, nargs='+', default=[1000, 10000], help='число процессов')
+    parser.add_argument('--rounds', type=int, default=5, help='выборок на каждый бэкенд')
+    args = parser.parse_args()
+
+    backends = ['procfs'] + (['psutil'] if server.psutil is not None else [])
+    if server.psutil is None:
+        print("⚠️ psutil не установлен - измеряется только procfs")
+
+    print(f"{'процессов':>10} {'бэкенд':>8} {'медиана, мс':>12} {'мин, мс':>9} {'макс, мс':>9}")
+    for count in args.counts:
+        with tempfile.TemporaryDirectory(prefix='cyberkitty-proc-') as root:
+            build_proc_tree(root, count)
+            rows = {}
+            for backend in backends:
+                timings, rows[backend] = bench_backend(backend, root, count, args.rounds)
+                print(f"{count:>10} {backend:>8} {statistics.median(timings):>12.1f} "
+                      f"{min(timings):>9.1f} {max(timings):>9.1f}")
+
+            # Оба бэкенда должны видеть одни и те же процессы с теми же полями
+            if len(rows) == 2 and rows['procfs'] != rows['psutil']:
+                differ = [pid for pid in rows['procfs'] if rows['procfs'][pid] != rows['psutil'].get(pid)]
+                print(f"⚠️ Бэкенды расходятся в {len(differ)} процессах, например {differ[:5]}")
+
+
+if __name__ == '__main__':
+    main()
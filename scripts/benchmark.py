@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+"""
+📈 BENCH: DASHBOARD LOAD
+Нагрузочный бенчмарк server.py с поддельными psutil, docker и ssh
+
+Сервер запускается отдельным процессом на свободном порту. В PATH перед
+системными стоят поддельные ssh и docker: хосты live* отвечают сразу,
+slow* - через --ssh-delay секунд, dead* падают с кодом 255 через
+--dead-delay (как недоступный хост). psutil подменяется модулем с
+постоянными значениями (--psutil real - настоящий). Процессы читаются из
+/proc машины или из синтетического дерева на --processes процессов.
+
+Каждое из --windows окон сначала загружает страницу (index.html, стили,
+скрипты), а затем, как браузер, держит SSE поток /api/stream (доля окон
+--stream-ratio) или опрашивает API с интервалами виджетов из public/js,
+ускоренными в --speed раз. Опрос идёт условными запросами с If-None-Match,
+как callAPI в dashboard.js; окно, которому сервер отказал в потоке (лимит
+SSE клиентов), опрашивает API. Интервалы сервера (сборщик, опрос хостов, кеш)
+не ускоряются - бенчмарк даёт больше окон, а не более быстрое время.
+
+    python3 scripts/benchmark.py
+    python3 scripts/benchmark.py --windows 10 --speed 20 --duration 60 --save bench-baseline.json
+    python3 scripts/benchmark.py --compare bench-baseline.json --threshold 0.2
+
+С --compare код выхода 1, если p50/p99 эндпоинта или CPU сервера выросли
+больше порога (и не меньше чем на MIN_REGRESSION_MS / MIN_REGRESSION_CPU).
+"""
+
+import argparse
+import gzip
+import heapq
+import http.client
+import json
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Опрос виджетов без SSE потока: (интервал в секундах, эндпоинт, откуда).
+# Процессы и контейнеры виджеты запрашивают через общую шину данных - один запрос на окно
+POLLING_MIX = [
+    (5, '/api/system-info', 'dashboard.js initializeSystemInfo'),
+    (10, '/api/snapshot?sections=details,temperatures,disk,processes&since={seq}',
+     'data-bus.js: system.js, processes.js и monitor.js'),
+    (12, '/api/ssh-connections', 'ssh.js'),
+    (15, '/api/docker-containers?stats=1', 'data-bus.js: docker.js и monitor.js')
+]
+# Темы, на которые подписываются виджеты страницы
+STREAM_PATH = '/api/stream?topics=system,details,temperatures,disk,processes,docker,ssh'
+STREAM_FIRST_EVENT = '/api/stream (первое событие)'
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+# Как браузер: brotli просим, только если можем его распаковать
+ACCEPT_ENCODING = 'gzip, br' if brotli is not None else 'gzip'
+ASSET_PATTERN = re.compile(r'(?:href|src)="([^":]+\.(?:css|js)(?:\?[^"]*)?)"')
+HTML_COMMENT = re.compile(r'<!--.*?-->', re.S)
+# Меньшие изменения - шум планировщика ОС, а не регрессия
+MIN_REGRESSION_MS = 1.0
+MIN_REGRESSION_CPU = 1.0
+
+FAKE_PSUTIL = '''"""Поддельный psutil для scripts/benchmark.py - постоянные значения без обращения к системе"""
+import time
+from collections import namedtuple
+
+_STARTED = time.monotonic()
+_GIB = 1024 ** 3
+
+
+class Error(Exception):
+    pass
+
+
+class NoSuchProcess(Error):
+    pass
+
+
+class ZombieProcess(NoSuchProcess):
+    pass
+
+
+class AccessDenied(Error):
+    pass
+
+
+svmem = namedtuple('svmem', 'total available percent used free cached buffers')
+sswap = namedtuple('sswap', 'total used free percent sin sout')
+sdiskusage = namedtuple('sdiskusage', 'total used free percent')
+sdiskpart = namedtuple('sdiskpart', 'device mountpoint fstype opts')
+sdiskio = namedtuple('sdiskio', 'read_count write_count read_bytes write_bytes read_time write_time busy_time')
+scpufreq = namedtuple('scpufreq', 'current min max')
+shwtemp = namedtuple('shwtemp', 'label current high critical')
+
+
+def cpu_percent(interval=None, percpu=False):
+    return 12.5
+
+
+def cpu_count(logical=True):
+    return 8
+
+
+def cpu_freq(percpu=False):
+    return scpufreq(2400.0, 800.0, 4800.0)
+
+
+def boot_time():
+    return time.time() - 86400
+
+
+def virtual_memory():
+    return svmem(16 * _GIB, 9 * _GIB, 43.7, 7 * _GIB, 2 * _GIB, 4 * _GIB, _GIB // 4)
+
+
+def swap_memory():
+    return sswap(4 * _GIB, _GIB // 2, 7 * _GIB // 2, 12.5, 0, 0)
+
+
+def disk_usage(path):
+    return sdiskusage(512 * _GIB, 300 * _GIB, 212 * _GIB, 58.6)
+
+
+def disk_partitions(all=False):
+    return [sdiskpart('/dev/nvme0n1p2', '/', 'ext4', 'rw'), sdiskpart('/dev/nvme0n1p1', '/boot', 'vfat', 'rw')]
+
+
+def disk_io_counters(perdisk=False):
+    elapsed = time.monotonic() - _STARTED
+    counters = {
+        'nvme0n1': sdiskio(int(elapsed * 40), int(elapsed * 25), int(elapsed * 5e6), int(elapsed * 2e6),
+                           int(elapsed * 10), int(elapsed * 20), int(elapsed * 30))
+    }
+    return counters if perdisk else counters['nvme0n1']
+
+
+def sensors_temperatures(fahrenheit=False):
+    return {
+        'coretemp': [shwtemp('Package id 0', 54.0, 90.0, 100.0), shwtemp('Core 0', 51.0, 90.0, 100.0)],
+        'nvme': [shwtemp('Composite', 41.0, 80.0, 85.0)]
+    }
+
+
+def process_iter(attrs=None, ad_value=None):
+    return iter(())
+'''
+
+FAKE_SSH = '''#!{python}
+"""Поддельный ssh: live* отвечают сразу, slow* с задержкой, dead* недоступны"""
+import os
+import subprocess
+import sys
+import time
+
+args = sys.argv[1:]
+options = []
+while args and args[0].startswith('-'):
+    flag = args.pop(0)
+    if flag in ('-o', '-S', '-O'):
+        options.append(flag + args.pop(0))
+    else:
+        options.append(flag)
+host, command = args[0], ' '.join(args[1:])
+
+if host.startswith('dead'):
+    time.sleep({dead_delay})
+    sys.exit(255)
+control = next((option[2:] for option in options if option.startswith('-S')), None)
+if '-N' in options:
+    # Мастер-соединение: достаточно файла на месте управляющего сокета
+    if control:
+        open(control, 'w').close()
+    sys.exit(0)
+if any(option.startswith('-O') for option in options):
+    sys.exit(0)
+if host.startswith('slow'):
+    time.sleep({ssh_delay})
+sys.exit(subprocess.call(['sh', '-c', command]))
+'''
+
+FAKE_DOCKER = '''#!{python}
+"""Поддельный docker: ps и stats для {containers} контейнеров"""
+import json
+import random
+import sys
+import time
+
+NAMES = ['web-%d' % number for number in range({containers})]
+
+if sys.argv[1:2] == ['ps']:
+    for number, name in enumerate(NAMES):
+        print(json.dumps({{'ID': '%012x' % (number + 1), 'Names': name, 'Image': 'nginx:latest',
+                          'Status': 'Up 3 hours', 'State': 'running', 'Ports': '0.0.0.0:%d->80/tcp' % (8000 + number),
+                          'CreatedAt': '2024-01-01 00:00:00 +0000 UTC'}}))
+    sys.exit(0)
+
+if sys.argv[1:2] == ['stats']:
+    while True:
+        # Настоящий docker stats перерисовывает экран ANSI кодами
+        sys.stdout.write('\\x1b[2J\\x1b[H')
+        for number, name in enumerate(NAMES):
+            print(json.dumps({{'ID': '%012x' % (number + 1), 'Container': '%012x' % (number + 1), 'Name': name,
+                              'CPUPerc': '%.2f%%' % random.uniform(0, 50), 'MemPerc': '1.20%',
+                              'MemUsage': '24.5MiB / 1.944GiB', 'NetIO': '1.2kB / 648B',
+                              'BlockIO': '1.5MB / 0B', 'PIDs': '7'}}))
+        sys.stdout.flush()
+        time.sleep(1)
+
+sys.exit(1)
+'''
+
+BOOTSTRAP = '''
+import sys
+port, proc_dir = int(sys.argv[1]), sys.argv[2]
+import server
+server.PORT = port
+if proc_dir:
+    server.process_tracker.proc_dir = proc_dir
+server.main()
+'''
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def write_executable(path, text):
+    path.write_text(text)
+    path.chmod(0o755)
+
+
+def prepare_environment(workdir, args):
+    """Поддельные бинарники, psutil и hosts.json во временном каталоге; возвращает env сервера"""
+    fakebin = workdir / 'bin'
+    fakebin.mkdir()
+    write_executable(fakebin / 'ssh', FAKE_SSH.format(python=sys.executable, ssh_delay=args.ssh_delay,
+                                                      dead_delay=args.dead_delay))
+    write_executable(fakebin / 'docker', FAKE_DOCKER.format(python=sys.executable, containers=args.containers))
+
+    hosts = ([{'alias': f'live{number}'} for number in range(args.live)] +
+             [{'alias': f'slow{number}'} for number in range(args.slow)] +
+             [{'alias': f'dead{number}'} for number in range(args.dead)])
+    hosts_file = workdir / 'hosts.json'
+    hosts_file.write_text(json.dumps({'defaults': {'agent': args.agent}, 'hosts': hosts}))
+
+    env = dict(os.environ,
+               PATH=f'{fakebin}{os.pathsep}{os.environ.get("PATH", "")}',
+               HOME=str(workdir),
+               TMPDIR=str(workdir),
+               DOCKER_HOST=f'unix://{workdir}/docker.sock',
+               CYBERKITTY_HOSTS_FILE=str(hosts_file),
+               CYBERKITTY_REMOTE_AGENT='1' if args.agent else '0',
+               CYBERKITTY_LOG_LEVEL='WARNING',
+               CYBERKITTY_BUNDLE='1' if args.bundle else '0')
+    if args.psutil == 'fake':
+        fake_modules = workdir / 'modules'
+        fake_modules.mkdir()
+        (fake_modules / 'psutil.py').write_text(FAKE_PSUTIL)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(fake_modules), os.environ.get('PYTHONPATH')]))
+    return env
+
+
+def process_cpu_seconds(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def process_rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return round(int(line.split()[1]) / 1024, 1)
+    return None
+
+
+def fetch(port, path, timeout=30, etag=None):
+    """(статус, байт по сети, секунд, распакованное тело, ETag) одного GET
+
+    С etag запрос условный (If-None-Match). Статус 'error' при сбое соединения.
+    """
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    headers = {'Accept-Encoding': ACCEPT_ENCODING}
+    if etag:
+        headers['If-None-Match'] = etag
+    try:
+        connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        body = response.read()
+        elapsed = time.perf_counter() - started
+        size = len(body)
+        encoding = response.getheader('Content-Encoding')
+        if encoding == 'gzip':
+            body = gzip.decompress(body)
+        elif encoding == 'br':
+            body = brotli.decompress(body)
+        return response.status, size, elapsed, body, response.getheader('ETag')
+    except (OSError, http.client.HTTPException):
+        return 'error', 0, time.perf_counter() - started, b'', None
+    finally:
+        connection.close()
+
+
+def wait_until_ready(port, process, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'сервер завершился с кодом {process.returncode}')
+        if fetch(port, '/api/system-info', timeout=2)[0] == 200:
+            return
+        time.sleep(0.2)
+    raise RuntimeError('сервер не ответил за отведённое время')
+
+
+class BrowserWindow:
+    """Окно дашборда: загрузка страницы, SSE поток и таймеры виджетов"""
+
+    def __init__(self, number, port, results):
+        self.number = number
+        self.port = port
+        self.results = results
+        self.process_seq = 0
+        # ETag последних ответов по адресу - как apiCache в dashboard.js
+        self.etags = {}
+        # Пока поток подключен, таймеры виджетов не опрашивают API (isStreaming)
+        self.streaming = False
+        self.stream_events = 0
+        self.stream_bytes = 0
+
+    def record(self, name, status, size, elapsed):
+        self.results.append((name, status, size, elapsed))
+
+    def cold_load(self):
+        status, size, elapsed, body, _ = fetch(self.port, '/')
+        self.record('/ (index.html)', status, size, elapsed)
+        if status != 200:
+            return
+        # Закомментированные подключения браузер не загружает
+        html = HTML_COMMENT.sub('', body.decode('utf-8', errors='replace'))
+        for asset in ASSET_PATTERN.findall(html):
+            status, size, elapsed, _, _ = fetch(self.port, '/' + asset.lstrip('/'))
+            self.record('static (загрузка страницы)', status, size, elapsed)
+
+    def poll(self, path):
+        if self.streaming:
+            return
+        url = path.format(seq=self.process_seq)
+        status, size, elapsed, body, etag = fetch(self.port, url, etag=self.etags.get(url))
+        self.record(path.replace('{seq}', 'N'), status, size, elapsed)
+        if status != 200:
+            return
+        if etag:
+            self.etags[url] = etag
+        if '{seq}' in path:
+            try:
+                seq = json.loads(body)['processes']['seq']
+            except (ValueError, KeyError, TypeError):
+                return
+            if seq != self.process_seq:
+                # Адрес меняется с каждым seq - ETag прошлого адреса больше не пригодится
+                self.etags.pop(url, None)
+            self.process_seq = seq
+
+    def stream(self, deadline):
+        """SSE поток до deadline; при отказе сервера окно остаётся на опросе"""
+        started = time.perf_counter()
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+        first_event = True
+        try:
+            connection.request('GET', STREAM_PATH)
+            response = connection.getresponse()
+            if response.status != 200:
+                self.record(STREAM_FIRST_EVENT, response.status, 0, time.perf_counter() - started)
+                return
+            self.streaming = True
+            while time.monotonic() < deadline:
+                line = response.fp.readline()
+                if not line:
+                    break
+                self.stream_bytes += len(line)
+                if line.startswith(b'event:'):
+                    self.stream_events += 1
+                    if first_event:
+                        self.record(STREAM_FIRST_EVENT, 200, 0, time.perf_counter() - started)
+                        first_event = False
+        except (OSError, http.client.HTTPException):
+            if first_event:
+                self.record(STREAM_FIRST_EVENT, 'error', 0, time.perf_counter() - started)
+        finally:
+            self.streaming = False
+            connection.close()
+
+
+def run_load(port, args):
+    """Запускает окна и таймеры виджетов на args.duration секунд
+
+    Возвращает замеры, время и сводку SSE потоков.
+    """
+    rng = random.Random(args.seed)
+    results = []
+    windows = [BrowserWindow(number, port, results) for number in range(args.windows)]
+    streaming = round(args.windows * args.stream_ratio)
+    # Потоки держат поток исполнителя всё время нагрузки
+    executor = ThreadPoolExecutor(max_workers=min(64, args.windows * (len(POLLING_MIX) + 1)) + streaming)
+
+    started = time.monotonic()
+    deadline = started + args.duration
+    # Окна открываются вразнобой в первые секунды, фазы таймеров случайны
+    queue = []
+    for window in windows:
+        opened = started + rng.uniform(0, min(2.0, args.duration / 4))
+        heapq.heappush(queue, (opened, window.number, -1))
+        for number, (interval, _, _) in enumerate(POLLING_MIX):
+            heapq.heappush(queue, (opened + rng.uniform(0, interval / args.speed), window.number, number))
+
+    while queue:
+        due, window_number, number = heapq.heappop(queue)
+        if due >= deadline:
+            break
+        time.sleep(max(0.0, due - time.monotonic()))
+        window = windows[window_number]
+        if number < 0:
+            executor.submit(window.cold_load)
+            if window.number < streaming:
+                executor.submit(window.stream, deadline)
+            continue
+        interval, path, _ = POLLING_MIX[number]
+        executor.submit(window.poll, path)
+        heapq.heappush(queue, (due + interval / args.speed, window_number, number))
+
+    executor.shutdown(wait=True)
+    stream = {
+        'clients': streaming,
+        'events': sum(window.stream_events for window in windows),
+        'kb': round(sum(window.stream_bytes for window in windows) / 1024, 1)
+    }
+    return results, time.monotonic() - started, stream
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(results, elapsed, stream, cpu_seconds, rss_mb, server_timings, args):
+    endpoints = {}
+    for name, status, size, seconds in results:
+        endpoints.setdefault(name, []).append((status, size, seconds))
+
+    report = {'version': 1, 'config': {
+        'windows': args.windows, 'speed': args.speed, 'duration': args.duration,
+        'live': args.live, 'slow': args.slow, 'dead': args.dead, 'ssh_delay': args.ssh_delay,
+        'containers': args.containers, 'processes': args.processes, 'psutil': args.psutil,
+        'agent': args.agent, 'bundle': args.bundle, 'seed': args.seed, 'stream_ratio': args.stream_ratio
+    }, 'endpoints': {}, 'stream': stream}
+
+    for name, samples in sorted(endpoints.items()):
+        latencies = sorted(seconds * 1000 for _, _, seconds in samples)
+        report['endpoints'][name] = {
+            'requests': len(samples),
+            'errors': sum(1 for status, _, _ in samples if status == 'error' or status >= 500),
+            'not_modified': sum(1 for status, _, _ in samples if status == 304),
+            'p50_ms': round(percentile(latencies, 0.5), 2),
+            'p90_ms': round(percentile(latencies, 0.9), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'max_ms': round(latencies[-1], 2),
+            'avg_kb': round(statistics.mean(size for _, size, _ in samples) / 1024, 1)
+        }
+
+    latencies = sorted(seconds * 1000 for _, _, _, seconds in results) or [0.0]
+    report['total'] = {
+        'requests': len(results),
+        'errors': sum(endpoint['errors'] for endpoint in report['endpoints'].values()),
+        'throughput_rps': round(len(results) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2)
+    }
+    report['server'] = {
+        'cpu_seconds': round(cpu_seconds, 2),
+        'cpu_percent': round(cpu_seconds / elapsed * 100, 1),
+        'rss_mb': rss_mb,
+        # Самые дорогие сборщики по данным /api/debug/timings
+        'collectors': server_timings.get('collectors', [])[:10]
+    }
+    return report
+
+
+def print_report(report):
+    width = max([len('эндпоинт')] + [len(name) for name in report['endpoints']])
+    print(f"\n{'эндпоинт':<{width}} {'запросов':>8} {'ошибок':>7} {'304':>6} {'p50, мс':>9} {'p99, мс':>9} {'КБ':>7}")
+    for name, endpoint in report['endpoints'].items():
+        print(f"{name:<{width}} {endpoint['requests']:>8} {endpoint['errors']:>7} {endpoint['not_modified']:>6} "
+              f"{endpoint['p50_ms']:>9.2f} {endpoint['p99_ms']:>9.2f} {endpoint['avg_kb']:>7.1f}")
+    total, server = report['total'], report['server']
+    print(f"\n📊 Всего {total['requests']} запросов ({total['errors']} ошибок), {total['throughput_rps']} запр/с, "
+          f"p50 {total['p50_ms']} мс, p99 {total['p99_ms']} мс")
+    stream = report['stream']
+    print(f"📡 SSE: {stream['clients']} окон с потоком, {stream['events']} событий, {stream['kb']} КБ")
+    print(f"🖥️  CPU сервера {server['cpu_seconds']} с ({server['cpu_percent']}%), RSS {server['rss_mb']} МБ")
+    for collector in server['collectors'][:5]:
+        print(f"   ⏱️ {collector['collector']:<24} {collector['count']:>6} раз, "
+              f"p50 {collector['p50_ms']} мс, p99 {collector['p99_ms']} мс")
+
+
+def compare(report, baseline, threshold):
+    """Печатает изменения относительно базового отчёта; True, если есть регрессия"""
+    if baseline.get('config') != report['config']:
+        print("⚠️ Параметры запуска отличаются от базового отчёта - сравнение приблизительное")
+
+    def change(old, new):
+        return (new - old) / old if old else 0.0
+
+    regressions = []
+    width = max([len('эндпоинт')] + [len(name) for name in report['endpoints']])
+    print(f"\n{'эндпоинт':<{width}} {'p50 было/стало':>20} {'p99 было/стало':>20}")
+    for name, endpoint in report['endpoints'].items():
+        old = baseline['endpoints'].get(name)
+        if old is None:
+            continue
+        marks = ''
+        for key in ('p50_ms', 'p99_ms'):
+            if change(old[key], endpoint[key]) > threshold and endpoint[key] - old[key] >= MIN_REGRESSION_MS:
+                regressions.append(f'{name} {key}')
+                marks += ' ⚠️'
+        print(f"{name:<{width}} {old['p50_ms']:>9.2f}/{endpoint['p50_ms']:<9.2f} "
+              f"{old['p99_ms']:>9.2f}/{endpoint['p99_ms']:<9.2f}{marks}")
+
+    old_cpu, new_cpu = baseline['server']['cpu_percent'], report['server']['cpu_percent']
+    print(f"\n🖥️  CPU сервера: {old_cpu}% -> {new_cpu}% ({change(old_cpu, new_cpu):+.0%})")
+    if change(old_cpu, new_cpu) > threshold and new_cpu - old_cpu >= MIN_REGRESSION_CPU:
+        regressions.append('cpu_percent')
+
+    if regressions:
+        print(f"❌ Регрессия больше {threshold:.0%}: {', '.join(regressions)}")
+    else:
+        print(f"✅ Регрессий больше {threshold:.0%} нет")
+    return bool(regressions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный бенчмарк Cyberkitty Dashboard')
+    parser.add_argument('--windows', type=int, default=5, help='одновременно открытых окон дашборда')
+    parser.add_argument('--speed', type=float, default=10.0, help='во сколько раз ускорить таймеры виджетов')
+    parser.add_argument('--duration', type=float, default=30.0, help='длительность нагрузки, секунд')
+    parser.add_argument('--warmup', type=float, default=3.0, help='пауза после старта сервера, секунд')
+    parser.add_argument('--live', type=int, default=2, help='удалённых хостов, отвечающих сразу')
+    parser.add_argument('--slow', type=int, default=1, help='медленных хостов')
+    parser.add_argument('--dead', type=int, default=1, help='недоступных хостов')
+    parser.add_argument('--ssh-delay', type=float, default=1.0, help='задержка ответа медленного хоста')
+    parser.add_argument('--dead-delay', type=float, default=0.5, help='через сколько ssh сдаётся на мёртвом хосте')
+    parser.add_argument('--containers', type=int, default=8, help='контейнеров у поддельного docker')
+    parser.add_argument('--processes', type=int, default=0,
+                        help='синтетический /proc на N процессов (0 - /proc этой машины)')
+    parser.add_argument('--psutil', choices=('fake', 'real'), default='fake', help='какой psutil использует сервер')
+    parser.add_argument('--no-agent', dest='agent', action='store_false', help='опрашивать хосты командами ssh')
+    parser.add_argument('--bundle', action='store_true', help='CYBERKITTY_BUNDLE=1 - статика одной сборкой')
+    parser.add_argument('--stream-ratio', type=float, default=0.5,
+                        help='доля окон с SSE потоком (остальные опрашивают API)')
+    parser.add_argument('--seed', type=int, default=1, help='зерно фаз таймеров')
+    parser.add_argument('--save', help='сохранить отчёт в JSON (базовый для --compare)')
+    parser.add_argument('--compare', help='сравнить с сохранённым отчётом')
+    parser.add_argument('--threshold', type=float, default=0.2, help='допустимый рост p50/p99/CPU при сравнении')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='cyberkitty-bench-') as directory:
+        workdir = Path(directory)
+        env = prepare_environment(workdir, args)
+        proc_dir = ''
+        if args.processes:
+            sys.path.insert(0, str(ROOT / 'scripts'))
+            from bench_proc_scanner import build_proc_tree
+            proc_dir = str(workdir / 'proc')
+            build_proc_tree(proc_dir, args.processes)
+
+        port = free_port()
+        print(f"🚀 Сервер на порту {port}: {args.live} live, {args.slow} slow, {args.dead} dead хостов, "
+              f"psutil {args.psutil}, агент {'вкл' if args.agent else 'выкл'}")
+        with open(workdir / 'server.log', 'wb') as server_log:
+            process = subprocess.Popen([sys.executable, '-c', BOOTSTRAP, str(port), proc_dir],
+                                       cwd=ROOT, env=env, stdout=server_log, stderr=subprocess.STDOUT)
+            try:
+                wait_until_ready(port, process)
+                time.sleep(args.warmup)
+
+                print(f"🪟 {args.windows} окон, таймеры x{args.speed}, {args.duration} с")
+                cpu_before = process_cpu_seconds(process.pid)
+                results, elapsed, stream = run_load(port, args)
+                cpu_seconds = process_cpu_seconds(process.pid) - cpu_before
+                rss_mb = process_rss_mb(process.pid)
+                status, _, _, body, _ = fetch(port, '/api/debug/timings')
+                server_timings = json.loads(body) if status == 200 else {}
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                server_log.flush()
+                print((workdir / 'server.log').read_text(errors='replace')[-2000:])
+                sys.exit(1)
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    report = summarize(results, elapsed, stream, cpu_seconds, rss_mb, server_timings, args)
+    print_report(report)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"💾 Отчёт сохранён: {args.save}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+🛰️ CYBERKITTY REMOTE AGENT
+Сборщик метрик удалённого хоста для server.py
+
+Сервер запускает агента через мастер-соединение ssh без копирования файла:
+    ssh host python3 -u -c 'import sys; exec(sys.stdin.buffer.read(<размер>))' --interval 5
+и передаёт исходник в stdin. Дальше stdin остаётся открытым: строка "ping <id>"
+возвращается как {"type": "pong", "id": ...} для замера задержки, а EOF
+(сервер закрыл канал) завершает агента.
+
+Каждые --interval секунд в stdout пишется одна JSON строка:
+    {"type": "sample", "time", "hostname", "uptime", "load", "cpu", "memory",
+     "swap", "disk", "processes", "containers"}
+
+Только стандартная библиотека и /proc - на хосте не нужен psutil.
+"""
+
+import argparse
+import json
+import os
+import pwd
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+# Командная строка целиком (обрезает уже виджет), но без многокилобайтных аргументов
+CMDLINE_LIMIT = 512
+
+# stdout пишут и поток выборок, и поток ответов на ping
+output_lock = threading.Lock()
+
+
+def emit(message):
+    with output_lock:
+        sys.stdout.write(json.dumps(message) + '\n')
+        sys.stdout.flush()
+
+
+def read_file(path):
+    with open(path) as f:
+        return f.read()
+
+
+def read_meminfo():
+    """/proc/meminfo в килобайтах"""
+    meminfo = {}
+    for line in read_file('/proc/meminfo').splitlines():
+        key, _, value = line.partition(':')
+        meminfo[key] = int(value.split()[0])
+    return meminfo
+
+
+def memory_usage(meminfo):
+    total = meminfo['MemTotal'] * 1024
+    available = meminfo.get('MemAvailable', meminfo['MemFree']) * 1024
+    swap_total = meminfo.get('SwapTotal', 0) * 1024
+    swap_used = swap_total - meminfo.get('SwapFree', 0) * 1024
+    return {
+        'total': total,
+        'used': total - available,
+        'available': available,
+        'percent': round((total - available) / total * 100, 1) if total else 0.0
+    }, {
+        'total': swap_total,
+        'used': swap_used,
+        'percent': round(swap_used / swap_total * 100, 1) if swap_total else 0.0
+    }
+
+
+def disk_usage(path='/'):
+    stat = os.statvfs(path)
+    total = stat.f_blocks * stat.f_frsize
+    free = stat.f_bavail * stat.f_frsize
+    used = total - stat.f_bfree * stat.f_frsize
+    return {
+        'total': total,
+        'used': used,
+        'free': free,
+        'percent': round(used / (used + free) * 100, 1) if used + free else 0.0
+    }
+
+
+def read_cpu_times():
+    """(занято, всего) в тиках из первой строки /proc/stat"""
+    fields = [int(value) for value in read_file('/proc/stat').split('\n', 1)[0].split()[1:]]
+    idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+    return sum(fields) - idle, sum(fields)
+
+
+class ProcessSampler:
+    """Топ процессов по CPU с процентами из разницы тиков между выборками"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.previous = {}
+        self.previous_at = None
+        self.users = {}
+
+    def user(self, uid):
+        if uid not in self.users:
+            try:
+                self.users[uid] = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                self.users[uid] = str(uid)
+        return self.users[uid]
+
+    def sample(self, memory_total):
+        now = time.monotonic()
+        elapsed = now - self.previous_at if self.previous_at is not None else None
+        current = {}
+        rows = []
+
+        for entry in os.scandir('/proc'):
+            if not entry.name.isdigit():
+                continue
+            pid = int(entry.name)
+            try:
+                stat = read_file(f'/proc/{pid}/stat')
+                # Имя в скобках может содержать пробелы и скобки - режем по последней
+                name = stat[stat.index('(') + 1:stat.rindex(')')]
+                fields = stat[stat.rindex(')') + 2:].split()
+                ticks = int(fields[11]) + int(fields[12])
+                start = int(fields[19])
+                rss = int(fields[21]) * PAGE_SIZE
+                state = fields[0]
+                uid = entry.stat().st_uid
+            except (OSError, ValueError, IndexError):
+                continue
+
+            current[pid] = (start, ticks)
+            previous = self.previous.get(pid)
+            if elapsed and previous and previous[0] == start:
+                cpu = (ticks - previous[1]) / CLOCK_TICKS / elapsed * 100
+            else:
+                cpu = 0.0
+            rows.append((cpu, pid, name, state, uid, rss))
+
+        self.previous = current
+        self.previous_at = now
+
+        rows.sort(reverse=True)
+        processes = []
+        for cpu, pid, name, state, uid, rss in rows[:self.limit]:
+            try:
+                cmdline = read_file(f'/proc/{pid}/cmdline')[:CMDLINE_LIMIT].replace('\0', ' ').strip()
+            except OSError:
+                cmdline = ''
+            processes.append({
+                'pid': pid,
+                'name': name,
+                'user': self.user(uid),
+                'cpu': round(cpu, 1),
+                'memory': round(rss / memory_total * 100, 1) if memory_total else 0.0,
+                'state': state,
+                'cmdline': cmdline or f'[{name}]'
+            })
+        return processes
+
+
+def docker_containers():
+    """Контейнеры в формате docker ps; None, если docker на хосте нет"""
+    if shutil.which('docker') is None:
+        return None
+    try:
+        result = subprocess.run(['docker', 'ps', '-a', '--format', '{{json .}}'],
+                                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, universal_newlines=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+
+    containers = []
+    for line in result.stdout.splitlines():
+        try:
+            container = json.loads(line)
+        except ValueError:
+            continue
+        containers.append({
+            'id': container.get('ID', ''),
+            'name': container.get('Names', ''),
+            'image': container.get('Image', ''),
+            'status': container.get('Status', ''),
+            'state': container.get('State', ''),
+            'ports': container.get('Ports', ''),
+            'created': container.get('CreatedAt', '')
+        })
+    return containers
+
+
+def answer_pings():
+    """Отвечает на ping сервера; EOF в stdin - сервер ушёл, завершаемся"""
+    for line in sys.stdin.buffer:
+        command = line.decode(errors='replace').split()
+        if len(command) == 2 and command[0] == 'ping':
+            emit({'type': 'pong', 'id': command[1]})
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сборщик метрик для Cyberkitty Dashboard')
+    parser.add_argument('--interval', type=float, default=5.0, help='секунд между выборками')
+    parser.add_argument('--processes', type=int, default=10, help='сколько процессов в топе')
+    parser.add_argument('--docker-every', type=int, default=3,
+                        help='опрашивать docker раз в N выборок (0 - не опрашивать)')
+    args = parser.parse_args()
+
+    threading.Thread(target=answer_pings, daemon=True).start()
+
+    sampler = ProcessSampler(args.processes)
+    hostname = socket.gethostname()
+    previous_cpu = read_cpu_times()
+    containers = None
+    tick = 0
+
+    while True:
+        started = time.monotonic()
+
+        meminfo = read_meminfo()
+        memory, swap = memory_usage(meminfo)
+        busy, total = read_cpu_times()
+        cpu = (busy - previous_cpu[0]) / (total - previous_cpu[1]) * 100 if total > previous_cpu[1] else 0.0
+        previous_cpu = (busy, total)
+        if args.docker_every and tick % args.docker_every == 0:
+            containers = docker_containers()
+
+        try:
+            emit({
+                'type': 'sample',
+                'time': time.time(),
+                'hostname': hostname,
+                'uptime': float(read_file('/proc/uptime').split()[0]),
+                'load': [float(value) for value in read_file('/proc/loadavg').split()[:3]],
+                'cpu': round(cpu, 1),
+                'memory': memory,
+                'swap': swap,
+                'disk': disk_usage('/'),
+                'processes': sampler.sample(memory['total']),
+                'containers': containers
+            })
+        except BrokenPipeError:
+            return
+
+        tick += 1
+        time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,65 +4,3441 @@
 Простой HTTP сервер для разработки и тестирования дашборда
 """
 
+import contextlib
+import email.utils
+import gzip
+import hashlib
+import http.client
 import http.server
-import socketserver
+import math
+import mimetypes
+import signal
+import socket
+import stat
 # import webbrowser  # Убрано согласно пользовательскому требованию
 import os
 import sys
+import heapq
 import json
+import logging
+import logging.handlers
+import mmap
+import queue
+import re
+import struct
 import subprocess
+import tempfile
+import threading
 import time
+import urllib.parse
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
 from pathlib import Path
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 # Настройки сервера
 PORT = 8082
 HOST = "localhost"
 PUBLIC_DIR = "public"
 
+# Максимум одновременно обрабатываемых запросов (пул потоков)
+MAX_WORKERS = int(os.environ.get('CYBERKITTY_WORKERS', '16'))
+# Сколько воркеров из пула могут занять медленные эндпоинты удалённых хостов,
+# остальные всегда свободны для статики, system-info и помодоро
+SLOW_ENDPOINT_WORKERS = max(1, MAX_WORKERS // 2)
+SLOW_ENDPOINTS = ('/api/docker-containers', '/api/ssh-connections')
+# Сколько ждать завершения активных запросов при остановке сервера
+SHUTDOWN_TIMEOUT = 5.0
+
+# Статика из PUBLIC_DIR держится в памяти вместе со сжатыми копиями
+STATIC_CACHE_MAX_FILE = 2 * 1024 * 1024  # файлы крупнее отдаёт стандартный обработчик
+STATIC_COMPRESS_MIN = 256  # меньше - сжатие не окупает заголовки
+STATIC_COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+# Склеивать локальные стили и скрипты index.html в styles/bundle.css и js/bundle.js
+STATIC_BUNDLE = os.environ.get('CYBERKITTY_BUNDLE', '0') == '1'
+
+# Обои рабочего стола: путь берётся из конфига nitrogen
+NITROGEN_CONFIG = os.path.expanduser('~/.config/nitrogen/bg-saved.cfg')
+# Уменьшенные копии под ширину окна (нужен Pillow), ширина округляется вверх до шага.
+# Кеш в $XDG_CACHE_HOME, а не в общем /tmp, где каталог мог создать другой пользователь
+WALLPAPER_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                                   'cyberkitty-wallpaper')
+WALLPAPER_WIDTH_STEP = 320
+WALLPAPER_MAX_WIDTH = 3840
+WALLPAPER_JPEG_QUALITY = 85
+# Браузер может не перепроверять обои минуту, дальше - условный запрос с ETag
+WALLPAPER_MAX_AGE = 60
+
+# Постоянные ssh соединения (OpenSSH ControlMaster)
+# Сокеты мультиплексирования дают доступ к открытым сессиям, поэтому не в общем /tmp,
+# а в $XDG_RUNTIME_DIR или ~/.ssh, в каталоге 0700 текущего пользователя
+SSH_CONTROL_DIR = (os.path.join(os.environ['XDG_RUNTIME_DIR'], 'cyberkitty-ssh')
+                   if os.environ.get('XDG_RUNTIME_DIR')
+                   else os.path.join(os.path.expanduser('~'), '.ssh', 'cyberkitty'))
+SSH_CONNECT_TIMEOUT = 5
+# Сколько секунд мастер-соединение живёт без команд
+SSH_CONTROL_PERSIST = 600
+
+# Инвентарь удалённых хостов: без файла - встроенный список (пример в hosts.example.json)
+HOSTS_FILE = os.environ.get('CYBERKITTY_HOSTS_FILE', 'hosts.json')
+HOST_DEFAULTS = {
+    'interval': 15,   # секунд между опросами хоста
+    'priority': 0,    # хосты с большим приоритетом опрашиваются первыми
+    'enabled': True,
+    'agent': True     # запускать scripts/remote_agent.py на хосте
+}
+DEFAULT_HOSTS_CONFIG = {
+    'defaults': HOST_DEFAULTS,
+    'hosts': [
+        {'alias': 'got_is_tod', 'name': '🚀 Got Is Tod', 'priority': 10},
+        {'alias': 'azure-aluminium', 'name': '💎 Azure Aluminium'}
+    ]
+}
+# Недоступный хост: интервал опроса удваивается до HOST_MAX_BACKOFF, а после
+# HOST_CIRCUIT_THRESHOLD неудач подряд хост проверяется раз в HOST_CIRCUIT_COOLDOWN
+HOST_MAX_BACKOFF = 300
+HOST_CIRCUIT_THRESHOLD = 3
+HOST_CIRCUIT_COOLDOWN = 600
+# Хосты опрашиваются, только пока дашборд запрашивал их данные за это время
+HOST_IDLE_TIMEOUT = 120
+HOST_SCHEDULER_TICK = 0.5
+# Дедлайн на локальный docker в одном запросе (секунды) и потоки опроса хостов
+REMOTE_REQUEST_DEADLINE = 4.0
+REMOTE_QUERY_WORKERS = 8
+
+# Docker Engine API через unix сокет; без сокета - запасной путь через docker CLI
+DOCKER_SOCKET = (os.environ['DOCKER_HOST'][len('unix://'):]
+                 if os.environ.get('DOCKER_HOST', '').startswith('unix://') else '/var/run/docker.sock')
+# Полная пересинхронизация списка контейнеров (обновляет текст статуса "Up N minutes")
+DOCKER_RESYNC_INTERVAL = 60
+# Пауза перед новой попыткой подключиться к недоступному демону
+DOCKER_RETRY_INTERVAL = 30
+DOCKER_REQUEST_TIMEOUT = 10
+# Поток docker stats на хост: окно скользящего среднего (выборок), через сколько
+# секунд без запросов поток закрывается и как часто перезапускать упавший
+DOCKER_STATS_WINDOW = 10
+DOCKER_STATS_IDLE = 120
+DOCKER_STATS_RETRY = 30
+# Контейнер без новых выборок дольше этого считается удалённым
+DOCKER_STATS_STALE = 15
+
+# Агент на удалённых хостах (scripts/remote_agent.py) присылает метрики по одному
+# ssh каналу вместо отдельных команд; CYBERKITTY_REMOTE_AGENT=0 выключает
+REMOTE_AGENT_ENABLED = os.environ.get('CYBERKITTY_REMOTE_AGENT', '1') != '0'
+REMOTE_AGENT_SCRIPT = Path(__file__).resolve().parent / 'scripts' / 'remote_agent.py'
+REMOTE_AGENT_INTERVAL = 5
+
+# Кеш дорогих эндпоинтов: (сколько секунд ответ свежий, сколько ещё его можно
+# отдавать устаревшим, пока в фоне идёт обновление). Удалённые хосты опрашивает
+# HostScheduler, так что кеш сглаживает только локальный docker
+RESPONSE_CACHE_TTL = {
+    '/api/docker-containers': (2.0, 60.0),
+    '/api/ssh-connections': (2.0, 60.0)
+}
+
+# История метрик в памяти для /api/history: шаг записи и глубина хранения
+HISTORY_INTERVAL = int(os.environ.get('CYBERKITTY_HISTORY_INTERVAL', '5'))
+HISTORY_RETENTION = 6 * 3600
+HISTORY_CAPACITY = HISTORY_RETENTION // HISTORY_INTERVAL
+HISTORY_MAX_METRICS = 200
+HISTORY_DEFAULT_POINTS = 300
+HISTORY_MAX_POINTS = 2000
+
+# Архив метрик на диске (переживает перезапуск): включается каталогом в CYBERKITTY_ARCHIVE_DIR
+ARCHIVE_DIR = os.environ.get('CYBERKITTY_ARCHIVE_DIR', '')
+ARCHIVE_SEGMENT_BYTES = int(os.environ.get('CYBERKITTY_ARCHIVE_SEGMENT_MB', '16')) * 1024 * 1024
+ARCHIVE_MAX_SEGMENTS = int(os.environ.get('CYBERKITTY_ARCHIVE_SEGMENTS', '16'))
+
+# Таблица процессов: сколько строк по умолчанию и максимум за запрос
+PROCESS_DEFAULT_LIMIT = 20
+PROCESS_MAX_LIMIT = 200
+# Сколько последних выборок топа хранить для ответов с диффами (?since=)
+PROCESS_VIEW_HISTORY = 30
+# Откуда брать процессы: procfs - прямое чтение /proc (Linux, быстрее на тысячах
+# PID), psutil - через psutil, auto - procfs на Linux, иначе psutil
+PROCESS_BACKEND = os.environ.get('CYBERKITTY_PROC_BACKEND', 'auto')
+PROC_DIR = '/proc'
+
+# Разделы, доступные в /api/snapshot
+SNAPSHOT_SECTIONS = ('system', 'details', 'temperatures', 'disk', 'processes')
+
+# SSE поток /api/stream: каждый клиент держит одного воркера из пула
+STREAM_MAX_CLIENTS = max(1, MAX_WORKERS // 4)
+# Пинг-комментарий, если событий не было (секунды)
+STREAM_HEARTBEAT = 15.0
+# Через сколько миллисекунд браузер переподключается после обрыва
+STREAM_RETRY_MS = 3000
+STREAM_QUEUE_SIZE = 100
+# Как часто планировщик проверяет, каким темам пора собираться
+STREAM_TICK = 0.5
+
+# Период фонового сбора системных метрик (секунды)
+COLLECTOR_INTERVAL = 1.0
+# Процессы и список разделов собираются реже основных метрик
+PROCESS_SAMPLE_INTERVAL = 2.0
+PARTITIONS_TTL = 30.0
+# Датчики температуры читаются напрямую из sysfs; список устройств
+# перепроверяется раз в TEMPERATURE_RESCAN_INTERVAL секунд
+SYSFS_CLASS_DIR = '/sys/class'
+TEMPERATURE_RESCAN_INTERVAL = 30.0
+# Окна (секунды), за которые считается скорость дисков в /api/disk-activity
+DISK_RATE_WINDOWS = (1, 10, 60)
+# Кольцевой буфер счётчиков покрывает самое длинное окно с запасом
+DISK_IO_HISTORY = int(max(DISK_RATE_WINDOWS) / COLLECTOR_INTERVAL) + 4
+# Сколько ждать первого снимка, если запрос пришёл сразу после старта
+COLLECTOR_STARTUP_TIMEOUT = 3.0
+
+# Логирование: строки пишет отдельный поток из очереди, обработчики запросов не ждут вывод
+LOG_LEVEL = os.environ.get('CYBERKITTY_LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.environ.get('CYBERKITTY_LOG_FORMAT', 'text')  # text или json
+LOG_QUEUE_SIZE = 10000
+# Строки access-лога на маршрут: сразу до LOG_ROUTE_BURST, дальше LOG_ROUTE_RATE в секунду
+LOG_ROUTE_RATE = float(os.environ.get('CYBERKITTY_LOG_ROUTE_RATE', '0.2'))
+LOG_ROUTE_BURST = 5
+
+# Инструментирование (/metrics, /api/debug/timings): границы корзин гистограмм
+# в секундах и сколько последних замеров серии хранить для перцентилей
+TIMING_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TIMING_RECENT_SAMPLES = 512
+
+
+log = logging.getLogger('cyberkitty')
+
+# Стандартные поля LogRecord - всё остальное пришло через extra и попадает в JSON
+LOG_RECORD_FIELDS = set(logging.makeLogRecord({}).__dict__) | {'message', 'asctime'}
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Кладёт записи в ограниченную очередь и никогда не ждёт писателя
+
+    Если очередь полна (терминал или journal не успевают), запись
+    отбрасывается, а число потерянных записей сообщается следующей строкой.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self._unreported = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                self._unreported += 1
+            return
+
+        if self._unreported:
+            with self._lock:
+                unreported, self._unreported = self._unreported, 0
+            try:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    'name': log.name, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f"⚠️ Очередь лога переполнена, пропущено записей: {unreported}",
+                    'dropped': unreported
+                }))
+            except queue.Full:
+                with self._lock:
+                    self._unreported += unreported
+
+
+class JsonLogFormatter(logging.Formatter):
+    """Одна JSON строка на запись: время, уровень, сообщение и поля из extra"""
+
+    def format(self, record):
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'message': record.getMessage()
+        }
+        entry.update((key, value) for key, value in record.__dict__.items() if key not in LOG_RECORD_FIELDS)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class LogRateLimiter:
+    """Ограничение строк лога по ключу (маршруту): burst сразу, дальше rate в секунду
+
+    allow() возвращает (можно писать, сколько строк пропущено с прошлой записи).
+    """
+
+    def __init__(self, rate=LOG_ROUTE_RATE, burst=LOG_ROUTE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, suppressed = self._buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                return False, 0
+            self._buckets[key] = (tokens - 1, now, 0)
+            return True, suppressed
+
+
+access_log_limiter = LogRateLimiter()
+
+
+def setup_logging(level=LOG_LEVEL, json_format=LOG_FORMAT == 'json'):
+    """Логгер cyberkitty пишет через очередь в отдельном потоке; возвращает QueueListener"""
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonLogFormatter() if json_format else logging.Formatter('%(message)s'))
+    handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+
+    log.handlers = [handler]
+    log.setLevel(getattr(logging, level.upper(), logging.INFO))
+    log.propagate = False
+
+    listener = logging.handlers.QueueListener(handler.queue, output)
+    listener.start()
+    return listener
+
+
+class Instrumentation:
+    """Счётчики и гистограммы времени для /metrics и /api/debug/timings
+
+    Серии хранятся по (семейство, метки): накопленные корзины TIMING_BUCKETS
+    для Prometheus и последние TIMING_RECENT_SAMPLES замеров для точных
+    перцентилей в JSON. Запись - одна блокировка и несколько сложений,
+    её можно звать из любого потока на горячем пути.
+    """
+
+    FAMILIES = {
+        'requests': ('cyberkitty_http_request_duration_seconds', 'histogram',
+                     'Время обработки HTTP запросов'),
+        'collectors': ('cyberkitty_collector_duration_seconds', 'histogram',
+                       'Время сборщиков: psutil, процессы, docker, опрос ssh хостов'),
+        'json_encode': ('cyberkitty_json_encode_seconds', 'histogram',
+                        'Время сериализации JSON ответов и событий SSE'),
+        'cache': ('cyberkitty_response_cache_requests_total', 'counter',
+                  'Обращения к кешу ответов по результату HIT/STALE/MISS'),
+        'not_modified': ('cyberkitty_api_not_modified_total', 'counter',
+                         'Ответы 304 на запросы к API с совпавшим ETag')
+    }
+
+    def __init__(self, buckets=TIMING_BUCKETS, recent=TIMING_RECENT_SAMPLES):
+        self.buckets = buckets
+        self.recent = recent
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._series = {}
+        self._in_flight = 0
+
+    def observe(self, family, labels, seconds):
+        key = (family, tuple(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0,
+                    'recent': deque(maxlen=self.recent)
+                }
+            series['sum'] += seconds
+            series['count'] += 1
+            series['recent'].append(seconds)
+            for number, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series['buckets'][number] += 1
+                    break
+
+    def count(self, family, labels, value=1):
+        key = (family, tuple(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, {'count': 0})
+            series['count'] += value
+
+    @contextlib.contextmanager
+    def timed(self, collector):
+        """Замер сборщика; работает и как with, и как декоратор"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('collectors', {'collector': collector}, time.perf_counter() - started)
+
+    def request_started(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def in_flight(self):
+        with self._lock:
+            return self._in_flight
+
+    def _snapshot(self):
+        with self._lock:
+            return [(family, labels, dict(series, recent=list(series['recent'])) if 'recent' in series
+                     else dict(series))
+                    for (family, labels), series in sorted(self._series.items())]
+
+    @staticmethod
+    def _format_labels(labels):
+        escaped = [(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                   for name, value in labels]
+        return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}' if escaped else ''
+
+    def prometheus(self, gauges):
+        """Текстовый формат Prometheus; gauges - {(имя, справка): значение}"""
+        lines = []
+        snapshot = self._snapshot()
+        for family, (name, kind, description) in self.FAMILIES.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for series_family, labels, series in snapshot:
+                if series_family != family:
+                    continue
+                if kind == 'counter':
+                    lines.append(f'{name}{self._format_labels(labels)} {series["count"]}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets, series['buckets']):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{self._format_labels(labels + (("le", repr(bound)),))} {cumulative}')
+                lines.append(f'{name}_bucket{self._format_labels(labels + (("le", "+Inf"),))} {series["count"]}')
+                lines.append(f'{name}_sum{self._format_labels(labels)} {series["sum"]:.6f}')
+                lines.append(f'{name}_count{self._format_labels(labels)} {series["count"]}')
+
+        for (name, description), value in gauges.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _percentile(ordered, fraction):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+    def timings(self):
+        """Сводка для /api/debug/timings: перцентили по последним замерам, доли попаданий кеша и число 304"""
+        result = {'uptime': round(time.time() - self.started, 1), 'in_flight': self.in_flight(),
+                  'requests': [], 'collectors': [], 'json_encode': [], 'cache': {}, 'not_modified': {}}
+        for family, labels, series in self._snapshot():
+            if family == 'not_modified':
+                result['not_modified'][dict(labels)['route']] = series['count']
+                continue
+            if family == 'cache':
+                labels = dict(labels)
+                result['cache'].setdefault(labels['key'], {})[labels['result']] = series['count']
+                continue
+            ordered = sorted(series['recent'])
+            result[family].append(dict(labels, **{
+                'count': series['count'],
+                'avg_ms': round(series['sum'] / series['count'] * 1000, 3),
+                'p50_ms': round(self._percentile(ordered, 0.5) * 1000, 3),
+                'p90_ms': round(self._percentile(ordered, 0.9) * 1000, 3),
+                'p99_ms': round(self._percentile(ordered, 0.99) * 1000, 3),
+                'max_ms': round(ordered[-1] * 1000, 3)
+            }))
+
+        for key, results in result['cache'].items():
+            total = sum(results.values())
+            # STALE тоже отдаётся без ожидания загрузки
+            results['hit_ratio'] = round((results.get('HIT', 0) + results.get('STALE', 0)) / total, 3)
+        for family in ('requests', 'collectors', 'json_encode'):
+            result[family].sort(key=lambda row: row['count'] * row['avg_ms'], reverse=True)
+        return result
+
+
+instrumentation = Instrumentation()
+
+
+class MetricsCollector(threading.Thread):
+    """Фоновый сборщик системных метрик.
+
+    Раз в COLLECTOR_INTERVAL секунд снимает CPU, память, диски и температуры
+    и хранит последний снимок в памяти, чтобы API отвечал без ожидания psutil.
+    """
+
+    def __init__(self, interval=COLLECTOR_INTERVAL):
+        super().__init__(name='metrics-collector', daemon=True)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._ready = threading.Event()
+        self._stop_event = threading.Event()
+        self.disk_io = DiskIORates()
+        self.temperature_sensors = SysfsTemperatureReader()
+        self._temperatures_warned = False
+        self._partitions = []
+        self._partitions_at = None
+        self._processes_at = None
+        self._history_at = None
+
+    def run(self):
+        if psutil is not None:
+            # Первый вызов cpu_percent(None) всегда 0.0 - просто запоминаем точку отсчёта
+            psutil.cpu_percent(interval=None)
+            process_tracker.sample()
+            self._stop_event.wait(0.5)
+
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            try:
+                self.collect()
+            except Exception as e:
+                log.error(f"❌ Ошибка фонового сбора метрик: {e}")
+            if self._processes_at is None or started - self._processes_at >= PROCESS_SAMPLE_INTERVAL:
+                self._processes_at = started
+                try:
+                    with instrumentation.timed('processes'):
+                        process_tracker.sample()
+                except Exception as e:
+                    log.error(f"❌ Ошибка сбора процессов: {e}")
+            elapsed = time.monotonic() - started
+            self._stop_event.wait(max(0.0, self.interval - elapsed))
+
+    def stop(self):
+        self._stop_event.set()
+
+    def collect(self):
+        """Снимает все метрики и атомарно подменяет текущий снимок"""
+        if psutil is not None:
+            snapshot = {}
+            for section, collect in (('system', self.collect_system_info),
+                                     ('details', self.collect_system_details),
+                                     ('temperatures', self.collect_temperatures),
+                                     ('disk', self.collect_disk_activity)):
+                with instrumentation.timed(f'psutil.{section}'):
+                    snapshot[section] = collect()
+        else:
+            snapshot = dict(FALLBACK_SNAPSHOT)
+            # Датчикам sysfs psutil не нужен - тестовые температуры, только если их нет
+            temperatures = self.temperature_sensors.read()
+            if temperatures is not None:
+                snapshot['temperatures'] = temperatures
+
+        snapshot['timestamp'] = time.time()
+        snapshot['monotonic'] = time.monotonic()
+
+        with self._lock:
+            self._snapshot = snapshot
+        self._ready.set()
+
+        if self._history_at is None or snapshot['monotonic'] - self._history_at >= HISTORY_INTERVAL:
+            self._history_at = snapshot['monotonic']
+            self.record_history(snapshot)
+
+    def record_history(self, snapshot):
+        """Кладёт основные значения снимка в историю метрик"""
+        values = {
+            'cpu': snapshot['system']['cpu'],
+            'memory': snapshot['system']['memory'],
+            'swap': snapshot['details']['swap']['percent']
+        }
+        for name, sensor in snapshot['temperatures'].items():
+            values[f'temp.{name}'] = sensor['current']
+
+        if psutil is not None:
+            rates = self.disk_io.rates((HISTORY_INTERVAL,))
+        else:
+            rates = {device: {f'{HISTORY_INTERVAL}s': device_rates[f'{DISK_RATE_WINDOWS[0]}s']}
+                     for device, device_rates in snapshot['disk']['rates'].items()}
+        for device, device_rates in rates.items():
+            rate = device_rates.get(f'{HISTORY_INTERVAL}s')
+            if rate is not None:
+                values[f'disk.{device}.read_bps'] = rate['read_bps']
+                values[f'disk.{device}.write_bps'] = rate['write_bps']
+
+        record_metrics(snapshot['timestamp'], values)
+
+    def snapshot(self, timeout=COLLECTOR_STARTUP_TIMEOUT):
+        """Последний снимок или None, если сборщик ещё ничего не собрал"""
+        self._ready.wait(timeout)
+        with self._lock:
+            return self._snapshot
+
+    def collect_system_info(self):
+        return {
+            'cpu': round(psutil.cpu_percent(interval=None), 1),
+            'memory': round(psutil.virtual_memory().percent, 1),
+            'disk': round(psutil.disk_usage('/').percent, 1)
+        }
+
+    def collect_system_details(self):
+        # Получаем детальную информацию о памяти
+        memory = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        cpu_freq = psutil.cpu_freq()
+
+        return {
+            'memory': {
+                'total': round(memory.total / (1024**3), 2),  # GB
+                'available': round(memory.available / (1024**3), 2),  # GB
+                'used': round((memory.total - memory.available) / (1024**3), 2),  # GB
+                'percent': round(memory.percent, 1),
+                'cached': round(getattr(memory, 'cached', 0) / (1024**3), 2),  # GB
+                'buffers': round(getattr(memory, 'buffers', 0) / (1024**3), 2)  # GB
+            },
+            'swap': {
+                'total': round(swap.total / (1024**3), 2),  # GB
+                'used': round(swap.used / (1024**3), 2),  # GB
+                'percent': round(swap.percent, 1)
+            },
+            'uptime': round(psutil.boot_time()),
+            'cpu_count': psutil.cpu_count(),
+            'cpu_freq': round(cpu_freq.current) if cpu_freq else 0
+        }
+
+    def collect_temperatures(self):
+        """Температуры {датчик: {current, high, critical}}; пустой словарь - датчиков нет"""
+        temperatures = self.temperature_sensors.read()
+        if temperatures is not None:
+            return temperatures
+
+        # Не Linux или sysfs без датчиков - пробуем psutil
+        temperatures = {}
+        if hasattr(psutil, 'sensors_temperatures'):
+            try:
+                temps = psutil.sensors_temperatures()
+            except Exception as e:
+                if not self._temperatures_warned:
+                    log.warning(f"⚠️ Датчики температуры недоступны: {e}")
+                    self._temperatures_warned = True
+                return temperatures
+
+            for name, entries in temps.items():
+                for entry in entries:
+                    temp_name = f"{name}_{entry.label}" if entry.label else name
+                    temperatures[temp_name] = {
+                        'current': round(entry.current, 1),
+                        'high': entry.high,
+                        'critical': entry.critical
+                    }
+
+        return temperatures
+
+    def collect_disk_activity(self):
+        # Получаем I/O статистику дисков и кладём её в кольцевой буфер
+        disk_io = psutil.disk_io_counters(perdisk=True) or {}
+        self.disk_io.add(time.monotonic(), disk_io)
+        disk_usage = {}
+
+        for device, io_stats in disk_io.items():
+            disk_usage[device] = {
+                'read_bytes': io_stats.read_bytes,
+                'write_bytes': io_stats.write_bytes,
+                'read_count': io_stats.read_count,
+                'write_count': io_stats.write_count,
+                'read_time': io_stats.read_time,
+                'write_time': io_stats.write_time
+            }
+
+        # Обход точек монтирования медленный - обновляем список разделов редко
+        now = time.monotonic()
+        if self._partitions_at is None or now - self._partitions_at >= PARTITIONS_TTL:
+            self._partitions = self.collect_partitions()
+            self._partitions_at = now
+
+        return {
+            'io_stats': disk_usage,
+            'rates': self.disk_io.rates(DISK_RATE_WINDOWS),
+            'partitions': self._partitions
+        }
+
+    def collect_partitions(self):
+        # Получаем использование основных разделов
+        partitions = []
+        for partition in psutil.disk_partitions():
+            try:
+                usage = psutil.disk_usage(partition.mountpoint)
+                partitions.append({
+                    'device': partition.device,
+                    'mountpoint': partition.mountpoint,
+                    'fstype': partition.fstype,
+                    'total': round(usage.total / (1024**3), 2),  # GB
+                    'used': round(usage.used / (1024**3), 2),   # GB
+                    'free': round(usage.free / (1024**3), 2),   # GB
+                    'percent': round((usage.used / usage.total) * 100, 1) if usage.total else 0.0
+                })
+            except (PermissionError, OSError):
+                continue
+        return partitions
+
+
+class SysfsTemperatureReader:
+    """Чтение температур из /sys/class/hwmon (или thermal_zone) без обхода sysfs на каждом сборе
+
+    Список датчиков с подписями и порогами собирается один раз, файлы
+    temp*_input остаются открытыми и читаются через os.pread. Набор устройств
+    перепроверяется раз в TEMPERATURE_RESCAN_INTERVAL или при ошибке чтения
+    (устройство пропало).
+    """
+
+    def __init__(self, class_dir=SYSFS_CLASS_DIR):
+        self.hwmon_dir = os.path.join(class_dir, 'hwmon')
+        self.thermal_dir = os.path.join(class_dir, 'thermal')
+        self._sensors = []
+        self._devices = None
+        self._checked_at = None
+
+    @staticmethod
+    def _read_text(path):
+        try:
+            with open(path) as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _read_millidegrees(self, path):
+        value = self._read_text(path)
+        try:
+            return round(int(value) / 1000, 1) if value is not None else None
+        except ValueError:
+            return None
+
+    def _list_devices(self):
+        devices = []
+        for directory, prefix in ((self.hwmon_dir, 'hwmon'), (self.thermal_dir, 'thermal_zone')):
+            try:
+                devices.extend(os.path.join(directory, entry) for entry in os.listdir(directory)
+                               if entry.startswith(prefix))
+            except OSError:
+                pass
+        return sorted(devices)
+
+    def _scan_hwmon(self, device):
+        name = self._read_text(os.path.join(device, 'name')) or os.path.basename(device)
+        sensors = []
+        try:
+            inputs = sorted(entry for entry in os.listdir(device)
+                            if entry.startswith('temp') and entry.endswith('_input'))
+        except OSError:
+            return sensors
+        for entry in inputs:
+            base = os.path.join(device, entry[:-len('_input')])
+            label = self._read_text(base + '_label')
+            sensors.append((f"{name}_{label}" if label else name, os.path.join(device, entry),
+                            self._read_millidegrees(base + '_max'),
+                            self._read_millidegrees(base + '_crit')))
+        return sensors
+
+    def _scan_thermal_zone(self, zone):
+        name = self._read_text(os.path.join(zone, 'type')) or os.path.basename(zone)
+        high = critical = None
+        trip = 0
+        while os.path.exists(os.path.join(zone, f'trip_point_{trip}_type')):
+            trip_type = self._read_text(os.path.join(zone, f'trip_point_{trip}_type'))
+            value = self._read_millidegrees(os.path.join(zone, f'trip_point_{trip}_temp'))
+            if trip_type == 'critical':
+                critical = value
+            elif trip_type == 'hot':
+                high = value
+            trip += 1
+        return [(name, os.path.join(zone, 'temp'), high, critical)]
+
+    def _close(self):
+        for _, fd, _, _ in self._sensors:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._sensors = []
+
+    def rescan(self):
+        """Пересобирает список датчиков и переоткрывает их файлы"""
+        self._close()
+        self._devices = self._list_devices()
+        hwmon = [device for device in self._devices if device.startswith(self.hwmon_dir)]
+        found = []
+        for device in hwmon:
+            found.extend(self._scan_hwmon(device))
+        # Зоны thermal обычно дублируют hwmon - берём их, только если hwmon пуст
+        if not found:
+            for zone in self._devices:
+                found.extend(self._scan_thermal_zone(zone))
+
+        names = {}
+        for name, path, high, critical in found:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except OSError:
+                continue
+            # Несколько датчиков без подписи у одного устройства - нумеруем
+            names[name] = names.get(name, 0) + 1
+            key = name if names[name] == 1 else f'{name}_{names[name]}'
+            self._sensors.append((key, fd, high, critical))
+
+    def read(self):
+        """{датчик: {current, high, critical}} или None, если в sysfs датчиков нет"""
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= TEMPERATURE_RESCAN_INTERVAL:
+            self._checked_at = now
+            if self._list_devices() != self._devices:
+                self.rescan()
+
+        temperatures = {}
+        for name, fd, high, critical in self._sensors:
+            try:
+                value = os.pread(fd, 32, 0)
+                temperatures[name] = {
+                    'current': round(int(value) / 1000, 1),
+                    'high': high,
+                    'critical': critical
+                }
+            except (OSError, ValueError):
+                # Датчик пропал или не отвечает - при следующем чтении пересобираем список,
+                # даже если узел hwmon остался на месте
+                self._checked_at = None
+                self._devices = None
+        return temperatures if self._sensors else None
+
+
+class DiskIORates:
+    """Скорость дисков по кольцевому буферу счётчиков.
+
+    Для каждого устройства хранит последние DISK_IO_HISTORY отметок времени
+    со счётчиками и считает байты/с, IOPS и процент занятости за окно,
+    не завися от того, как часто клиент опрашивает API.
+    """
+
+    def __init__(self, history=DISK_IO_HISTORY):
+        self.history = history
+        self._lock = threading.Lock()
+        self._samples = {}
+
+    def add(self, timestamp, counters):
+        with self._lock:
+            for device, io_stats in counters.items():
+                samples = self._samples.get(device)
+                if samples is None:
+                    samples = self._samples[device] = deque(maxlen=self.history)
+                samples.append((
+                    timestamp,
+                    io_stats.read_bytes,
+                    io_stats.write_bytes,
+                    io_stats.read_count,
+                    io_stats.write_count,
+                    # busy_time есть только в Linux
+                    getattr(io_stats, 'busy_time', None)
+                ))
+            for device in set(self._samples) - set(counters):
+                del self._samples[device]
+
+    def rates(self, windows):
+        """{устройство: {'10s': {read_bps, write_bps, read_iops, write_iops, busy_percent}}}"""
+        with self._lock:
+            samples = {device: list(buffer) for device, buffer in self._samples.items()}
+
+        result = {}
+        for device, buffer in samples.items():
+            if len(buffer) < 2:
+                continue
+            latest = buffer[-1]
+            device_rates = {}
+            for window in windows:
+                # Самая свежая отметка не позже начала окна (с допуском на дрожание
+                # интервала сборщика), иначе самая старая
+                base = buffer[0]
+                for sample in reversed(buffer[:-1]):
+                    if latest[0] - sample[0] >= window - COLLECTOR_INTERVAL / 2:
+                        base = sample
+                        break
+
+                elapsed = latest[0] - base[0]
+                if elapsed <= 0:
+                    continue
+                busy = None
+                if latest[5] is not None and base[5] is not None:
+                    busy = round(min(100.0, (latest[5] - base[5]) / (elapsed * 1000) * 100), 1)
+                device_rates[f'{window}s'] = {
+                    'read_bps': round((latest[1] - base[1]) / elapsed),
+                    'write_bps': round((latest[2] - base[2]) / elapsed),
+                    'read_iops': round((latest[3] - base[3]) / elapsed, 1),
+                    'write_iops': round((latest[4] - base[4]) / elapsed, 1),
+                    'busy_percent': busy,
+                    'elapsed': round(elapsed, 2)
+                }
+            result[device] = device_rates
+        return result
+
+
+class TimeSeriesRing:
+    """Кольцевой буфер (время, значение) фиксированного размера на массивах array('d')"""
+
+    def __init__(self, capacity=HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.start = 0
+        self.count = 0
+
+    def append(self, timestamp, value):
+        if self.count < self.capacity:
+            index = (self.start + self.count) % self.capacity
+            self.count += 1
+        else:
+            index = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.timestamps[index] = timestamp
+        self.values[index] = value
+
+    def since(self, timestamp):
+        """Точки не старше timestamp в хронологическом порядке"""
+        # Бинарный поиск по логическим индексам кольца
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamps[(self.start + middle) % self.capacity] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+
+        first = (self.start + low) % self.capacity
+        length = self.count - low
+        if first + length <= self.capacity:
+            return self.timestamps[first:first + length], self.values[first:first + length]
+        tail = self.capacity - first
+        return (self.timestamps[first:] + self.timestamps[:length - tail],
+                self.values[first:] + self.values[:length - tail])
+
+
+def downsample_lttb(timestamps, values, threshold):
+    """Largest-Triangle-Three-Buckets: сохраняет форму графика при прореживании"""
+    length = len(timestamps)
+    if threshold >= length:
+        return list(zip(timestamps, values))
+    if threshold < 3:
+        # Корзин между крайними точками нет - остаются только сами крайние
+        return [(timestamps[0], values[0]), (timestamps[-1], values[-1])][2 - max(threshold, 0):]
+
+    sampled = [(timestamps[0], values[0])]
+    bucket_size = (length - 2) / (threshold - 2)
+    previous = 0
+
+    for bucket in range(threshold - 2):
+        # Средняя точка следующей корзины - третья вершина треугольника
+        next_start = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, length)
+        span = next_end - next_start
+        average_t = sum(timestamps[next_start:next_end]) / span
+        average_v = sum(values[next_start:next_end]) / span
+
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        prev_t, prev_v = timestamps[previous], values[previous]
+        chosen, max_area = start, -1.0
+        for index in range(start, end):
+            area = abs((prev_t - average_t) * (values[index] - prev_v)
+                       - (prev_t - timestamps[index]) * (average_v - prev_v))
+            if area > max_area:
+                chosen, max_area = index, area
+
+        sampled.append((timestamps[chosen], values[chosen]))
+        previous = chosen
+
+    sampled.append((timestamps[-1], values[-1]))
+    return sampled
+
+
+def downsample_minmax(timestamps, values, threshold):
+    """Минимум и максимум каждой корзины: не теряет пики"""
+    length = len(timestamps)
+    buckets = threshold // 2
+    if threshold >= length or buckets < 1:
+        return list(zip(timestamps, values))
+
+    sampled = []
+    for bucket in range(buckets):
+        start = bucket * length // buckets
+        end = (bucket + 1) * length // buckets
+        if start >= end:
+            continue
+        segment = range(start, end)
+        low = min(segment, key=values.__getitem__)
+        high = max(segment, key=values.__getitem__)
+        for index in sorted({low, high}):
+            sampled.append((timestamps[index], values[index]))
+    return sampled
+
+
+DOWNSAMPLERS = {
+    'lttb': downsample_lttb,
+    'minmax': downsample_minmax
+}
+
+
+class MetricHistory:
+    """История метрик в памяти: по кольцевому буферу на каждую метрику"""
+
+    def __init__(self, capacity=HISTORY_CAPACITY, max_metrics=HISTORY_MAX_METRICS):
+        self.capacity = capacity
+        self.max_metrics = max_metrics
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def record(self, timestamp, values):
+        """Добавляет значения {метрика: число} с общей отметкой времени"""
+        with self._lock:
+            for name, value in values.items():
+                if value is None:
+                    continue
+                series = self._series.get(name)
+                if series is None:
+                    if len(self._series) >= self.max_metrics:
+                        continue
+                    series = self._series[name] = TimeSeriesRing(self.capacity)
+                series.append(timestamp, float(value))
+
+    def metrics(self):
+        with self._lock:
+            return sorted(self._series)
+
+    def covers(self, name, since):
+        """Есть ли в памяти точки метрики с момента since
+
+        После перезапуска кольцо начинается со старта сервера, а старше
+        HISTORY_RETENTION оно не хранит вовсе.
+        """
+        with self._lock:
+            series = self._series.get(name)
+            if series is None or series.count == 0:
+                return False
+            return series.timestamps[series.start] <= since + HISTORY_INTERVAL
+
+    def query(self, name, range_seconds, points=HISTORY_DEFAULT_POINTS, mode='lttb'):
+        """Не больше points точек [время, значение] за последние range_seconds секунд
+
+        Возвращает None для неизвестной метрики.
+        """
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                return None
+            timestamps, values = series.since(time.time() - range_seconds)
+
+        sampled = DOWNSAMPLERS[mode](timestamps, values, points)
+        return [[round(timestamp, 1), round(value, 2)] for timestamp, value in sampled]
+
+
+metric_history = MetricHistory()
+
+
+class MetricArchive:
+    """Архив метрик в сегментах фиксированного размера, отображённых в память
+
+    Запись - 16 байт: время (double), id метрики (uint32), значение (float32).
+    Записи в сегменте идут по возрастанию времени, поэтому поиск диапазона -
+    бинарный поиск без разбора всего файла. Заголовок сегмента хранит число
+    записей, так что при старте файл не перечитывается. Имена метрик - в metrics.json.
+    """
+
+    RECORD = struct.Struct('<dIf')
+    HEADER = struct.Struct('<4sHHQdd')
+    HEADER_SIZE = 64
+    MAGIC = b'CKMA'
+    VERSION = 1
+
+    def __init__(self, directory, segment_bytes=ARCHIVE_SEGMENT_BYTES, max_segments=ARCHIVE_MAX_SEGMENTS):
+        self.directory = Path(directory)
+        self.capacity = (segment_bytes - self.HEADER_SIZE) // self.RECORD.size
+        self.max_segments = max(2, max_segments)
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._segment = None
+        self._file = None
+        self._mmap = None
+        self._count = 0
+        self._first = 0.0
+
+    def open(self):
+        """Открывает последний сегмент на дозапись
+
+        Если каталог недоступен, архив остаётся выключенным, а сервер работает дальше.
+        """
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            index_file = self.directory / 'metrics.json'
+            if index_file.exists():
+                self._ids = json.loads(index_file.read_text(encoding='utf-8'))
+
+            segments = self.segments()
+            with self._lock:
+                if not (segments and self._open_segment(segments[-1])):
+                    self._create_segment(self._next_segment_path(segments))
+        except (OSError, ValueError) as e:
+            log.warning(f"⚠️ Архив метрик отключён: {e}")
+            return False
+
+        log.info(f"🗄️ Архив метрик: {self.directory} ({self._count} записей в {self._segment.name})")
+        return True
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+    def segments(self):
+        return sorted(self.directory.glob('metrics-*.seg'))
+
+    def _next_segment_path(self, segments):
+        number = int(segments[-1].stem.split('-')[1]) + 1 if segments else 1
+        return self.directory / f'metrics-{number:06d}.seg'
+
+    def _open_segment(self, path):
+        try:
+            handle = open(path, 'r+b')
+        except OSError as e:
+            log.warning(f"⚠️ Не удалось открыть сегмент архива {path.name}: {e}")
+            return False
+        try:
+            archive_map = mmap.mmap(handle.fileno(), 0)
+        except (OSError, ValueError) as e:
+            log.warning(f"⚠️ Не удалось отобразить сегмент архива {path.name}: {e}")
+            handle.close()
+            return False
+        magic, version, record_size, count, first, _ = self.HEADER.unpack_from(archive_map, 0)
+        if (magic != self.MAGIC or version != self.VERSION or record_size != self.RECORD.size
+                or len(archive_map) != self.HEADER_SIZE + self.capacity * self.RECORD.size
+                or count > self.capacity):
+            # Чужой или повреждённый файл не трогаем - пишем в новый сегмент
+            log.warning(f"⚠️ Сегмент архива {path.name} не подходит, начинаю новый")
+            archive_map.close()
+            handle.close()
+            return False
+        self._segment, self._file, self._mmap = path, handle, archive_map
+        self._count, self._first = count, first
+        return True
+
+    def _create_segment(self, path):
+        with open(path, 'wb') as handle:
+            handle.truncate(self.HEADER_SIZE + self.capacity * self.RECORD.size)
+            handle.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.RECORD.size, 0, 0.0, 0.0))
+        self._open_segment(path)
+
+    def _close_segment(self):
+        if self._mmap is not None:
+            self._mmap.flush()
+            self._mmap.close()
+            self._file.close()
+            self._mmap = self._file = None
+
+    def _rotate(self):
+        self._close_segment()
+        segments = self.segments()
+        self._create_segment(self._next_segment_path(segments))
+        for old in self.segments()[:-self.max_segments]:
+            old.unlink()
+
+    def _metric_id(self, name):
+        metric_id = self._ids.get(name)
+        if metric_id is None:
+            metric_id = self._ids[name] = len(self._ids)
+            # Индекс меняется редко - переписываем целиком через временный файл
+            index_file = self.directory / 'metrics.json'
+            temp_file = index_file.with_suffix('.tmp')
+            temp_file.write_text(json.dumps(self._ids), encoding='utf-8')
+            os.replace(temp_file, index_file)
+        return metric_id
+
+    def append(self, timestamp, values):
+        """Дописывает значения {метрика: число} с общей отметкой времени"""
+        with self._lock:
+            if self._mmap is None:
+                return
+            for name, value in values.items():
+                if value is None:
+                    continue
+                if self._count >= self.capacity:
+                    self._rotate()
+                if self._count == 0:
+                    self._first = timestamp
+                offset = self.HEADER_SIZE + self._count * self.RECORD.size
+                self.RECORD.pack_into(self._mmap, offset, timestamp, self._metric_id(name), value)
+                self._count += 1
+            # Счётчик обновляется после самих записей - оборванная запись не попадёт в чтение
+            self.HEADER.pack_into(self._mmap, 0, self.MAGIC, self.VERSION, self.RECORD.size,
+                                  self._count, self._first, timestamp)
+
+    def metrics(self):
+        with self._lock:
+            return sorted(self._ids)
+
+    def _scan_segment(self, path, metric_id, since, timestamps, values):
+        with open(path, 'rb') as handle:
+            archive_map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, record_size, count, _, last = self.HEADER.unpack_from(archive_map, 0)
+            # Чужой или повреждённый файл, как и при открытии, не читаем
+            if magic != self.MAGIC or version != self.VERSION or record_size != self.RECORD.size:
+                return
+            count = min(count, (len(archive_map) - self.HEADER_SIZE) // self.RECORD.size)
+            if count == 0 or last < since:
+                return
+
+            # Первая запись не старше since
+            low, high = 0, count
+            while low < high:
+                middle = (low + high) // 2
+                if struct.unpack_from('<d', archive_map, self.HEADER_SIZE + middle * self.RECORD.size)[0] < since:
+                    low = middle + 1
+                else:
+                    high = middle
+
+            start = self.HEADER_SIZE + low * self.RECORD.size
+            end = self.HEADER_SIZE + count * self.RECORD.size
+            with memoryview(archive_map) as view:
+                for timestamp, record_id, value in self.RECORD.iter_unpack(view[start:end]):
+                    if record_id == metric_id:
+                        timestamps.append(timestamp)
+                        values.append(value)
+        finally:
+            archive_map.close()
+
+    def query(self, name, range_seconds, points=HISTORY_DEFAULT_POINTS, mode='lttb'):
+        """То же, что MetricHistory.query, но по архиву на диске"""
+        with self._lock:
+            metric_id = self._ids.get(name)
+        if metric_id is None:
+            return None
+
+        since = time.time() - range_seconds
+        timestamps, values = array('d'), array('d')
+        for path in self.segments():
+            try:
+                self._scan_segment(path, metric_id, since, timestamps, values)
+            except (OSError, ValueError, struct.error):
+                # Сегмент могли удалить ротацией прямо во время чтения
+                continue
+
+        sampled = DOWNSAMPLERS[mode](timestamps, values, points)
+        return [[round(timestamp, 1), round(value, 2)] for timestamp, value in sampled]
+
+
+metric_archive = MetricArchive(ARCHIVE_DIR) if ARCHIVE_DIR else None
+
+
+def record_metrics(timestamp, values):
+    """Пишет значения в историю в памяти и, если включён, в архив на диске"""
+    metric_history.record(timestamp, values)
+    if metric_archive is not None:
+        metric_archive.append(timestamp, values)
+
+
+def parse_duration(text):
+    """'90', '90s', '15m', '1h', '7d' -> секунды"""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    text = text.strip().lower()
+    if text and text[-1] in units:
+        seconds = float(text[:-1]) * units[text[-1]]
+    else:
+        seconds = float(text)
+    if not math.isfinite(seconds) or seconds <= 0:
+        raise ValueError(f'некорректный интервал: {text}')
+    return seconds
+
+
+# Тестовые данные, если psutil не установлен
+FALLBACK_SNAPSHOT = {
+    'system': {
+        'cpu': 25.5,
+        'memory': 45.2,
+        'disk': 67.8
+    },
+    'details': {
+        'memory': {
+            'total': 16.0,
+            'available': 8.5,
+            'used': 7.5,
+            'percent': 46.9,
+            'cached': 2.3,
+            'buffers': 0.8
+        },
+        'swap': {
+            'total': 8.0,
+            'used': 1.2,
+            'percent': 15.0
+        },
+        'uptime': 1640995200,
+        'cpu_count': 8,
+        'cpu_freq': 3400
+    },
+    'temperatures': {
+        'cpu_package': {'current': 45.0, 'high': 80.0, 'critical': 90.0},
+        'cpu_core0': {'current': 42.0, 'high': 80.0, 'critical': 90.0},
+        'cpu_core1': {'current': 44.0, 'high': 80.0, 'critical': 90.0},
+        'nvme': {'current': 38.0, 'high': 70.0, 'critical': 80.0}
+    },
+    'disk': {
+        'io_stats': {
+            'nvme0n1': {
+                'read_bytes': 12345678901,
+                'write_bytes': 9876543210,
+                'read_count': 123456,
+                'write_count': 98765,
+                'read_time': 45678,
+                'write_time': 32109
+            }
+        },
+        'rates': {
+            'nvme0n1': {
+                f'{window}s': {
+                    'read_bps': 524288,
+                    'write_bps': 131072,
+                    'read_iops': 42.0,
+                    'write_iops': 12.5,
+                    'busy_percent': 3.2,
+                    'elapsed': float(window)
+                }
+                for window in DISK_RATE_WINDOWS
+            }
+        },
+        'partitions': [
+            {
+                'device': '/dev/nvme0n1p2',
+                'mountpoint': '/',
+                'fstype': 'ext4',
+                'total': 238.5,
+                'used': 78.9,
+                'free': 159.6,
+                'percent': 33.1
+            }
+        ]
+    }
+}
+
+metrics_collector = MetricsCollector()
+
+
+def load_host_inventory(path=HOSTS_FILE):
+    """Хосты из hosts.json с подставленными значениями по умолчанию, по убыванию приоритета"""
+    config_file = Path(path)
+    config = DEFAULT_HOSTS_CONFIG
+    if config_file.exists():
+        try:
+            with open(config_file, 'r') as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning(f"⚠️ Не удалось прочитать {config_file}, используются хосты по умолчанию: {e}")
+
+    defaults = dict(HOST_DEFAULTS, **config.get('defaults', {}))
+    hosts = []
+    for entry in config.get('hosts', []):
+        if isinstance(entry, str):
+            entry = {'alias': entry}
+        host = dict(defaults, **entry)
+        if not host.get('alias') or not host['enabled']:
+            continue
+        host.setdefault('name', host['alias'])
+        host['interval'] = max(1.0, float(host['interval']))
+        hosts.append(host)
+    return sorted(hosts, key=lambda host: -host['priority'])
+
+
+HOST_INVENTORY = load_host_inventory()
+REMOTE_HOSTS = [host['alias'] for host in HOST_INVENTORY]
+
+
+def check_private_dir(path):
+    """Создаёт каталог с правами 0700; возвращает текст ошибки или None
+
+    Чужой каталог, симлинк или каталог с доступом для группы/всех не используется.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        try:
+            os.mkdir(path, 0o700)
+        except FileExistsError:
+            pass
+        info = os.lstat(path)
+    except OSError as e:
+        return f'{path}: {e}'
+
+    if not stat.S_ISDIR(info.st_mode):
+        return f'{path} is not a directory'
+    if info.st_uid != os.getuid():
+        return f'{path} is owned by uid {info.st_uid}'
+    if info.st_mode & 0o077:
+        return f'{path} is accessible by other users ({oct(info.st_mode & 0o777)})'
+    return None
+
+
+class SSHConnectionPool:
+    """Пул постоянных ssh соединений к удалённым хостам.
+
+    На каждый хост держится одно мастер-соединение OpenSSH (ControlMaster),
+    а команды идут через его управляющий сокет без нового TCP и обмена ключами.
+    Упавший мастер переподключается при следующей команде.
+    """
+
+    def __init__(self, control_dir=SSH_CONTROL_DIR):
+        self.control_dir = control_dir
+        self._lock = threading.Lock()
+        self._host_locks = {}
+        self._stats = {}
+
+    def control_path(self, host):
+        safe_host = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in host)
+        return os.path.join(self.control_dir, f'{safe_host}.sock')
+
+    def _host_state(self, host):
+        with self._lock:
+            if host not in self._host_locks:
+                self._host_locks[host] = threading.Lock()
+                self._stats[host] = {
+                    'connected': False,
+                    'handshake_ms': None,
+                    'command_ms': None,
+                    'handshakes': 0,
+                    'commands': 0,
+                    'reconnects': 0,
+                    'last_error': None
+                }
+            return self._host_locks[host], self._stats[host]
+
+    def _check_control_dir(self):
+        """Каталог сокетов только текущего пользователя; текст ошибки или None
+
+        Через подложенный в чужой каталог сокет можно перехватить мультиплексированные сессии.
+        """
+        error = check_private_dir(self.control_dir)
+        return f'control dir {error}' if error is not None else None
+
+    def _ssh_args(self, host, *options):
+        return ['ssh', '-S', self.control_path(host),
+                '-o', 'BatchMode=yes',
+                '-o', f'ConnectTimeout={SSH_CONNECT_TIMEOUT}',
+                *options]
+
+    def connect(self, host):
+        """Поднимает мастер-соединение, если его ещё нет"""
+        host_lock, stats = self._host_state(host)
+        with host_lock:
+            # Проверяем и перед поиском готового сокета - он мог быть подложен
+            error = self._check_control_dir()
+            if error is not None:
+                if stats['last_error'] != error:
+                    log.error(f"❌ Небезопасный каталог SSH сокетов, соединения отключены: {error}")
+                stats['connected'] = False
+                stats['last_error'] = error
+                return False
+
+            if os.path.exists(self.control_path(host)):
+                return True
+
+            started = time.monotonic()
+            try:
+                # -f уводит мастер в фон после авторизации, поэтому вывод не перехватываем:
+                # иначе subprocess ждал бы закрытия пайпов фоновым процессом
+                result = subprocess.run(
+                    self._ssh_args(host,
+                                   '-o', 'ControlMaster=yes',
+                                   '-o', f'ControlPersist={SSH_CONTROL_PERSIST}',
+                                   '-o', 'ServerAliveInterval=15',
+                                   '-N', '-f', host),
+                    stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL, timeout=SSH_CONNECT_TIMEOUT + 5)
+                ok = result.returncode == 0
+                error = None if ok else f'ssh exited with code {result.returncode}'
+            except (OSError, subprocess.TimeoutExpired) as e:
+                ok = False
+                error = str(e)
+
+            stats['handshake_ms'] = round((time.monotonic() - started) * 1000, 1)
+            stats['handshakes'] += 1
+            stats['connected'] = ok
+            stats['last_error'] = error
+            if ok:
+                log.info(f"🔗 SSH мастер-соединение с {host} установлено за {stats['handshake_ms']} мс")
+            else:
+                log.warning(f"⚠️ Не удалось установить SSH соединение с {host}: {error}")
+            return ok
+
+    def disconnect(self, host):
+        """Закрывает мастер-соединение хоста"""
+        path = self.control_path(host)
+        if not os.path.exists(path):
+            return
+        try:
+            subprocess.run(self._ssh_args(host, '-O', 'exit', host),
+                           stdin=subprocess.DEVNULL, capture_output=True, timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        _, stats = self._host_state(host)
+        stats['connected'] = False
+
+    def run(self, host, command, timeout=10):
+        """Выполняет команду на хосте через мастер-соединение
+
+        Возвращает subprocess.CompletedProcess; код 255 означает ошибку самого ssh.
+        """
+        _, stats = self._host_state(host)
+
+        for attempt in range(2):
+            if not self.connect(host):
+                return subprocess.CompletedProcess(command, 255, '', stats['last_error'] or '')
+
+            started = time.monotonic()
+            try:
+                result = subprocess.run(self._ssh_args(host, '-o', 'ControlMaster=no', host, command),
+                                        stdin=subprocess.DEVNULL, capture_output=True,
+                                        text=True, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                stats['last_error'] = f'command timed out after {timeout}s'
+                return subprocess.CompletedProcess(command, 255, '', stats['last_error'])
+            finally:
+                stats['command_ms'] = round((time.monotonic() - started) * 1000, 1)
+                stats['commands'] += 1
+
+            if result.returncode != 255 or attempt:
+                return result
+
+            # Мастер умер (сеть, перезагрузка хоста) - поднимаем заново и повторяем
+            log.info(f"🔄 SSH соединение с {host} потеряно, переподключаюсь...")
+            stats['reconnects'] += 1
+            self.disconnect(host)
+
+        return result
+
+    def popen(self, host, command, **kwargs):
+        """Долгоживущая команда на хосте через мастер-соединение
+
+        Возвращает subprocess.Popen или None, если соединение не поднялось.
+        """
+        if not self.connect(host):
+            return None
+        _, stats = self._host_state(host)
+        stats['commands'] += 1
+        return subprocess.Popen(self._ssh_args(host, '-o', 'ControlMaster=no', host, command), **kwargs)
+
+    def host_stats(self, host):
+        _, stats = self._host_state(host)
+        return dict(stats)
+
+    def close_all(self):
+        with self._lock:
+            hosts = list(self._host_locks)
+        for host in hosts:
+            self.disconnect(host)
+
+
+ssh_pool = SSHConnectionPool()
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP соединение поверх unix сокета"""
+
+    def __init__(self, socket_path, timeout=DOCKER_REQUEST_TIMEOUT):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def format_docker_ports(ports):
+    """Порты из Engine API в виде, как их печатает docker ps"""
+    formatted = []
+    for port in sorted(ports or [], key=lambda p: (p.get('PrivatePort', 0), p.get('IP', ''))):
+        private = f"{port.get('PrivatePort')}/{port.get('Type', 'tcp')}"
+        if port.get('PublicPort'):
+            formatted.append(f"{port.get('IP', '0.0.0.0')}:{port['PublicPort']}->{private}")
+        else:
+            formatted.append(private)
+    return ', '.join(dict.fromkeys(formatted))
+
+
+class DockerEngine(threading.Thread):
+    """Индекс локальных контейнеров из Docker Engine API
+
+    Список строится один раз, дальше поддерживается событиями /events.
+    Поток событий открывается с until=, поэтому раз в DOCKER_RESYNC_INTERVAL
+    он заканчивается и список перечитывается целиком - без пропусков, так как
+    следующий поток начинается с since= времени этой пересинхронизации.
+    """
+
+    def __init__(self, socket_path=DOCKER_SOCKET):
+        super().__init__(name='docker-engine', daemon=True)
+        self.socket_path = socket_path
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._containers = {}
+        self._ready = False
+        self._failed = False
+        self._api = None
+        self._events = None
+
+    def ready(self):
+        return self._ready
+
+    def containers(self):
+        """Контейнеры в формате get_local_docker_containers, новые первыми"""
+        with self._lock:
+            containers = sorted(self._containers.values(), key=lambda c: c.get('Created', 0), reverse=True)
+        return [self._format(container) for container in containers]
+
+    def _format(self, container):
+        return {
+            'id': container.get('Id', '')[:12],
+            'name': ','.join(name.lstrip('/') for name in container.get('Names') or []),
+            'image': container.get('Image', ''),
+            'status': container.get('Status', ''),
+            'state': container.get('State', ''),
+            'ports': format_docker_ports(container.get('Ports')),
+            'created': time.strftime('%Y-%m-%d %H:%M:%S +0000 UTC', time.gmtime(container.get('Created', 0)))
+        }
+
+    def _get(self, path):
+        """GET по постоянному соединению; при обрыве - одно переподключение"""
+        for attempt in range(2):
+            if self._api is None:
+                self._api = UnixHTTPConnection(self.socket_path)
+            try:
+                self._api.request('GET', path)
+                response = self._api.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                self._api.close()
+                self._api = None
+                if attempt:
+                    raise
+                continue
+            if response.status != 200:
+                raise OSError(f'Docker API {path}: HTTP {response.status}')
+            return json.loads(body)
+
+    def _list(self, filters=None):
+        query = {'all': '1'}
+        if filters:
+            query['filters'] = json.dumps(filters)
+        return self._get(f'/containers/json?{urllib.parse.urlencode(query)}')
+
+    def resync(self):
+        containers = {container['Id']: container for container in self._list()}
+        with self._lock:
+            self._containers = containers
+
+    def refresh(self, container_id):
+        found = self._list({'id': [container_id]})
+        with self._lock:
+            for container in found:
+                self._containers[container['Id']] = container
+            if not found:
+                self._containers.pop(container_id, None)
+
+    def follow_events(self, since, until):
+        query = urllib.parse.urlencode({
+            'since': f'{since:.3f}',
+            'until': f'{until:.3f}',
+            'filters': json.dumps({'type': ['container']})
+        })
+        # Поток событий молчит, пока ничего не происходит - таймаут чтения больше окна
+        self._events = UnixHTTPConnection(self.socket_path, timeout=until - since + DOCKER_REQUEST_TIMEOUT)
+        try:
+            self._events.request('GET', f'/events?{query}')
+            response = self._events.getresponse()
+            if response.status != 200:
+                raise OSError(f'Docker API /events: HTTP {response.status}')
+            for line in response:
+                if self._stop_event.is_set():
+                    return
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                action = event.get('Action') or event.get('status', '')
+                container_id = event.get('Actor', {}).get('ID') or event.get('id')
+                if not container_id or action.startswith('exec_'):
+                    continue
+                if action == 'destroy':
+                    with self._lock:
+                        self._containers.pop(container_id, None)
+                else:
+                    self.refresh(container_id)
+        finally:
+            self._events.close()
+            self._events = None
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                since = time.time()
+                self.resync()
+                if not self._ready:
+                    log.info(f"🐳 Docker Engine API: {self.socket_path} ({len(self._containers)} контейнеров)")
+                self._ready = True
+                self._failed = False
+                self.follow_events(since, since + DOCKER_RESYNC_INTERVAL)
+            except (http.client.HTTPException, OSError, ValueError) as e:
+                if self._stop_event.is_set():
+                    break
+                # Сообщаем только о смене состояния, а не о каждой повторной попытке
+                if self._ready or not self._failed:
+                    log.warning(f"⚠️ Docker Engine API недоступен, используется docker CLI: {e}")
+                self._ready = False
+                self._failed = True
+                self._stop_event.wait(DOCKER_RETRY_INTERVAL)
+
+        if self._api is not None:
+            self._api.close()
+            self._api = None
+
+    def stop(self):
+        self._stop_event.set()
+        events = self._events
+        if events is not None and events.sock is not None:
+            try:
+                events.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+docker_engine = DockerEngine()
+
+
+@instrumentation.timed('docker.local')
+def get_local_docker_containers():
+    """Получение локальных Docker контейнеров"""
+    if docker_engine.ready():
+        return docker_engine.containers()
+
+    try:
+        result = subprocess.run(['docker', 'ps', '-a', '--format', 'json'], 
+                              capture_output=True, text=True, timeout=10)
+
+        if result.returncode == 0:
+            containers = []
+            for line in result.stdout.strip().split('\n'):
+                if line:
+                    container = json.loads(line)
+                    containers.append({
+                        'id': container.get('ID', ''),
+                        'name': container.get('Names', ''),
+                        'image': container.get('Image', ''),
+                        'status': container.get('Status', ''),
+                        'state': container.get('State', ''),
+                        'ports': container.get('Ports', ''),
+                        'created': container.get('CreatedAt', '')
+                    })
+            return containers
+        else:
+            log.warning("⚠️ Docker не установлен или недоступен локально")
+            return []
+
+    except Exception as e:
+        log.warning(f"⚠️ Ошибка получения локальных Docker контейнеров: {e}")
+        return []
+
+
+class RemoteAgent(threading.Thread):
+    """Агент метрик на удалённом хосте поверх одного ssh канала
+
+    Исходник агента передаётся в stdin (на хосте ничего не устанавливается),
+    после чего канал остаётся открытым: агент пишет JSON выборки, сервер
+    после каждой выборки шлёт ping и по ответу меряет задержку.
+
+    Своих повторных попыток у агента нет: он запускается, только пока дашборд
+    открыт и HostScheduler застал хост живым, а неудачи агента идут в общий
+    с опросом отсчёт (пауза и предохранитель HostScheduler).
+    """
+
+    def __init__(self, host, interval=REMOTE_AGENT_INTERVAL):
+        super().__init__(name=f'remote-agent-{host}', daemon=True)
+        self.host = host
+        self.interval = interval
+        self.ping_ms = None
+        self.error = None
+        self.failures = 0
+        self._sample = None
+        self._sample_at = None
+        self._pings = {}
+        self._process = None
+        self._stop_event = threading.Event()
+
+    def _spawn(self):
+        source = REMOTE_AGENT_SCRIPT.read_bytes()
+        command = (f"python3 -u -c 'import sys; exec(sys.stdin.buffer.read({len(source)}))' "
+                   f"--interval {self.interval}")
+        process = ssh_pool.popen(self.host, command, stdin=subprocess.PIPE,
+                                 stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        if process is not None:
+            process.stdin.write(source)
+            process.stdin.flush()
+        return process
+
+    def _send_ping(self):
+        ping_id = str(int(time.monotonic() * 1000))
+        self._pings = {ping_id: time.monotonic()}
+        self._process.stdin.write(f'ping {ping_id}\n'.encode())
+        self._process.stdin.flush()
+
+    def _read(self):
+        """Читает выборки; True, если канал закрыт из-за простоя дашборда"""
+        for line in self._process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if message.get('type') == 'sample':
+                self._sample, self._sample_at = message, time.monotonic()
+                if self.error is not None:
+                    log.info(f"🛰️ Агент на {self.host} снова присылает данные")
+                self.error = None
+                self.failures = 0
+                if host_scheduler.idle():
+                    return True
+                self._send_ping()
+            elif message.get('type') == 'pong' and message.get('id') in self._pings:
+                sent = self._pings.pop(message['id'])
+                self.ping_ms = round((time.monotonic() - sent) * 1000, 1)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            if not host_scheduler.agent_allowed(self.host):
+                self._stop_event.wait(HOST_SCHEDULER_TICK)
+                continue
+            try:
+                self._process = self._spawn()
+                if self._process is None:
+                    self.error = 'нет ssh соединения'
+                else:
+                    if self._read():
+                        log.info(f"💤 Дашборд не открыт, агент на {self.host} остановлен")
+                        continue
+                    code = self._process.wait()
+                    self.error = f'агент завершился с кодом {code}'
+            except (OSError, ValueError) as e:
+                self.error = str(e)
+            finally:
+                if self._process is not None and self._process.poll() is None:
+                    self._process.kill()
+            if self._stop_event.is_set():
+                break
+            self.failures += 1
+            if self.failures == 1:
+                log.warning(f"⚠️ Агент на {self.host} недоступен ({self.error}), используются команды ssh")
+            host_scheduler.report_failure(self.host, f'агент: {self.error}')
+
+    def sample(self):
+        """Последняя выборка, если она не старше трёх интервалов"""
+        if self._sample_at is None or time.monotonic() - self._sample_at > self.interval * 3:
+            return None
+        return self._sample
+
+    def stop(self):
+        self._stop_event.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            # Закрытый stdin - сигнал агенту завершиться самому
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+            process.terminate()
+
+
+remote_agents = {
+    host['alias']: RemoteAgent(host['alias'], interval=host['interval'])
+    for host in HOST_INVENTORY if host['agent']
+} if REMOTE_AGENT_ENABLED else {}
+
+
+def agent_sample(host):
+    """Свежая выборка агента хоста или None - тогда данные собираются командами ssh"""
+    agent = remote_agents.get(host)
+    return agent.sample() if agent is not None else None
+
+
+def format_uptime(seconds):
+    days, seconds = divmod(int(seconds), 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes = seconds // 60
+    return f'{days} дн {hours}:{minutes:02d}' if days else f'{hours}:{minutes:02d}'
+
+
+def get_remote_docker_containers(server_alias):
+    """Получение Docker контейнеров с удаленного сервера"""
+    sample = agent_sample(server_alias)
+    if sample is not None and sample.get('containers') is not None:
+        return [dict(container, server=server_alias) for container in sample['containers']]
+
+    try:
+        result = ssh_pool.run(server_alias, 'docker ps -a --format json', timeout=15)
+
+        if result.returncode == 0:
+            containers = []
+            for line in result.stdout.strip().split('\n'):
+                if line:
+                    try:
+                        container = json.loads(line)
+                        containers.append({
+                            'id': container.get('ID', ''),
+                            'name': container.get('Names', ''),
+                            'image': container.get('Image', ''),
+                            'status': container.get('Status', ''),
+                            'state': container.get('State', ''),
+                            'ports': container.get('Ports', ''),
+                            'created': container.get('CreatedAt', ''),
+                            'server': server_alias
+                        })
+                    except json.JSONDecodeError:
+                        continue
+            return containers
+        else:
+            log.warning(f"⚠️ Не удалось подключиться к {server_alias} или Docker недоступен")
+            return []
+
+    except Exception as e:
+        log.warning(f"⚠️ Ошибка получения Docker контейнеров с {server_alias}: {e}")
+        return []
+
+
+def get_remote_server_processes(server_alias):
+    """Получение процессов с удаленного сервера"""
+    sample = agent_sample(server_alias)
+    if sample is not None:
+        # Те же поля, что у локальных процессов, плюс старые поля таблицы ssh.js
+        return [
+            dict(process,
+                 server=server_alias,
+                 protocol=f'{server_alias} Process',
+                 local_address=f"CPU: {process['cpu']}%",
+                 remote_address=process['cmdline'],
+                 status=f"MEM: {process['memory']}%")
+            for process in sample['processes'][:8]
+        ]
+
+    try:
+        # Получаем топ процессов с сервера
+        result = ssh_pool.run(server_alias, 'ps aux --sort=-%cpu | head -10', timeout=10)
+
+        if result.returncode == 0:
+            processes = []
+            lines = result.stdout.strip().split('\n')[1:]  # Пропускаем заголовок
+            for i, line in enumerate(lines[:8]):  # Берем топ 8 процессов
+                if line.strip():
+                    parts = line.split(None, 10)  # Разбиваем на максимум 11 частей
+                    if len(parts) >= 11:
+                        processes.append({
+                            'protocol': f'{server_alias} Process',
+                            'local_address': f"CPU: {parts[2]}%",
+                            'remote_address': f"{parts[10][:50]}..." if len(parts[10]) > 50 else parts[10],
+                            'status': f"MEM: {parts[3]}%"
+                        })
+            return processes
+        else:
+            return []
+
+    except Exception as e:
+        log.warning(f"⚠️ Ошибка получения процессов с {server_alias}: {e}")
+        return []
+
+
+def agent_server_status(server_alias, sample):
+    """Статус сервера из выборки агента в формате check_server_status"""
+    agent = remote_agents[server_alias]
+    timing = ssh_pool.host_stats(server_alias)
+    if agent.ping_ms is not None:
+        record_metrics(time.time(), {f'ping.{server_alias}': agent.ping_ms})
+    return {
+        'status': 'online',
+        'source': 'agent',
+        'ping': agent.ping_ms,
+        'uptime': format_uptime(sample['uptime']),
+        'memory': sample['memory']['percent'],
+        'disk': sample['disk']['percent'],
+        'cpu': sample['cpu'],
+        'load': sample['load'],
+        'info': {
+            'ping': agent.ping_ms,
+            'handshake_ms': timing['handshake_ms'],
+            'command_ms': timing['command_ms'],
+            'hostname': sample['hostname'],
+            'uptime_seconds': sample['uptime'],
+            'memory': sample['memory'],
+            'swap': sample['swap'],
+            'disk': sample['disk']
+        },
+        'timing': timing
+    }
+
+
+def check_server_status(server_alias):
+    """Проверка статуса удаленного сервера"""
+    sample = agent_sample(server_alias)
+    if sample is not None:
+        return agent_server_status(server_alias, sample)
+
+    try:
+        start_time = time.time()
+        # Проверка подключения и сбор информации одной командой через мастер-соединение
+        result = ssh_pool.run(server_alias,
+                              'echo connected; uptime; df -h / | tail -1; free -m | grep Mem',
+                              timeout=10)
+
+        ping_time = round((time.time() - start_time) * 1000, 1)  # в миллисекундах
+        timing = ssh_pool.host_stats(server_alias)
+
+        lines = result.stdout.strip().split('\n') if result.stdout else []
+        if result.returncode == 0 and lines and lines[0].strip() == 'connected':
+            server_info = {
+                'ping': ping_time,
+                'handshake_ms': timing['handshake_ms'],
+                'command_ms': timing['command_ms']
+            }
+            if len(lines) >= 4:
+                server_info['uptime'] = lines[1].strip()
+                server_info['disk'] = lines[2].strip()
+                server_info['memory'] = lines[3].strip()
+
+            record_metrics(time.time(), {f'ping.{server_alias}': ping_time})
+            return {
+                'status': 'online',
+                'ping': ping_time,
+                'info': server_info,
+                'timing': timing
+            }
+        else:
+            return {
+                'status': 'offline',
+                'ping': None,
+                'error': 'Connection failed',
+                'timing': timing
+            }
+
+    except Exception as e:
+        return {
+            'status': 'error',
+            'ping': None,
+            'error': str(e)
+        }
+
+
+class RemoteQueryRunner:
+    """Параллельный опрос хостов с общим дедлайном на запрос.
+
+    Каждый запрос к хосту идёт в отдельном потоке пула. Не успевшие к дедлайну
+    хосты отдаются со статусом timeout (или pending, если запрос к ним был
+    начат ещё предыдущим вызовом) и последними известными данными. Их запросы
+    продолжают выполняться и обновят данные для следующего вызова.
+    """
+
+    def __init__(self, max_workers=REMOTE_QUERY_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='remote-query')
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._last_known = {}
+
+    def _submit(self, key, fn):
+        """Запускает запрос, если такой же ещё не выполняется; возвращает (future, новый ли)"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None and not future.done():
+                return future, False
+            future = self.executor.submit(fn)
+            self._inflight[key] = future
+        future.add_done_callback(lambda f: self._remember(key, f))
+        return future, True
+
+    def _remember(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if not future.cancelled() and future.exception() is None:
+                self._last_known[key] = (future.result(), time.time())
+
+    def gather(self, queries, deadline=REMOTE_REQUEST_DEADLINE):
+        """Выполняет {ключ: функция} параллельно и ждёт не дольше deadline секунд
+
+        Возвращает {ключ: {'status': ok|timeout|pending|error, 'data': ..., 'updated': ts}}.
+        """
+        started = {key: self._submit(key, fn) for key, fn in queries.items()}
+        wait_futures([future for future, _ in started.values()], timeout=deadline)
+
+        results = {}
+        for key, (future, fresh) in started.items():
+            with self._lock:
+                last_data, last_updated = self._last_known.get(key, (None, None))
+
+            if future.done() and future.exception() is None:
+                results[key] = {'status': 'ok', 'data': future.result(), 'updated': time.time()}
+            elif future.done():
+                results[key] = {'status': 'error', 'data': last_data, 'updated': last_updated,
+                                'error': str(future.exception())}
+            else:
+                results[key] = {'status': 'timeout' if fresh else 'pending',
+                                'data': last_data, 'updated': last_updated}
+        return results
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+remote_queries = RemoteQueryRunner()
+
+
+class HostScheduler(threading.Thread):
+    """Фоновый опрос хостов из инвентаря с ограниченной параллельностью
+
+    Каждый хост опрашивается со своим интервалом, не больше max_workers
+    одновременно, при нехватке потоков - сначала хосты с большим приоритетом.
+    Неудачи удваивают интервал (до HOST_MAX_BACKOFF), а после
+    HOST_CIRCUIT_THRESHOLD неудач подряд размыкается предохранитель: хост
+    проверяется одной командой раз в HOST_CIRCUIT_COOLDOWN. Эндпоинты только
+    читают последнее состояние и не ждут ssh.
+    """
+
+    def __init__(self, hosts, max_workers=REMOTE_QUERY_WORKERS):
+        super().__init__(name='host-scheduler', daemon=True)
+        self.hosts = {host['alias']: host for host in hosts}
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='host-poll')
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._running = set()
+        self._last_access = None
+        self._state = {
+            alias: {
+                'status': None,
+                'processes': None,
+                'containers': None,
+                'updated': None,
+                'failures': 0,
+                'circuit': 'closed',
+                'next_due': 0.0,
+                'polls': 0,
+                'last_error': None
+            }
+            for alias in self.hosts
+        }
+
+    def touch(self):
+        """Отмечает, что данные хостов нужны дашборду"""
+        self._last_access = time.monotonic()
+
+    def idle(self):
+        """Данные хостов давно никто не запрашивал"""
+        return self._last_access is None or time.monotonic() - self._last_access > HOST_IDLE_TIMEOUT
+
+    def agent_allowed(self, alias):
+        """Можно ли запускать агент: дашборд открыт и последний опрос застал хост живым"""
+        if self.idle():
+            return False
+        with self._lock:
+            state = self._state[alias]
+            return state['updated'] is not None and state['failures'] == 0 and state['circuit'] == 'closed'
+
+    def report_failure(self, alias, error):
+        """Неудача вне опроса (агент хоста) - тот же отсчёт неудач и та же пауза"""
+        with self._lock:
+            state = self._state[alias]
+            state['last_error'] = error
+            self._record_failure(alias, state, time.monotonic())
+
+    def run(self):
+        while not self._stop_event.wait(HOST_SCHEDULER_TICK):
+            now = time.monotonic()
+            if self.idle():
+                continue
+            with self._lock:
+                free = self.max_workers - len(self._running)
+                due = [alias for alias, host in self.hosts.items()
+                       if alias not in self._running and self._state[alias]['next_due'] <= now]
+                # self.hosts уже отсортирован по приоритету
+                due = due[:max(0, free)]
+                self._running.update(due)
+            for alias in due:
+                self.executor.submit(self._poll, alias)
+
+    def _poll(self, alias):
+        host = self.hosts[alias]
+        state = self._state[alias]
+        try:
+            with instrumentation.timed(f'ssh.{alias}'):
+                status = check_server_status(alias)
+                online = status.get('status') == 'online'
+                # Недоступный хост (и пробная проверка при разомкнутом предохранителе)
+                # стоит одну команду - процессы и контейнеры запрашиваются только у живых
+                if online:
+                    processes = get_remote_server_processes(alias)
+                    containers = get_remote_docker_containers(alias)
+            error = None if online else status.get('error', status.get('status'))
+        except Exception as e:
+            online, status, error = False, {'status': 'error', 'ping': None, 'error': str(e)}, str(e)
+
+        now = time.monotonic()
+        with self._lock:
+            state['polls'] += 1
+            state['status'] = status
+            state['last_error'] = error
+            if online:
+                if state['circuit'] == 'open':
+                    log.info(f"✅ {alias} снова доступен, опрос возобновлён")
+                state.update(processes=processes, containers=containers, updated=time.time(),
+                             failures=0, circuit='closed', next_due=now + host['interval'])
+            else:
+                self._record_failure(alias, state, now)
+            self._running.discard(alias)
+
+    def _record_failure(self, alias, state, now):
+        """Пауза после неудачи или размыкание предохранителя (вызывается под блокировкой)"""
+        state['failures'] += 1
+        if state['failures'] >= HOST_CIRCUIT_THRESHOLD:
+            if state['circuit'] == 'closed':
+                log.info(f"🔌 {alias} недоступен {state['failures']} раз подряд, "
+                      f"следующая проверка через {HOST_CIRCUIT_COOLDOWN} с")
+            state['circuit'] = 'open'
+            state['next_due'] = now + HOST_CIRCUIT_COOLDOWN
+        else:
+            state['next_due'] = now + min(self.hosts[alias]['interval'] * 2 ** state['failures'], HOST_MAX_BACKOFF)
+
+    def state(self, alias):
+        with self._lock:
+            return dict(self._state[alias])
+
+    def query_status(self, alias):
+        """Статус данных хоста для query_status в ответах эндпоинтов"""
+        with self._lock:
+            state = self._state[alias]
+            if state['circuit'] == 'open':
+                status = 'circuit_open'
+            elif state['failures']:
+                status = 'backoff'
+            elif state['updated'] is None:
+                status = 'pending'
+            else:
+                status = 'ok'
+            return {
+                'status': status,
+                'updated': state['updated'],
+                'failures': state['failures'],
+                'next_poll': round(max(0.0, state['next_due'] - time.monotonic()), 1)
+            }
+
+    def healthy_hosts(self):
+        with self._lock:
+            return [alias for alias, state in self._state.items() if state['circuit'] == 'closed']
+
+    def host_info(self):
+        """Отображаемые имена и приоритеты для виджетов"""
+        return {
+            alias: {'name': host['name'], 'priority': host['priority'], 'interval': host['interval']}
+            for alias, host in self.hosts.items()
+        }
+
+    def stop(self):
+        self._stop_event.set()
+        self.executor.shutdown(wait=False)
+
+
+host_scheduler = HostScheduler(HOST_INVENTORY)
+
+
+class ProcessTracker:
+    """Долгоживущий трекер процессов.
+
+    Хранит состояние каждого PID между выборками и считает загрузку CPU по
+    приросту процессорного времени, поэтому проценты верны с первого ответа.
+    Топ-N выбирается через heapq, а клиент с номером выборки (?since=)
+    получает только добавленные, изменившиеся и пропавшие строки.
+    """
+
+    SORT_KEYS = {
+        'cpu': lambda row: (row['cpu'], row['memory']),
+        'memory': lambda row: (row['memory'], row['cpu'])
+    }
+
+    # Состояния из /proc/[pid]/stat в тех же строках, что отдаёт psutil
+    PROC_STATES = {
+        b'R': 'running', b'S': 'sleeping', b'D': 'disk-sleep', b'T': 'stopped',
+        b't': 'tracing-stop', b'Z': 'zombie', b'X': 'dead', b'x': 'dead',
+        b'K': 'wake-kill', b'W': 'waking', b'P': 'parked', b'I': 'idle'
+    }
+
+    def __init__(self, backend=PROCESS_BACKEND, proc_dir=PROC_DIR):
+        self.proc_dir = proc_dir
+        self.backend = self._resolve_backend(backend)
+        self._buffer = bytearray(4096)
+        self._memory_total = None
+        self._lock = threading.Lock()
+        self._cpu_state = {}
+        self._rows = {}
+        self._seq = 0
+        self._sampled_at = None
+        self._views = {}
+        self._ready = threading.Event()
+
+    def _resolve_backend(self, backend):
+        procfs = sys.platform.startswith('linux') and os.path.exists(os.path.join(self.proc_dir, 'stat'))
+        if backend == 'procfs' and not procfs:
+            log.warning(f"⚠️ {self.proc_dir} недоступен, процессы читаются через psutil")
+        if backend in ('auto', 'procfs') and procfs:
+            return 'procfs'
+        return 'psutil' if psutil is not None else 'fallback'
+
+    def sample(self):
+        """Снимает состояние всех процессов и увеличивает номер выборки"""
+        if self.backend == 'procfs':
+            rows, cpu_state = self._scan_procfs()
+        elif self.backend == 'psutil':
+            rows, cpu_state = self._scan_psutil()
+        else:
+            rows = {row['pid']: row for row in FALLBACK_PROCESSES}
+            cpu_state = {}
+
+        with self._lock:
+            self._rows = rows
+            self._cpu_state = cpu_state
+            self._seq += 1
+            self._sampled_at = time.time()
+
+        # Проценты CPU появляются только со второй настоящей выборки
+        if self._seq >= (1 if self.backend == 'fallback' else 2):
+            self._ready.set()
+
+    def _read_into(self, path):
+        """Читает файл в общий буфер без новых объектов; возвращает длину"""
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            return os.readv(fd, [self._buffer])
+        finally:
+            os.close(fd)
+
+    def _scan_procfs(self):
+        now = time.monotonic()
+        previous = self._cpu_state
+        rows = {}
+        cpu_state = {}
+        buffer = self._buffer
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        clock_ticks = os.sysconf('SC_CLK_TCK')
+
+        if self._memory_total is None:
+            with open(os.path.join(self.proc_dir, 'meminfo'), 'rb') as f:
+                for line in f:
+                    if line.startswith(b'MemTotal:'):
+                        self._memory_total = int(line.split()[1]) * 1024
+                        break
+
+        with os.scandir(self.proc_dir) as entries:
+            for entry in entries:
+                if not entry.name.isdigit():
+                    continue
+                pid = int(entry.name)
+                try:
+                    length = self._read_into(f'{entry.path}/stat')
+                    # Имя в скобках может содержать пробелы и скобки - режем по последней
+                    name_start = buffer.find(b'(', 0, length)
+                    name_end = buffer.rfind(b')', 0, length)
+                    name = buffer[name_start + 1:name_end].decode(errors='replace')
+                    fields = buffer[name_end + 2:length].split()
+                    state = self.PROC_STATES.get(bytes(fields[0]), 'unknown')
+                    cpu_total = (int(fields[11]) + int(fields[12])) / clock_ticks
+                    created = int(fields[19])
+
+                    length = self._read_into(f'{entry.path}/statm')
+                    resident = int(buffer[:length].split()[1]) * page_size
+                except (OSError, ValueError, IndexError):
+                    # Процесс завершился между scandir и чтением
+                    continue
+
+                # Тот же расчёт, что и в _scan_psutil: прирост времени CPU с прошлой выборки
+                cpu = 0.0
+                prev = previous.get(pid)
+                if prev is not None and prev[0] == created and now > prev[2]:
+                    cpu = max(0.0, (cpu_total - prev[1]) / (now - prev[2]) * 100)
+                cpu_state[pid] = (created, cpu_total, now)
+
+                rows[pid] = {
+                    'pid': pid,
+                    'name': name,
+                    'cpu': round(cpu, 1),
+                    'memory': round(resident / self._memory_total * 100, 1) if self._memory_total else 0.0,
+                    'status': state
+                }
+
+        return rows, cpu_state
+
+    def _scan_psutil(self):
+        now = time.monotonic()
+        previous = self._cpu_state
+        rows = {}
+        cpu_state = {}
+
+        for proc in psutil.process_iter():
+            try:
+                with proc.oneshot():
+                    pid = proc.pid
+                    created = proc.create_time()
+                    times = proc.cpu_times()
+                    cpu_total = times.user + times.system
+
+                    # Процент CPU - прирост процессорного времени с прошлой выборки.
+                    # Совпадение времени создания защищает от переиспользованных PID
+                    cpu = 0.0
+                    prev = previous.get(pid)
+                    if prev is not None and prev[0] == created and now > prev[2]:
+                        cpu = max(0.0, (cpu_total - prev[1]) / (now - prev[2]) * 100)
+                    cpu_state[pid] = (created, cpu_total, now)
+
+                    rows[pid] = {
+                        'pid': pid,
+                        'name': proc.name(),
+                        'cpu': round(cpu, 1),
+                        'memory': round(proc.memory_percent() or 0.0, 1),
+                        'status': proc.status()
+                    }
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+
+        return rows, cpu_state
+
+    def _view(self, sort, limit):
+        """Топ-N текущей выборки (вызывается под блокировкой)"""
+        history = self._views.setdefault((sort, limit), deque(maxlen=PROCESS_VIEW_HISTORY))
+        if history and history[-1][0] == self._seq:
+            return history[-1][1]
+
+        top = heapq.nlargest(limit, self._rows.values(), key=self.SORT_KEYS[sort])
+        history.append((self._seq, top))
+        return top
+
+    def wait_ready(self, timeout=COLLECTOR_STARTUP_TIMEOUT):
+        self._ready.wait(timeout)
+
+    def top(self, sort='cpu', limit=PROCESS_DEFAULT_LIMIT):
+        """Список топ процессов - прежний формат /api/processes"""
+        self.wait_ready()
+        with self._lock:
+            return list(self._view(sort, limit))
+
+    def diff(self, since, sort='cpu', limit=PROCESS_DEFAULT_LIMIT):
+        """Изменения топа с выборки since; полный список, если она уже забыта"""
+        self.wait_ready()
+        with self._lock:
+            current = self._view(sort, limit)
+            previous = None
+            for seq, view in self._views[(sort, limit)]:
+                if seq == since:
+                    previous = view
+                    break
+
+            result = {
+                'seq': self._seq,
+                'sampled_at': self._sampled_at,
+                'total': len(self._rows),
+                'sort': sort,
+                'limit': limit,
+                'order': [row['pid'] for row in current]
+            }
+
+        if previous is None:
+            result.update(full=True, processes=current)
+            return result
+
+        old_rows = {row['pid']: row for row in previous}
+        new_rows = {row['pid']: row for row in current}
+        result.update(
+            full=False,
+            added=[row for pid, row in new_rows.items() if pid not in old_rows],
+            changed=[row for pid, row in new_rows.items() if pid in old_rows and old_rows[pid] != row],
+            removed=[pid for pid in old_rows if pid not in new_rows]
+        )
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {'seq': self._seq, 'sampled_at': self._sampled_at, 'total': len(self._rows)}
+
+
+# Тестовые процессы, если psutil не установлен
+FALLBACK_PROCESSES = [
+    {'pid': 1234, 'name': 'chrome', 'cpu': 15.4, 'memory': 8.2, 'status': 'running'},
+    {'pid': 5678, 'name': 'code', 'cpu': 12.1, 'memory': 6.7, 'status': 'running'},
+    {'pid': 9012, 'name': 'firefox', 'cpu': 8.9, 'memory': 12.3, 'status': 'running'},
+    {'pid': 3456, 'name': 'python3', 'cpu': 5.2, 'memory': 2.1, 'status': 'running'},
+    {'pid': 7890, 'name': 'kitty', 'cpu': 3.1, 'memory': 1.8, 'status': 'running'}
+]
+
+process_tracker = ProcessTracker()
+
+
+def collect_docker_containers():
+    """Docker контейнеры локально и на удалённых серверах"""
+    host_scheduler.touch()
+    local = remote_queries.gather({('docker', 'local'): get_local_docker_containers})[('docker', 'local')]
+
+    query_status = {'local': {'status': local['status'], 'updated': local['updated']}}
+    servers = {}
+    for host in REMOTE_HOSTS:
+        servers[host] = host_scheduler.state(host)['containers'] or []
+        query_status[host] = host_scheduler.query_status(host)
+
+    return {
+        'local': local['data'] or [],
+        'servers': servers,
+        'hosts': host_scheduler.host_info(),
+        'query_status': query_status
+    }
+
+
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]')
+DOCKER_SIZE_UNITS = {
+    'b': 1, 'kb': 1000, 'mb': 1000 ** 2, 'gb': 1000 ** 3, 'tb': 1000 ** 4,
+    'kib': 1024, 'mib': 1024 ** 2, 'gib': 1024 ** 3, 'tib': 1024 ** 4
+}
+
+
+def parse_docker_size(text):
+    """'12.5MiB' -> байты; нераспознанное значение -> None"""
+    match = re.fullmatch(r'\s*([\d.]+)\s*([a-zA-Z]+)\s*', text or '')
+    if not match or match.group(2).lower() not in DOCKER_SIZE_UNITS:
+        return None
+    return int(float(match.group(1)) * DOCKER_SIZE_UNITS[match.group(2).lower()])
+
+
+def parse_docker_pair(text):
+    """'1.2kB / 3MB' -> (байты, байты)"""
+    first, _, second = (text or '').partition('/')
+    return parse_docker_size(first), parse_docker_size(second)
+
+
+def parse_docker_percent(text):
+    try:
+        return float((text or '').strip().rstrip('%'))
+    except ValueError:
+        return None
+
+
+class DockerStatsStream(threading.Thread):
+    """Один долгоживущий `docker stats` на хост и скользящие средние по контейнерам
+
+    Стоимость не зависит от числа контейнеров: один процесс (или один ssh канал
+    через мастер-соединение) присылает все контейнеры примерно раз в секунду.
+    """
+
+    COMMAND = "docker stats --format '{{json .}}'"
+
+    def __init__(self, host):
+        super().__init__(name=f'docker-stats-{host}', daemon=True)
+        self.host = host
+        self.last_access = time.monotonic()
+        self.finished_at = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._containers = {}
+        self._process = None
+        self._stopping = False
+
+    def _spawn(self):
+        options = dict(stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                       stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        if self.host == 'local':
+            return subprocess.Popen(['docker', 'stats', '--format', '{{json .}}'], **options)
+        return ssh_pool.popen(self.host, self.COMMAND, **options)
+
+    def run(self):
+        try:
+            self._process = self._spawn()
+            if self._process is None:
+                self.error = 'нет ssh соединения'
+                return
+            # docker stats перерисовывает экран ANSI кодами даже без терминала
+            for line in self._process.stdout:
+                line = ANSI_ESCAPE.sub('', line)
+                start = line.find('{')
+                if start < 0:
+                    continue
+                try:
+                    self._update(json.loads(line[start:]))
+                except ValueError:
+                    continue
+            code = self._process.wait()
+            if not self._stopping:
+                self.error = f'docker stats завершился с кодом {code}'
+        except OSError as e:
+            self.error = str(e)
+        finally:
+            self.finished_at = time.monotonic()
+            if self.error and not self._stopping:
+                log.warning(f"⚠️ Поток docker stats ({self.host}) остановлен: {self.error}")
+
+    def _update(self, sample):
+        name = sample.get('Name') or sample.get('Container')
+        if not name:
+            return
+        memory_usage, memory_limit = parse_docker_pair(sample.get('MemUsage'))
+        net_rx, net_tx = parse_docker_pair(sample.get('NetIO'))
+        block_read, block_write = parse_docker_pair(sample.get('BlockIO'))
+        cpu = parse_docker_percent(sample.get('CPUPerc'))
+        memory = parse_docker_percent(sample.get('MemPerc'))
+
+        with self._lock:
+            entry = self._containers.get(name)
+            if entry is None:
+                entry = self._containers[name] = {
+                    'cpu': deque(maxlen=DOCKER_STATS_WINDOW),
+                    'memory': deque(maxlen=DOCKER_STATS_WINDOW)
+                }
+            if cpu is not None:
+                entry['cpu'].append(cpu)
+            if memory is not None:
+                entry['memory'].append(memory)
+            entry['current'] = {
+                'cpu_now': cpu,
+                'memory_usage': memory_usage,
+                'memory_limit': memory_limit,
+                'net_rx': net_rx,
+                'net_tx': net_tx,
+                'block_read': block_read,
+                'block_write': block_write,
+                'pids': int(sample['PIDs']) if str(sample.get('PIDs', '')).isdigit() else None
+            }
+            entry['updated'] = time.monotonic()
+
+    def snapshot(self):
+        """{имя контейнера: средние и последние значения}"""
+        now = time.monotonic()
+        result = {}
+        with self._lock:
+            for name, entry in list(self._containers.items()):
+                if now - entry['updated'] > DOCKER_STATS_STALE:
+                    del self._containers[name]
+                    continue
+                result[name] = dict(
+                    entry['current'],
+                    cpu=round(sum(entry['cpu']) / len(entry['cpu']), 2) if entry['cpu'] else None,
+                    memory_percent=round(sum(entry['memory']) / len(entry['memory']), 2) if entry['memory'] else None,
+                    samples=len(entry['cpu'])
+                )
+        return result
+
+    def status(self):
+        if self.error:
+            return 'error'
+        return 'ok' if self._containers else 'starting'
+
+    def stop(self):
+        self._stopping = True
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.terminate()
+
+
+class DockerStatsAggregator:
+    """Потоки docker stats по хостам: стартуют при первом запросе, закрываются без запросов"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams = {}
+
+    def stats(self, hosts):
+        """{хост: {'status': ok|starting|error, 'containers': {...}}}"""
+        now = time.monotonic()
+        with self._lock:
+            for host in hosts:
+                stream = self._streams.get(host)
+                # Упавший поток перезапускаем не чаще раза в DOCKER_STATS_RETRY
+                if stream is None or (not stream.is_alive() and stream.finished_at is not None
+                                      and now - stream.finished_at >= DOCKER_STATS_RETRY):
+                    stream = self._streams[host] = DockerStatsStream(host)
+                    stream.start()
+                stream.last_access = now
+
+            for host, stream in list(self._streams.items()):
+                if now - stream.last_access > DOCKER_STATS_IDLE:
+                    log.info(f"💤 Поток docker stats ({host}) закрыт: нет запросов")
+                    stream.stop()
+                    del self._streams[host]
+
+            streams = {host: self._streams[host] for host in hosts}
+
+        result = {}
+        for host, stream in streams.items():
+            result[host] = {'status': stream.status(), 'containers': stream.snapshot()}
+            if stream.error:
+                result[host]['error'] = stream.error
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            streams = list(self._streams.values())
+            self._streams.clear()
+        for stream in streams:
+            stream.stop()
+
+
+docker_stats = DockerStatsAggregator()
+
+
+def with_docker_stats(data):
+    """Ответ /api/docker-containers с ресурсами контейнеров (?stats=1)"""
+    # Для хостов с разомкнутым предохранителем поток stats не открываем
+    return dict(data, stats=docker_stats.stats(['local'] + host_scheduler.healthy_hosts()))
+
+
+def without_poll_timing(data):
+    """Ответ для ETag без времени опроса хостов
+
+    updated и next_poll в query_status меняются при каждом обновлении, даже если
+    данные хостов те же. Без query_status возвращает None - хешируется всё тело.
+    """
+    statuses = data.get('query_status') if isinstance(data, dict) else None
+    if not isinstance(statuses, dict):
+        return None
+    return dict(data, query_status={
+        host: {key: value for key, value in status.items() if key not in ('updated', 'next_poll')}
+        for host, status in statuses.items()
+    })
+
+
+def collect_ssh_connections():
+    """Статус удалённых серверов и их топ процессов"""
+    host_scheduler.touch()
+    states = {host: host_scheduler.state(host) for host in REMOTE_HOSTS}
+
+    ssh_data = {
+        # Процессы с удаленных серверов
+        'local': [
+            process
+            for host in REMOTE_HOSTS
+            for process in (states[host]['processes'] or [])
+        ],
+        'servers': {},
+        'hosts': host_scheduler.host_info(),
+        'query_status': {}
+    }
+    for host in REMOTE_HOSTS:
+        query_status = host_scheduler.query_status(host)
+        if states[host]['status'] is not None:
+            ssh_data['servers'][host] = dict(states[host]['status'], query_status=query_status['status'])
+        else:
+            ssh_data['servers'][host] = {'status': 'pending', 'ping': None}
+        ssh_data['query_status'][host] = query_status
+
+    return ssh_data
+
+
+class ResponseCache:
+    """Кеш ответов дорогих эндпоинтов со stale-while-revalidate.
+
+    Свежее значение отдаётся сразу. Устаревшее, но не старше запаса stale,
+    тоже отдаётся сразу, а в фоне запускается обновление. Одновременные
+    промахи по одному ключу объединяются в одну загрузку.
+    """
+
+    def __init__(self, ttls=None):
+        self.ttls = ttls if ttls is not None else RESPONSE_CACHE_TTL
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cache-refresh')
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._loading = {}
+
+    def get(self, key, loader):
+        """Возвращает (значение, HIT|STALE|MISS, возраст в секундах)"""
+        value, cache_state, age = self._lookup(key, loader)
+        instrumentation.count('cache', {'key': key, 'result': cache_state})
+        return value, cache_state, age
+
+    def _lookup(self, key, loader):
+        fresh_ttl, stale_ttl = self.ttls[key]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry['created']
+                if age < fresh_ttl:
+                    return entry['value'], 'HIT', age
+                if age < fresh_ttl + stale_ttl:
+                    if key not in self._loading:
+                        self._loading[key] = threading.Event()
+                        self.executor.submit(self._load, key, loader)
+                    return entry['value'], 'STALE', age
+
+            loading = self._loading.get(key)
+            if loading is None:
+                self._loading[key] = threading.Event()
+
+        if loading is None:
+            # Мы первые - загружаем сами, остальные ждут нас
+            return self._load(key, loader, raise_errors=True), 'MISS', 0.0
+
+        loading.wait()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            raise RuntimeError(f'загрузка {key} завершилась ошибкой')
+        return entry['value'], 'MISS', time.monotonic() - entry['created']
+
+    def _load(self, key, loader, raise_errors=False):
+        try:
+            value = loader()
+            with self._lock:
+                self._entries[key] = {'value': value, 'created': time.monotonic()}
+            return value
+        except Exception as e:
+            log.error(f"❌ Ошибка обновления кеша {key}: {e}")
+            if raise_errors:
+                raise
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+response_cache = ResponseCache()
+
+
+def snapshot_topic(section):
+    """Источник темы SSE из снимка фонового сборщика"""
+    def produce():
+        snapshot = metrics_collector.snapshot()
+        return snapshot[section] if snapshot is not None else None
+    return produce
+
+
+def cached_topic(key, loader):
+    """Источник темы SSE из кеша дорогого эндпоинта"""
+    return lambda: response_cache.get(key, loader)[0]
+
+
+class StreamSubscription(queue.Queue):
+    """Очередь событий одного SSE клиента"""
+
+    def __init__(self, topics):
+        super().__init__(maxsize=STREAM_QUEUE_SIZE)
+        self.topics = frozenset(topics)
+
+
+class StreamBroker(threading.Thread):
+    """Общий планировщик тем для SSE потока /api/stream.
+
+    Каждая тема собирается со своим интервалом и только пока на неё есть
+    подписчики. Подписчикам рассылаются лишь изменившиеся данные; новый
+    подписчик сразу получает последние известные значения своих тем.
+    """
+
+    def __init__(self, topics):
+        super().__init__(name='stream-broker', daemon=True)
+        self.topics = topics
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='stream-topic')
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._last = {}
+        # Что сравнивается с прошлой рассылкой: тело без времени опроса хостов
+        self._compared = {}
+        self._next_due = {}
+        self._producing = set()
+        self._seq = 0
+        self._stop_event = threading.Event()
+
+    def subscribe(self, topics):
+        """Новая подписка или None, если достигнут лимит клиентов"""
+        subscription = StreamSubscription(topics)
+        with self._lock:
+            if len(self._subscribers) >= STREAM_MAX_CLIENTS:
+                return None
+            self._subscribers.add(subscription)
+            for topic in topics:
+                if topic in self._last:
+                    payload, seq = self._last[topic]
+                    subscription.put_nowait((topic, seq, payload))
+                # Тема без подписчиков могла давно не собираться - собираем сразу
+                self._next_due.setdefault(topic, 0.0)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def client_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def run(self):
+        while not self._stop_event.wait(STREAM_TICK):
+            now = time.monotonic()
+            with self._lock:
+                active = set().union(*(sub.topics for sub in self._subscribers)) if self._subscribers else set()
+                due = [topic for topic in active
+                       if topic not in self._producing and self._next_due.get(topic, 0.0) <= now]
+                for topic in due:
+                    self._producing.add(topic)
+                    self._next_due[topic] = now + self.topics[topic][0]
+            for topic in due:
+                self.executor.submit(self._produce, topic)
+
+    def _produce(self, topic):
+        try:
+            data = self.topics[topic][1]()
+            if data is not None:
+                self.publish(topic, data)
+        except Exception as e:
+            log.warning(f"⚠️ Ошибка сбора темы {topic}: {e}")
+        finally:
+            with self._lock:
+                self._producing.discard(topic)
+
+    def publish(self, topic, data):
+        """Рассылает данные темы, если они изменились с прошлой рассылки"""
+        started = time.perf_counter()
+        payload = json.dumps(data)
+        compared = without_poll_timing(data)
+        compared = json.dumps(compared) if compared is not None else payload
+        instrumentation.observe('json_encode', {'target': f'stream.{topic}'}, time.perf_counter() - started)
+        with self._lock:
+            if self._compared.get(topic) == compared:
+                # Рассылать нечего, но новый подписчик получит свежее время опроса
+                self._last[topic] = (payload, self._last[topic][1])
+                return
+            self._seq += 1
+            self._compared[topic] = compared
+            self._last[topic] = (payload, self._seq)
+            for subscription in list(self._subscribers):
+                if topic not in subscription.topics:
+                    continue
+                try:
+                    subscription.put_nowait((topic, self._seq, payload))
+                except queue.Full:
+                    # Клиент не успевает читать - отключаем, браузер переподключится сам
+                    self._subscribers.discard(subscription)
+                    self._close_subscription(subscription)
+
+    @staticmethod
+    def _close_subscription(subscription):
+        while True:
+            try:
+                subscription.put_nowait(None)
+                return
+            except queue.Full:
+                try:
+                    subscription.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def stop(self):
+        """Останавливает планировщик и закрывает все SSE потоки"""
+        self._stop_event.set()
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscription in subscribers:
+            self._close_subscription(subscription)
+        self.executor.shutdown(wait=False)
+
+
+STREAM_TOPICS = {
+    # тема: (интервал сбора в секундах, источник данных)
+    'system': (COLLECTOR_INTERVAL, snapshot_topic('system')),
+    'details': (10.0, snapshot_topic('details')),
+    'temperatures': (5.0, snapshot_topic('temperatures')),
+    'disk': (5.0, snapshot_topic('disk')),
+    'processes': (5.0, process_tracker.top),
+    'docker': (5.0, lambda: with_docker_stats(response_cache.get('/api/docker-containers',
+                                                                  collect_docker_containers)[0])),
+    'ssh': (15.0, cached_topic('/api/ssh-connections', collect_ssh_connections))
+}
+
+stream_broker = StreamBroker(STREAM_TOPICS)
+
+
+class WallpaperSource:
+    """Текущие обои из конфига nitrogen и их уменьшенные копии
+
+    Путь к файлу запоминается и перечитывается, только когда меняется mtime
+    конфига. Уменьшенные копии пишутся в WALLPAPER_CACHE_DIR под именем из
+    пути, mtime и размера оригинала - смена обоев даёт новое имя, а копии
+    старых обоев удаляются.
+    """
+
+    def __init__(self, config_path=NITROGEN_CONFIG, cache_dir=WALLPAPER_CACHE_DIR):
+        self.config_path = config_path
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._config_mtime = None
+        self._path = None
+        # (ключ оригинала, ширина) -> путь копии или None, если копия не нужна
+        self._variants = {}
+
+    def _read_config(self):
+        try:
+            with open(self.config_path) as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return None
+        # В конфиге по секции на монитор - берём первый существующий файл
+        for line in lines:
+            if line.startswith('file='):
+                path = line.split('=', 1)[1].strip()
+                if os.path.isfile(path):
+                    return path
+                log.error(f"❌ Файл обоев не существует: {path}")
+        return None
+
+    def resolve(self):
+        """Путь к файлу обоев или None"""
+        try:
+            mtime = os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            mtime = None
+
+        with self._lock:
+            if mtime != self._config_mtime or (self._path and not os.path.isfile(self._path)):
+                self._config_mtime = mtime
+                self._path = self._read_config() if mtime is not None else None
+                log.info(f"🖼️  Обои: {self._path or 'не найдены'}")
+            return self._path
+
+    def variant(self, path, width):
+        """Копия обоев не шире width (с округлением до шага) или None - отдавать оригинал"""
+        if Image is None:
+            return None
+        width = min(WALLPAPER_MAX_WIDTH, max(1, math.ceil(width / WALLPAPER_WIDTH_STEP)) * WALLPAPER_WIDTH_STEP)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        source_key = hashlib.sha1(f'{path}:{stat.st_mtime_ns}:{stat.st_size}'.encode()).hexdigest()[:16]
+
+        with self._lock:
+            key = (source_key, width)
+            if key in self._variants:
+                cached = self._variants[key]
+                if cached is None or os.path.isfile(cached):
+                    return cached
+            try:
+                self._variants[key] = self._render(path, source_key, width)
+            except (OSError, ValueError) as e:
+                # Битый или неподдерживаемый файл - отдаём как есть
+                log.warning(f"⚠️ Не удалось уменьшить обои: {e}")
+                self._variants[key] = None
+            return self._variants[key]
+
+    def _render(self, path, source_key, width):
+        # Из каталога читаются и удаляются файлы - только если он наш и закрыт для других
+        error = check_private_dir(self.cache_dir)
+        if error is not None:
+            raise OSError(f'каталог кеша обоев не используется: {error}')
+
+        target = os.path.join(self.cache_dir, f'{source_key}-{width}.jpg')
+        if os.path.isfile(target):
+            return target
+
+        with Image.open(path) as image:
+            if image.width <= width:
+                return None
+            height = max(1, round(image.height * width / image.width))
+            # draft ускоряет JPEG: декодер сразу масштабирует в 2-8 раз
+            image.draft('RGB', (width, height))
+            resized = image.convert('RGB').resize((width, height), Image.LANCZOS)
+
+        # Копии прошлых обоев больше не понадобятся
+        for entry in os.listdir(self.cache_dir):
+            if not entry.startswith(source_key):
+                try:
+                    os.unlink(os.path.join(self.cache_dir, entry))
+                except OSError:
+                    pass
+        self._variants = {key: value for key, value in self._variants.items() if key[0] == source_key}
+
+        # Пишем во временный файл и переименовываем - читатели не увидят недописанную копию
+        fd, temporary = tempfile.mkstemp(dir=self.cache_dir, prefix=f'{source_key}-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                resized.save(f, 'JPEG', quality=WALLPAPER_JPEG_QUALITY, optimize=True, progressive=True)
+            os.replace(temporary, target)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        log.info(f"🖼️  Уменьшенная копия обоев {width}x{height}: {target}")
+        return target
+
+
+wallpaper_source = WallpaperSource()
+
+
+HTML_COMMENT = re.compile(r'(<!--.*?-->)', re.S)
+HTML_LINK = re.compile(r'<link\b[^>]*>')
+HTML_SCRIPT = re.compile(r'<script\b[^>]*\bsrc="([^"]+)"[^>]*>\s*</script>')
+HTML_ATTRIBUTE = re.compile(r'\b(rel|href)="([^"]*)"')
+
+
+class StaticAssetCache:
+    """Файлы PUBLIC_DIR в памяти вместе с gzip/brotli копиями и ETag по содержимому
+
+    При каждом запросе файл только проверяется через stat, пересжимается он
+    лишь после изменения. С STATIC_BUNDLE локальные стили и скрипты
+    index.html склеиваются в styles/bundle.css и js/bundle.js в порядке
+    подключения, а index.html переписывается на них с хешем в ?v=.
+    """
+
+    BUNDLES = {'styles/bundle.css': 'styles', 'js/bundle.js': 'scripts'}
+    ENCODINGS = {'br': 'br', 'gzip': 'gz'}
+
+    def __init__(self, root=PUBLIC_DIR, bundle=STATIC_BUNDLE):
+        self.root = os.path.abspath(root)
+        self.bundle = bundle
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._index = None
+
+    def _signature(self, sources):
+        signature = []
+        for relative in sources:
+            stat = os.stat(os.path.join(self.root, relative))
+            signature.append((relative, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _read(self, relative):
+        with open(os.path.join(self.root, relative), 'rb') as f:
+            return f.read()
+
+    def _index_assets(self):
+        """{'styles': [...], 'scripts': [...]} - локальные файлы index.html в порядке подключения"""
+        signature = self._signature(['index.html'])
+        index = self._index
+        if index is not None and index[0] == signature:
+            return index[1]
+
+        html = self._read('index.html').decode('utf-8')
+        assets = {'styles': [], 'scripts': []}
+        # Закомментированные теги (<!-- <script src=...> -->) не подключаются
+        for segment in HTML_COMMENT.split(html)[::2]:
+            for tag in HTML_LINK.finditer(segment):
+                attributes = dict(HTML_ATTRIBUTE.findall(tag.group(0)))
+                source = self._local_source(attributes.get('href', ''))
+                if attributes.get('rel') == 'stylesheet' and source:
+                    assets['styles'].append(source)
+            for match in HTML_SCRIPT.finditer(segment):
+                source = self._local_source(match.group(1))
+                if source:
+                    assets['scripts'].append(source)
+
+        self._index = (signature, assets)
+        return assets
+
+    @staticmethod
+    def _local_source(url):
+        """Путь файла относительно корня или None для внешних адресов"""
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme or parts.netloc or not parts.path:
+            return None
+        return os.path.normpath(parts.path.lstrip('/'))
+
+    def get(self, path):
+        """Запись кеша для пути в файловой системе или None - отдаст стандартный обработчик"""
+        relative = os.path.relpath(os.path.abspath(path), self.root)
+        if relative.startswith(os.pardir):
+            return None
+
+        try:
+            if self.bundle and relative in self.BUNDLES:
+                sources = self._index_assets()[self.BUNDLES[relative]]
+            elif self.bundle and relative == 'index.html':
+                assets = self._index_assets()
+                sources = ['index.html'] + assets['styles'] + assets['scripts']
+            else:
+                sources = [relative]
+            signature = self._signature(sources)
+        except (OSError, UnicodeDecodeError):
+            return None
+        if not signature:
+            return None
+        if sum(size for _, _, size in signature) > STATIC_CACHE_MAX_FILE:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(relative)
+        if entry is not None and entry['signature'] == signature:
+            return entry
+
+        try:
+            if self.bundle and relative in self.BUNDLES:
+                body = self._build_bundle(relative, sources)
+            elif self.bundle and relative == 'index.html':
+                body = self._build_index()
+            else:
+                body = self._read(relative)
+        except OSError:
+            return None
+
+        entry = self._compress(relative, signature, body)
+        with self._lock:
+            self._entries[relative] = entry
+        return entry
+
+    def _build_bundle(self, relative, sources):
+        # ; между скриптами - на случай файла без точки с запятой в конце
+        separator = b'\n;\n' if relative.endswith('.js') else b'\n'
+        parts = [f'/* {source} */\n'.encode() + self._read(source) for source in sources]
+        return separator.join(parts)
+
+    def _build_index(self):
+        """index.html с одним подключением стилей и одним скриптом вместо всех локальных"""
+        html = self._read('index.html').decode('utf-8')
+        versions = {}
+        for relative, kind in self.BUNDLES.items():
+            entry = self.get(os.path.join(self.root, relative))
+            # Пустая или слишком большая сборка - теги этого вида остаются как есть
+            if entry is not None:
+                versions[kind] = f'{relative}?v={entry["hash"]}'
+        replaced = set()
+
+        def replace(kind, tag):
+            if kind not in versions:
+                return tag
+            if kind in replaced:
+                return ''
+            replaced.add(kind)
+            if kind == 'styles':
+                return f'<link rel="stylesheet" href="{versions[kind]}">'
+            return f'<script src="{versions[kind]}"></script>'
+
+        def replace_link(match):
+            attributes = dict(HTML_ATTRIBUTE.findall(match.group(0)))
+            if attributes.get('rel') == 'stylesheet' and self._local_source(attributes.get('href', '')):
+                return replace('styles', match.group(0))
+            return match.group(0)
+
+        def replace_script(match):
+            if self._local_source(match.group(1)):
+                return replace('scripts', match.group(0))
+            return match.group(0)
+
+        segments = HTML_COMMENT.split(html)
+        for number in range(0, len(segments), 2):
+            segments[number] = HTML_SCRIPT.sub(replace_script, HTML_LINK.sub(replace_link, segments[number]))
+        return ''.join(segments).encode('utf-8')
+
+    def _compress(self, relative, signature, body):
+        content_type = mimetypes.guess_type(relative)[0] or 'application/octet-stream'
+        digest = hashlib.sha1(body).hexdigest()[:16]
+        bodies = {'identity': body}
+        if content_type.startswith(STATIC_COMPRESSIBLE) and len(body) >= STATIC_COMPRESS_MIN:
+            bodies['gzip'] = gzip.compress(body, 9, mtime=0)
+            if brotli is not None:
+                bodies['br'] = brotli.compress(body, quality=11)
+            # Сжатая копия, которая не меньше оригинала, не нужна
+            bodies = {encoding: data for encoding, data in bodies.items()
+                      if encoding == 'identity' or len(data) < len(body)}
+
+        return {
+            'signature': signature,
+            'content_type': content_type,
+            'mtime': max(mtime for _, mtime, _ in signature) / 1e9,
+            'hash': digest,
+            'bodies': bodies,
+            # У каждой кодировки свой ETag - это разные представления ресурса
+            'etags': {encoding: f'"{digest}-{self.ENCODINGS[encoding]}"' if encoding in self.ENCODINGS
+                      else f'"{digest}"' for encoding in bodies}
+        }
+
+    @staticmethod
+    def choose_encoding(accept_encoding, available):
+        """Лучшая кодировка из Accept-Encoding с учётом q; при равенстве br лучше gzip"""
+        weights = {}
+        for item in (accept_encoding or '').split(','):
+            name, _, params = item.partition(';')
+            quality = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            if name.strip():
+                weights[name.strip().lower()] = quality
+
+        best, best_quality = 'identity', 0.0
+        for encoding in ('br', 'gzip'):
+            quality = weights.get(encoding, weights.get('*', 0.0))
+            if encoding in available and quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def warm(self):
+        """Сжимает всю статику заранее, чтобы первый запрос не ждал сжатия"""
+        count = raw = compressed = 0
+        paths = [os.path.join(directory, name) for directory, _, names in os.walk(self.root) for name in names]
+        if self.bundle:
+            paths.extend(os.path.join(self.root, relative) for relative in self.BUNDLES)
+        for path in paths:
+            entry = self.get(path)
+            if entry is None:
+                continue
+            count += 1
+            raw += len(entry['bodies']['identity'])
+            compressed += min(len(body) for body in entry['bodies'].values())
+        return count, raw, compressed
+
+
+static_assets = StaticAssetCache()
+
+
 class CyberkittyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     """Кастомный обработчик для дашборда с CORS поддержкой"""
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=PUBLIC_DIR, **kwargs)
     
+    def handle_one_request(self):
+        """Обработка запроса с замером времени для /metrics и строкой access-лога"""
+        self.route = None
+        self.status_code = None
+        # Базовый класс ставит command только после разбора строки запроса: без сброса
+        # пустое соединение падало бы с AttributeError, а закрытие keep-alive
+        # повторно записывало бы прошлый запрос
+        self.command = None
+        started = time.perf_counter()
+        instrumentation.request_started()
+        try:
+            super().handle_one_request()
+        finally:
+            instrumentation.request_finished()
+            # Пустое соединение или запрос, который не удалось разобрать
+            if self.command:
+                elapsed = time.perf_counter() - started
+                instrumentation.observe('requests', {
+                    'route': self.route_label(),
+                    'method': self.command,
+                    'status': str(self.status_code)
+                }, elapsed)
+                self.log_access(elapsed)
+    
+    def log_access(self, elapsed):
+        """Строка access-лога; частые маршруты прореживаются (на уровне DEBUG пишется всё)"""
+        if not log.isEnabledFor(logging.INFO):
+            return
+        route = self.route_label()
+        suppressed = 0
+        if not log.isEnabledFor(logging.DEBUG):
+            allowed, suppressed = access_log_limiter.allow(route)
+            if not allowed:
+                return
+        
+        message = f"🚀 {self.command} {self.path} {self.status_code} {elapsed * 1000:.1f} мс"
+        if suppressed:
+            message += f" (+{suppressed} таких запросов не показано)"
+        log.info(message, extra={
+            'client': self.client_address[0],
+            'method': self.command,
+            'path': self.path,
+            'route': route,
+            'status': self.status_code,
+            'duration_ms': round(elapsed * 1000, 3),
+            'suppressed': suppressed
+        })
+    
+    def log_request(self, code='-', size='-'):
+        """Access-лог пишет handle_one_request - там известно время обработки"""
+    
+    def send_response(self, code, message=None):
+        self.status_code = code
+        super().send_response(code, message)
+    
+    def route_label(self):
+        """Метка маршрута: API как есть, статика и 404 одной меткой - число серий ограничено"""
+        route = self.route or urllib.parse.urlsplit(self.path).path
+        if self.status_code == 404:
+            return 'not_found'
+        if route.startswith('/api/') or route == '/metrics':
+            return route
+        return 'static'
+    
     def do_GET(self):
-        print(f"🔍 GET запрос: {self.path}")
+        log.debug(f"🔍 GET запрос: {self.path}")
+        
+        # Путь без query string и разобранные параметры запроса
+        url = urllib.parse.urlsplit(self.path)
+        self.route = url.path
+        self.query = urllib.parse.parse_qs(url.query)
+        
+        # Медленные эндпоинты не должны занимать весь пул воркеров
+        if self.route in SLOW_ENDPOINTS:
+            self.serve_slow_endpoint()
+            return
         
         # Обработка API запросов ПЕРЕД стандартной обработкой
-        if self.path == '/api/wallpaper':
+        if self.route == '/api/wallpaper':
             self.serve_wallpaper()
             return
-        elif self.path == '/api/system-info':
+        elif self.route == '/api/system-info':
             self.serve_system_info()
             return
-        elif self.path == '/api/system-details':
+        elif self.route == '/api/system-details':
             self.serve_system_details()
             return
-        elif self.path == '/api/processes':
+        elif self.route == '/api/processes':
             self.serve_processes()
             return
-        elif self.path == '/api/temperatures':
+        elif self.route == '/api/temperatures':
             self.serve_temperatures()
             return
-        elif self.path == '/api/disk-activity':
+        elif self.route == '/api/disk-activity':
             self.serve_disk_activity()
             return
-        elif self.path == '/api/calendar-config':
+        elif self.route == '/api/calendar-config':
             self.serve_calendar_config()
             return
-        elif self.path == '/api/docker-containers':
-            self.serve_docker_containers()
+        elif self.route == '/api/snapshot':
+            self.serve_snapshot()
+            return
+        elif self.route == '/api/history':
+            self.serve_history()
             return
-        elif self.path == '/api/ssh-connections':
-            self.serve_ssh_connections()
+        elif self.route == '/api/stream':
+            self.serve_stream()
+            return
+        elif self.route == '/metrics':
+            self.serve_prometheus_metrics()
+            return
+        elif self.route == '/api/debug/timings':
+            self.send_json(instrumentation.timings())
             return
         
-        # Обычные файлы через стандартный обработчик
+        # Статика из памяти со сжатием, иначе стандартный обработчик
+        if self.serve_static():
+            return
         super().do_GET()
     
+    def do_HEAD(self):
+        url = urllib.parse.urlsplit(self.path)
+        self.route = url.path
+        self.query = urllib.parse.parse_qs(url.query)
+        
+        # Обои отдаются с валидаторами - HEAD позволяет проверить их без тела
+        if self.route == '/api/wallpaper':
+            self.serve_wallpaper()
+            return
+        if self.serve_static():
+            return
+        
+        super().do_HEAD()
+    
     def do_POST(self):
         """Обработка POST запросов для API"""
-        print(f"📝 POST запрос: {self.path}")
+        log.debug(f"📝 POST запрос: {self.path}")
         
         if self.path == '/api/lock-screen':
             self.handle_lock_screen()
@@ -73,6 +3449,23 @@ class CyberkittyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
     
+    def serve_slow_endpoint(self):
+        """Запуск эндпоинта удалённых хостов с ограничением параллельности"""
+        slots = self.server.slow_endpoint_slots
+        if not slots.acquire(blocking=False):
+            log.info(f"⏳ Все слоты медленных эндпоинтов заняты, отклоняю {self.path}")
+            self.send_json({'status': 'error', 'message': 'Сервер занят, повторите позже'},
+                           status=503, headers={'Retry-After': '2'})
+            return
+        
+        try:
+            if self.route == '/api/docker-containers':
+                self.serve_docker_containers()
+            elif self.route == '/api/ssh-connections':
+                self.serve_ssh_connections()
+        finally:
+            slots.release()
+    
     def handle_lock_screen(self):
         """Запуск аниме локера"""
         try:
@@ -81,20 +3474,20 @@ class CyberkittyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             post_data = self.rfile.read(content_length)
             data = json.loads(post_data.decode())
             
-            print(f"🔒 Запрос блокировки экрана: {data}")
+            log.debug("🔒 Запрос блокировки экрана: %s", data)
             
             # Записываем информацию о времени окончания перерыва
             if data.get('sessionType') in ['shortBreak', 'longBreak']:
                 break_end_time = int(time.time()) + data.get('timeRemaining', 300)
                 with open('/tmp/pomodoro_break_end.txt', 'w') as f:
                     f.write(str(break_end_time))
-                print(f"⏰ Время окончания перерыва записано: {break_end_time}")
+                log.debug(f"⏰ Время окончания перерыва записано: {break_end_time}")
             
             # Запускаем аниме локер
             lock_command = data.get('lockCommand', '/home/cyberkitty/.local/bin/anime-lock-python')
             
             if os.path.exists(lock_command):
-                print(f"🎌 Запускаю аниме локер: {lock_command}")
+                log.info(f"🎌 Запускаю аниме локер: {lock_command}")
                 # Запускаем в фоне
                 subprocess.Popen([lock_command], 
                                stdout=subprocess.DEVNULL, 
@@ -103,7 +3496,7 @@ class CyberkittyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 response = {'status': 'success', 'message': 'Аниме локер запущен'}
                 self.send_response(200)
             else:
-                print(f"❌ Аниме локер не найден: {lock_command}")
+                log.error(f"❌ Аниме локер не найден: {lock_command}")
                 response = {'status': 'error', 'message': 'Аниме локер не найден'}
                 self.send_response(404)
             
@@ -113,7 +3506,7 @@ class CyberkittyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             self.wfile.write(json.dumps(response).encode())
             
         except Exception as e:
-            print(f"❌ Ошибка запуска локера: {e}")
+            log.error(f"❌ Ошибка запуска локера: {e}")
             self.send_response(500)
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
@@ -122,390 +3515,478 @@ class CyberkittyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         """Запись статуса помодоро"""
         try:
             # Читаем данные запроса
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            data = json.loads(post_data.decode())
-            
-            status = data.get('status', '')
-            print(f"📝 Записываю статус помодоро: {status}")
-            
-            # Записываем в файл для аниме локера
-            with open('/tmp/pomodoro_status.txt', 'w') as f:
-                f.write(status)
-            
-            response = {'status': 'success'}
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
-            
-        except Exception as e:
-            print(f"❌ Ошибка записи статуса: {e}")
-            self.send_response(500)
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-    
-    def do_DELETE(self):
-        """Обработка DELETE запросов"""
-        if self.path == '/api/pomodoro-status':
-            try:
-                # Удаляем файл статуса
-                import pathlib
-                pathlib.Path('/tmp/pomodoro_status.txt').unlink(missing_ok=True)
-                pathlib.Path('/tmp/pomodoro_break_end.txt').unlink(missing_ok=True)
-                
-                response = {'status': 'success'}
-                self.send_response(200)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps(response).encode())
-                
-            except Exception as e:
-                print(f"❌ Ошибка удаления статуса: {e}")
-                self.send_response(500)
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-        else:
-            self.send_response(404)
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-    
-    def serve_wallpaper(self):
-        """Отдаём текущие обои рабочего стола"""
-        print("🖼️  Обрабатываю запрос обоев...")
-        try:
-            # Пытаемся получить путь к обоям из nitrogen
-            result = subprocess.run(['cat', os.path.expanduser('~/.config/nitrogen/bg-saved.cfg')], 
-                                  capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                print(f"📄 Конфиг nitrogen: {result.stdout}")
-                # Ищем путь к файлу в конфиге nitrogen
-                for line in result.stdout.split('\n'):
-                    if line.startswith('file='):
-                        wallpaper_path = line.split('=', 1)[1]
-                        print(f"🔍 Найден путь: {wallpaper_path}")
-                        if os.path.exists(wallpaper_path):
-                            print(f"✅ Файл существует, отдаю: {wallpaper_path}")
-                            # Отдаём файл обоев
-                            with open(wallpaper_path, 'rb') as f:
-                                self.send_response(200)
-                                # Определяем тип файла
-                                if wallpaper_path.lower().endswith('.jpg') or wallpaper_path.lower().endswith('.jpeg'):
-                                    self.send_header('Content-Type', 'image/jpeg')
-                                elif wallpaper_path.lower().endswith('.png'):
-                                    self.send_header('Content-Type', 'image/png')
-                                else:
-                                    self.send_header('Content-Type', 'image/jpeg')
-                                
-                                self.send_header('Access-Control-Allow-Origin', '*')
-                                self.end_headers()
-                                self.wfile.write(f.read())
-                                return
-                        else:
-                            print(f"❌ Файл не существует: {wallpaper_path}")
-            
-            print("❌ Обои не найдены, отдаю 404")
-            # Если не найдено, отдаём 404
-            self.send_response(404)
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
-        except Exception as e:
-            print(f"❌ Ошибка получения обоев: {e}")
-            self.send_response(500)
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-    
-    def serve_system_info(self):
-        """API для базовой системной информации"""
-        print("📊 Обрабатываю запрос базовой системной информации...")
-        try:
-            try:
-                import psutil
-                system_info = {
-                    'cpu': round(psutil.cpu_percent(interval=1), 1),
-                    'memory': round(psutil.virtual_memory().percent, 1),
-                    'disk': round(psutil.disk_usage('/').percent, 1)
-                }
-                print(f"📈 Базовая системная информация: {system_info}")
-            except ImportError:
-                # Fallback если psutil не установлен
-                print("⚠️  psutil не установлен, использую тестовые данные")
-                system_info = {
-                    'cpu': 25.5,
-                    'memory': 45.2,
-                    'disk': 67.8
-                }
-            
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(system_info).encode())
-            
-        except Exception as e:
-            print(f"❌ Ошибка получения базовой системной информации: {e}")
-            self.send_response(500)
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-
-    def serve_system_details(self):
-        """API для детальной системной информации"""
-        print("🔬 Обрабатываю запрос детальной системной информации...")
-        try:
-            try:
-                import psutil
-                
-                # Получаем детальную информацию о памяти
-                memory = psutil.virtual_memory()
-                swap = psutil.swap_memory()
-                
-                system_details = {
-                    'memory': {
-                        'total': round(memory.total / (1024**3), 2),  # GB
-                        'available': round(memory.available / (1024**3), 2),  # GB
-                        'used': round((memory.total - memory.available) / (1024**3), 2),  # GB
-                        'percent': round(memory.percent, 1),
-                        'cached': round(getattr(memory, 'cached', 0) / (1024**3), 2),  # GB
-                        'buffers': round(getattr(memory, 'buffers', 0) / (1024**3), 2)  # GB
-                    },
-                    'swap': {
-                        'total': round(swap.total / (1024**3), 2),  # GB
-                        'used': round(swap.used / (1024**3), 2),  # GB
-                        'percent': round(swap.percent, 1)
-                    },
-                    'uptime': round(psutil.boot_time()),
-                    'cpu_count': psutil.cpu_count(),
-                    'cpu_freq': round(psutil.cpu_freq().current) if psutil.cpu_freq() else 0
-                }
-                
-                print(f"🔬 Детальная системная информация: {system_details}")
-                
-            except ImportError:
-                print("⚠️  psutil не установлен, использую тестовые данные")
-                system_details = {
-                    'memory': {
-                        'total': 16.0,
-                        'available': 8.5,
-                        'used': 7.5,
-                        'percent': 46.9,
-                        'cached': 2.3,
-                        'buffers': 0.8
-                    },
-                    'swap': {
-                        'total': 8.0,
-                        'used': 1.2,
-                        'percent': 15.0
-                    },
-                    'uptime': 1640995200,
-                    'cpu_count': 8,
-                    'cpu_freq': 3400
-                }
+            content_length = int(self.headers['Content-Length'])
+            post_data = self.rfile.read(content_length)
+            data = json.loads(post_data.decode())
+            
+            status = data.get('status', '')
+            log.debug(f"📝 Записываю статус помодоро: {status}")
+            
+            # Записываем в файл для аниме локера
+            with open('/tmp/pomodoro_status.txt', 'w') as f:
+                f.write(status)
             
+            response = {'status': 'success'}
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(json.dumps(system_details).encode())
+            self.wfile.write(json.dumps(response).encode())
             
         except Exception as e:
-            print(f"❌ Ошибка получения детальной системной информации: {e}")
+            log.error(f"❌ Ошибка записи статуса: {e}")
             self.send_response(500)
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-
-    def serve_processes(self):
-        """API для информации о процессах"""
-        print("⚙️  Обрабатываю запрос информации о процессах...")
-        try:
+    
+    def do_DELETE(self):
+        """Обработка DELETE запросов"""
+        if self.path == '/api/pomodoro-status':
             try:
-                import psutil
-                
-                processes = []
-                for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'status']):
-                    try:
-                        proc_info = proc.info
-                        if proc_info['cpu_percent'] is None:
-                            proc_info['cpu_percent'] = 0.0
-                        if proc_info['memory_percent'] is None:
-                            proc_info['memory_percent'] = 0.0
-                            
-                        processes.append({
-                            'pid': proc_info['pid'],
-                            'name': proc_info['name'],
-                            'cpu': round(proc_info['cpu_percent'], 1),
-                            'memory': round(proc_info['memory_percent'], 1),
-                            'status': proc_info['status']
-                        })
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        continue
-                
-                # Сортируем по использованию CPU (топ 20)
-                processes.sort(key=lambda x: x['cpu'], reverse=True)
-                top_processes = processes[:20]
+                # Удаляем файл статуса
+                import pathlib
+                pathlib.Path('/tmp/pomodoro_status.txt').unlink(missing_ok=True)
+                pathlib.Path('/tmp/pomodoro_break_end.txt').unlink(missing_ok=True)
                 
-                print(f"⚙️  Найдено {len(processes)} процессов, показываю топ {len(top_processes)}")
+                response = {'status': 'success'}
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                self.wfile.write(json.dumps(response).encode())
                 
-            except ImportError:
-                print("⚠️  psutil не установлен, использую тестовые данные")
-                top_processes = [
-                    {'pid': 1234, 'name': 'chrome', 'cpu': 15.4, 'memory': 8.2, 'status': 'running'},
-                    {'pid': 5678, 'name': 'code', 'cpu': 12.1, 'memory': 6.7, 'status': 'running'},
-                    {'pid': 9012, 'name': 'firefox', 'cpu': 8.9, 'memory': 12.3, 'status': 'running'},
-                    {'pid': 3456, 'name': 'python3', 'cpu': 5.2, 'memory': 2.1, 'status': 'running'},
-                    {'pid': 7890, 'name': 'kitty', 'cpu': 3.1, 'memory': 1.8, 'status': 'running'}
-                ]
-            
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
+            except Exception as e:
+                log.error(f"❌ Ошибка удаления статуса: {e}")
+                self.send_response(500)
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+        else:
+            self.send_response(404)
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(json.dumps(top_processes).encode())
-            
+    
+    def serve_prometheus_metrics(self):
+        """Счётчики и гистограммы в текстовом формате Prometheus"""
+        body = instrumentation.prometheus({
+            ('cyberkitty_http_requests_in_flight', 'Запросы в обработке, включая SSE потоки'):
+                instrumentation.in_flight(),
+            ('cyberkitty_stream_clients', 'Подключённые SSE клиенты'): stream_broker.client_count(),
+            ('cyberkitty_start_time_seconds', 'Время запуска сервера (unix)'): round(instrumentation.started, 3)
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def serve_static(self):
+        """Отдаёт файл из кеша статики; False - пусть отдаст стандартный обработчик"""
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            # Без слеша на конце стандартный обработчик сделает редирект
+            if not self.route.endswith('/'):
+                return False
+            path = os.path.join(path, 'index.html')
+
+        entry = static_assets.get(path)
+        if entry is None:
+            return False
+
+        encoding = static_assets.choose_encoding(self.headers.get('Accept-Encoding'), entry['bodies'])
+        body = entry['bodies'][encoding]
+        etag = entry['etags'][encoding]
+        # ?v= с хешем содержимого (ссылки на сборку) не устареет никогда
+        if self.query.get('v') == [entry['hash']]:
+            cache_control = 'public, max-age=31536000, immutable'
+        else:
+            cache_control = 'no-cache'
+        headers = {
+            'ETag': etag,
+            'Last-Modified': email.utils.formatdate(entry['mtime'], usegmt=True),
+            'Cache-Control': cache_control
+        }
+        if len(entry['bodies']) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+
+        not_modified = self.is_not_modified(etag, entry['mtime'])
+        if not_modified:
+            self.send_response(304)
+        else:
+            self.send_response(200)
+            self.send_header('Content-Type', entry['content_type'])
+            self.send_header('Content-Length', str(len(body)))
+            if encoding != 'identity':
+                self.send_header('Content-Encoding', encoding)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        if self.command != 'HEAD' and not not_modified:
+            self.wfile.write(body)
+        return True
+
+    def serve_wallpaper(self):
+        """Отдаём текущие обои рабочего стола (?width= - уменьшенная копия под окно)"""
+        try:
+            wallpaper_path = wallpaper_source.resolve()
+            if wallpaper_path is None:
+                log.error("❌ Обои не найдены, отдаю 404")
+                self.send_response(404)
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                return
+
+            width = self.query.get('width', [''])[0]
+            if width.isdigit() and int(width) > 0:
+                wallpaper_path = wallpaper_source.variant(wallpaper_path, int(width)) or wallpaper_path
+
+            self.send_file(wallpaper_path, cache_control=f'max-age={WALLPAPER_MAX_AGE}')
+
+        except (BrokenPipeError, ConnectionResetError):
+            pass
         except Exception as e:
-            print(f"❌ Ошибка получения информации о процессах: {e}")
+            log.error(f"❌ Ошибка получения обоев: {e}")
             self.send_response(500)
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
 
-    def serve_temperatures(self):
-        """API для информации о температурах"""
-        print("🌡️  Обрабатываю запрос температур...")
-        try:
+    def is_not_modified(self, etag, mtime):
+        """Условный запрос: If-None-Match главнее If-Modified-Since"""
+        if self.headers.get('If-None-Match') is not None:
+            return self.etag_matches(etag)
+
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
             try:
-                import psutil
-                
-                temperatures = {}
-                
-                # Пытаемся получить температуры
-                if hasattr(psutil, 'sensors_temperatures'):
-                    temps = psutil.sensors_temperatures()
-                    for name, entries in temps.items():
-                        for entry in entries:
-                            temp_name = f"{name}_{entry.label}" if entry.label else name
-                            temperatures[temp_name] = {
-                                'current': round(entry.current, 1),
-                                'high': entry.high,
-                                'critical': entry.critical
-                            }
-                
-                print(f"🌡️  Температуры: {temperatures}")
-                
-            except ImportError:
-                print("⚠️  psutil не установлен, использую тестовые данные")
-                temperatures = {
-                    'cpu_package': {'current': 45.0, 'high': 80.0, 'critical': 90.0},
-                    'cpu_core0': {'current': 42.0, 'high': 80.0, 'critical': 90.0},
-                    'cpu_core1': {'current': 44.0, 'high': 80.0, 'critical': 90.0},
-                    'nvme': {'current': 38.0, 'high': 70.0, 'critical': 80.0}
-                }
-            except:
-                # Fallback для систем без поддержки температур
-                temperatures = {
-                    'cpu': {'current': 45.0, 'high': 80.0, 'critical': 90.0}
-                }
-            
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return int(mtime) <= since
+        return False
+
+    def etag_matches(self, etag):
+        """Слабое сравнение If-None-Match с ETag: префикс W/ не учитывается"""
+        if_none_match = self.headers.get('If-None-Match')
+        if not if_none_match:
+            return False
+        opaque = etag[2:] if etag.startswith('W/') else etag
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag == '*' or (tag[2:] if tag.startswith('W/') else tag) == opaque:
+                return True
+        return False
+
+    def parse_range(self, size, etag, last_modified):
+        """(начало, длина) из заголовка Range, None - отдать файл целиком, False - 416
+
+        Поддерживается один диапазон: bytes=a-b, bytes=a- и bytes=-n.
+        Несколько диапазонов и If-Range со старым валидатором дают весь файл.
+        """
+        header = self.headers.get('Range')
+        if not header or not header.startswith('bytes=') or ',' in header:
+            return None
+        if_range = self.headers.get('If-Range')
+        if if_range is not None and if_range.strip() not in (etag, last_modified):
+            return None
+
+        start, _, end = header[len('bytes='):].strip().partition('-')
+        try:
+            if not start:
+                # Последние n байт
+                length = min(int(end), size)
+                return (size - length, length) if length > 0 else False
+            start = int(start)
+            end = min(int(end), size - 1) if end else size - 1
+        except ValueError:
+            return None
+        if start >= size or end < start:
+            return False
+        return start, end - start + 1
+
+    def send_file(self, path, cache_control='no-cache'):
+        """Отдаёт файл с ETag/Last-Modified, ответом 304 и поддержкой Range
+
+        Тело уходит через socket.sendfile (os.sendfile, без копирования в Python).
+        """
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            size = stat.st_size
+            etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+            last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+            validators = {
+                'ETag': etag,
+                'Last-Modified': last_modified,
+                'Cache-Control': cache_control,
+                'Accept-Ranges': 'bytes'
+            }
+
+            if self.is_not_modified(etag, stat.st_mtime):
+                self.send_response(304)
+                for name, value in validators.items():
+                    self.send_header(name, value)
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                return
+
+            byte_range = self.parse_range(size, etag, last_modified)
+            if byte_range is False:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.send_header('Access-Control-Allow-Origin', '*')
+                self.end_headers()
+                return
+
+            offset, length = byte_range or (0, size)
+            self.send_response(206 if byte_range else 200)
+            self.send_header('Content-Type', mimetypes.guess_type(path)[0] or 'application/octet-stream')
+            self.send_header('Content-Length', str(length))
+            if byte_range:
+                self.send_header('Content-Range', f'bytes {offset}-{offset + length - 1}/{size}')
+            for name, value in validators.items():
+                self.send_header(name, value)
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(json.dumps(temperatures).encode())
-            
-        except Exception as e:
-            print(f"❌ Ошибка получения температур: {e}")
-            self.send_response(500)
+
+            if self.command != 'HEAD' and length:
+                self.wfile.flush()
+                self.connection.sendfile(f, offset, length)
+
+    def send_json(self, data, status=200, headers=None, etag_data=None):
+        """Отправка JSON ответа с CORS заголовком
+
+        Успешные ответы получают ETag по хешу тела, и повторный запрос с тем же
+        If-None-Match получает 304 без тела. Если в теле есть меняющиеся при каждом
+        запросе поля (время снимка, его возраст), хешируется etag_data без них,
+        и ETag становится слабым.
+        """
+        started = time.perf_counter()
+        body = json.dumps(data).encode()
+        instrumentation.observe('json_encode', {'target': self.route_label()}, time.perf_counter() - started)
+        headers = dict(headers or {})
+        if status == 200 and self.command in ('GET', 'HEAD'):
+            if etag_data is None:
+                headers['ETag'] = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+            else:
+                digest = hashlib.sha1(json.dumps(etag_data).encode()).hexdigest()[:16]
+                headers['ETag'] = f'W/"{digest}"'
+            # Кешировать можно, но каждый раз с проверкой
+            headers.setdefault('Cache-Control', 'no-cache')
+            if self.etag_matches(headers['ETag']):
+                instrumentation.count('not_modified', {'route': self.route_label()})
+                status, body = 304, b''
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def serve_snapshot_section(self, section, embed_meta=True, transform=None):
+        """Отдаёт раздел последнего снимка фонового сборщика метрик
+
+        Время снимка и его возраст передаются в заголовках X-Sample-*,
+        а для объектов без произвольных ключей - ещё и в теле ответа.
+        """
+        snapshot = metrics_collector.snapshot()
+        if snapshot is None:
+            log.warning(f"⚠️  Снимок метрик ещё не готов ({section})")
+            self.send_response(503)
+            self.send_header('Retry-After', '1')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
+            return
 
-    def serve_disk_activity(self):
-        """API для информации о дисковой активности"""
-        print("💾 Обрабатываю запрос дисковой активности...")
-        try:
+        sample_age = round(time.monotonic() - snapshot['monotonic'], 3)
+        data = etag_data = snapshot[section]
+        if transform is not None:
+            data = etag_data = transform(data)
+        if embed_meta:
+            data = dict(data, timestamp=snapshot['timestamp'], sample_age=sample_age)
+        else:
+            etag_data = None
+
+        self.send_json(data, etag_data=etag_data, headers={
+            'X-Sample-Timestamp': str(snapshot['timestamp']),
+            'X-Sample-Age': str(sample_age)
+        })
+
+    def serve_snapshot(self):
+        """API для нескольких разделов системной информации одним запросом
+
+        /api/snapshot?sections=details,temperatures,disk,processes
+        С since=<seq> раздел processes - изменения топа, как у /api/processes?since=
+        """
+        requested = self.query.get('sections', [','.join(SNAPSHOT_SECTIONS)])[0]
+        sections = [section for section in requested.split(',') if section]
+        unknown = [section for section in sections if section not in SNAPSHOT_SECTIONS]
+        if unknown or not sections:
+            self.send_json({'status': 'error',
+                            'message': f"Неизвестные разделы: {', '.join(unknown) or '-'}",
+                            'sections': list(SNAPSHOT_SECTIONS)}, status=400)
+            return
+        
+        since = self.query.get('since', [None])[0]
+        if since is not None:
             try:
-                import psutil
-                
-                # Получаем I/O статистику дисков
-                disk_io = psutil.disk_io_counters(perdisk=True)
-                disk_usage = {}
-                
-                for device, io_stats in disk_io.items():
-                    disk_usage[device] = {
-                        'read_bytes': io_stats.read_bytes,
-                        'write_bytes': io_stats.write_bytes,
-                        'read_count': io_stats.read_count,
-                        'write_count': io_stats.write_count,
-                        'read_time': io_stats.read_time,
-                        'write_time': io_stats.write_time
-                    }
-                
-                # Получаем использование основных разделов
-                partitions = []
-                for partition in psutil.disk_partitions():
-                    try:
-                        usage = psutil.disk_usage(partition.mountpoint)
-                        partitions.append({
-                            'device': partition.device,
-                            'mountpoint': partition.mountpoint,
-                            'fstype': partition.fstype,
-                            'total': round(usage.total / (1024**3), 2),  # GB
-                            'used': round(usage.used / (1024**3), 2),   # GB
-                            'free': round(usage.free / (1024**3), 2),   # GB
-                            'percent': round((usage.used / usage.total) * 100, 1)
-                        })
-                    except PermissionError:
-                        continue
-                
-                disk_data = {
-                    'io_stats': disk_usage,
-                    'partitions': partitions
-                }
-                
-                print(f"💾 Дисковая активность: найдено {len(partitions)} разделов")
-                
-            except ImportError:
-                print("⚠️  psutil не установлен, использую тестовые данные")
-                disk_data = {
-                    'io_stats': {
-                        'nvme0n1': {
-                            'read_bytes': 12345678901,
-                            'write_bytes': 9876543210,
-                            'read_count': 123456,
-                            'write_count': 98765,
-                            'read_time': 45678,
-                            'write_time': 32109
-                        }
-                    },
-                    'partitions': [
-                        {
-                            'device': '/dev/nvme0n1p2',
-                            'mountpoint': '/',
-                            'fstype': 'ext4',
-                            'total': 238.5,
-                            'used': 78.9,
-                            'free': 159.6,
-                            'percent': 33.1
-                        }
-                    ]
-                }
-            
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
+                since = int(since)
+            except ValueError:
+                self.send_json({'status': 'error', 'message': 'since=<seq>'}, status=400)
+                return
+        
+        # Все системные разделы берутся из одного снимка сборщика
+        snapshot = metrics_collector.snapshot()
+        if snapshot is None:
+            self.send_response(503)
+            self.send_header('Retry-After', '1')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(json.dumps(disk_data).encode())
-            
+            return
+        
+        sample_age = round(time.monotonic() - snapshot['monotonic'], 3)
+        data = {'timestamp': snapshot['timestamp'], 'sample_age': sample_age}
+        try:
+            for section in sections:
+                if section == 'processes':
+                    data[section] = process_tracker.top() if since is None else process_tracker.diff(since)
+                else:
+                    data[section] = snapshot[section]
         except Exception as e:
-            print(f"❌ Ошибка получения дисковой активности: {e}")
+            log.error(f"❌ Ошибка сборки снимка: {e}")
             self.send_response(500)
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
+            return
+        
+        etag_data = {section: data[section] for section in sections}
+        self.send_json(data, etag_data=etag_data, headers={
+            'X-Sample-Timestamp': str(snapshot['timestamp']),
+            'X-Sample-Age': str(sample_age)
+        })
+
+    def serve_history(self):
+        """API для истории метрик
+
+        /api/history?metric=cpu,memory&range=1h&points=300&mode=lttb|minmax
+        Без metric - список доступных метрик.
+        """
+        if 'metric' not in self.query:
+            metrics = set(metric_history.metrics())
+            if metric_archive is not None:
+                metrics.update(metric_archive.metrics())
+            self.send_json({
+                'metrics': sorted(metrics),
+                'interval': HISTORY_INTERVAL,
+                'retention': HISTORY_RETENTION,
+                'archive': metric_archive is not None,
+                'modes': list(DOWNSAMPLERS)
+            })
+            return
+        
+        try:
+            names = [name for name in self.query['metric'][0].split(',') if name]
+            range_seconds = parse_duration(self.query.get('range', ['1h'])[0])
+            points = int(self.query.get('points', [HISTORY_DEFAULT_POINTS])[0])
+            mode = self.query.get('mode', ['lttb'])[0]
+            if not names or not 2 <= points <= HISTORY_MAX_POINTS or mode not in DOWNSAMPLERS:
+                raise ValueError('некорректные параметры')
+        except ValueError as e:
+            self.send_json({'status': 'error', 'message': str(e),
+                            'usage': f'metric=<имя>[,<имя>]&range=1h&points=2..{HISTORY_MAX_POINTS}'
+                                     f'&mode={"|".join(DOWNSAMPLERS)}'}, status=400)
+            return
+        
+        # Память покрывает последние HISTORY_RETENTION секунд и только с запуска сервера.
+        # Если начала диапазона в ней нет, читаем архив - туда пишутся те же точки
+        since = time.time() - range_seconds
+        source = metric_history
+        series = {}
+        for name in names:
+            points_data = None
+            if metric_archive is not None and not metric_history.covers(name, since):
+                points_data = metric_archive.query(name, range_seconds, points, mode)
+                if points_data is not None:
+                    source = metric_archive
+            if points_data is None:
+                points_data = metric_history.query(name, range_seconds, points, mode)
+            if points_data is None:
+                self.send_json({'status': 'error', 'message': f'Неизвестная метрика: {name}'},
+                               status=404)
+                return
+            series[name] = points_data
+        
+        self.send_json({
+            'range': range_seconds,
+            'points': points,
+            'mode': mode,
+            'source': 'archive' if source is metric_archive else 'memory',
+            'series': series
+        })
+
+    def serve_system_info(self):
+        """API для базовой системной информации"""
+        self.serve_snapshot_section('system')
+
+    def serve_system_details(self):
+        """API для детальной системной информации"""
+        self.serve_snapshot_section('details')
+
+    def serve_processes(self):
+        """API для информации о процессах"""
+        try:
+            sort = self.query.get('sort', ['cpu'])[0]
+            limit = int(self.query.get('limit', [PROCESS_DEFAULT_LIMIT])[0])
+            since = self.query.get('since', [None])[0]
+            since = int(since) if since is not None else None
+        except ValueError:
+            sort = None
+        
+        if sort not in ProcessTracker.SORT_KEYS or not 1 <= limit <= PROCESS_MAX_LIMIT:
+            self.send_json({'status': 'error',
+                            'message': f'sort=cpu|memory, limit=1..{PROCESS_MAX_LIMIT}, since=<seq>'},
+                           status=400)
+            return
+        
+        if since is None:
+            # Без since - прежний формат: просто список топ процессов
+            data = process_tracker.top(sort, limit)
+        else:
+            data = process_tracker.diff(since, sort, limit)
+        self.send_json(data, headers={'X-Process-Seq': str(process_tracker.stats()['seq'])})
+
+    def serve_temperatures(self):
+        """API для информации о температурах"""
+        # Ключи объекта - имена датчиков, поэтому метаданные только в заголовках
+        self.serve_snapshot_section('temperatures', embed_meta=False)
+
+    def serve_disk_activity(self):
+        """API для информации о дисковой активности
+
+        ?windows=1,10,60 - окна (секунды) для расчёта скорости дисков
+        """
+        if 'windows' not in self.query:
+            self.serve_snapshot_section('disk')
+            return
+        
+        try:
+            windows = sorted({int(window) for window in self.query['windows'][0].split(',')})
+        except ValueError:
+            windows = []
+        if not windows or windows[0] < 1 or windows[-1] > max(DISK_RATE_WINDOWS):
+            self.send_json({'status': 'error',
+                            'message': f'windows: целые секунды от 1 до {max(DISK_RATE_WINDOWS)}'},
+                           status=400)
+            return
+        
+        self.serve_snapshot_section('disk', transform=lambda disk: dict(
+            disk, rates=metrics_collector.disk_io.rates(windows) if psutil is not None else disk['rates']))
     
     def serve_calendar_config(self):
         """API для конфигурации Google Calendar"""
-        print("📅 Обрабатываю запрос конфигурации календаря...")
+        log.debug("📅 Обрабатываю запрос конфигурации календаря...")
         try:
             # Пытаемся загрузить настройки из файла
             config_file = Path('calendar_config.json')
@@ -513,7 +3994,7 @@ class CyberkittyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             if config_file.exists():
                 with open(config_file, 'r') as f:
                     config = json.load(f)
-                    print(f"✅ Настройки календаря загружены из {config_file}")
+                    log.debug(f"✅ Настройки календаря загружены из {config_file}")
             else:
                 # Создаем файл с примером настроек
                 config = {
@@ -525,8 +4006,8 @@ class CyberkittyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
                 with open(config_file, 'w') as f:
                     json.dump(config, f, indent=2)
                     
-                print(f"📝 Создан файл настроек: {config_file}")
-                print("⚠️  Настройте API ключи для работы с Google Calendar")
+                log.info(f"📝 Создан файл настроек: {config_file}")
+                log.warning("⚠️  Настройте API ключи для работы с Google Calendar")
             
             # Скрываем чувствительные данные если они есть
             response_config = config.copy()
@@ -542,7 +4023,7 @@ class CyberkittyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             self.wfile.write(json.dumps(response_config).encode())
             
         except Exception as e:
-            print(f"❌ Ошибка обработки конфигурации календаря: {e}")
+            log.error(f"❌ Ошибка обработки конфигурации календаря: {e}")
             # Возвращаем пустую конфигурацию чтобы фронт перешел в offline режим
             self.send_response(404)
             self.send_header('Access-Control-Allow-Origin', '*')
@@ -550,238 +4031,180 @@ class CyberkittyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
 
     def serve_docker_containers(self):
         """API для информации о Docker контейнерах (локально и на серверах)"""
-        print("🐳 Обрабатываю запрос Docker контейнеров...")
-        try:
-            containers_data = {
-                'local': self.get_local_docker_containers(),
-                'servers': {
-                    'got_is_tod': self.get_remote_docker_containers('got_is_tod'),
-                    'azure-aluminium': self.get_remote_docker_containers('azure-aluminium')
-                }
-            }
-            
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(containers_data).encode())
-            
-            print(f"🐳 Docker данные отправлены")
-            
-        except Exception as e:
-            print(f"❌ Ошибка получения Docker контейнеров: {e}")
-            self.send_response(500)
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
+        log.debug("🐳 Обрабатываю запрос Docker контейнеров...")
+        transform = with_docker_stats if self.query.get('stats') == ['1'] else None
+        self.serve_cached('/api/docker-containers', collect_docker_containers, transform)
 
     def serve_ssh_connections(self):
         """API для информации о SSH подключениях и статусе серверов"""
-        print("🔐 Обрабатываю запрос SSH подключений...")
+        log.debug("🔐 Обрабатываю запрос SSH подключений...")
+        self.serve_cached('/api/ssh-connections', collect_ssh_connections)
+
+    def serve_stream(self):
+        """SSE поток с обновлениями тем (system, processes, docker, ...)"""
+        requested = self.query.get('topics', [','.join(STREAM_TOPICS)])[0]
+        topics = [topic for topic in requested.split(',') if topic in STREAM_TOPICS]
+        if not topics:
+            self.send_json({'status': 'error', 'message': 'Неизвестные темы'}, status=400)
+            return
+        
+        subscription = stream_broker.subscribe(topics)
+        if subscription is None:
+            log.info("⏳ Достигнут лимит SSE клиентов")
+            self.send_json({'status': 'error', 'message': 'Слишком много подключений'},
+                           status=503, headers={'Retry-After': '5'})
+            return
+        
+        log.info(f"📡 SSE клиент подписан на: {', '.join(topics)}")
         try:
-            ssh_data = {
-                'local': self.get_local_ssh_connections(),     # Исправлено для соответствия клиенту
-                'servers': {                                   # Исправлено для соответствия клиенту
-                    'got_is_tod': self.check_server_status('got_is_tod'),
-                    'azure-aluminium': self.check_server_status('azure-aluminium')
-                }
-            }
-            
             self.send_response(200)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(ssh_data).encode())
-            
-            print(f"🔐 SSH данные отправлены")
-            
-        except Exception as e:
-            print(f"❌ Ошибка получения SSH подключений: {e}")
-            self.send_response(500)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-
-    def get_local_docker_containers(self):
-        """Получение локальных Docker контейнеров"""
-        try:
-            import subprocess
-            result = subprocess.run(['docker', 'ps', '-a', '--format', 'json'], 
-                                  capture_output=True, text=True, timeout=10)
+            self.wfile.write(f'retry: {STREAM_RETRY_MS}\n\n'.encode())
+            self.wfile.flush()
             
-            if result.returncode == 0:
-                containers = []
-                for line in result.stdout.strip().split('\n'):
-                    if line:
-                        container = json.loads(line)
-                        containers.append({
-                            'id': container.get('ID', ''),
-                            'name': container.get('Names', ''),
-                            'image': container.get('Image', ''),
-                            'status': container.get('Status', ''),
-                            'state': container.get('State', ''),
-                            'ports': container.get('Ports', ''),
-                            'created': container.get('CreatedAt', '')
-                        })
-                return containers
-            else:
-                print("⚠️ Docker не установлен или недоступен локально")
-                return []
+            while True:
+                try:
+                    event = subscription.get(timeout=STREAM_HEARTBEAT)
+                except queue.Empty:
+                    # Комментарий-пинг держит соединение и быстро находит отвалившихся клиентов
+                    self.wfile.write(b': ping\n\n')
+                    self.wfile.flush()
+                    continue
                 
-        except Exception as e:
-            print(f"⚠️ Ошибка получения локальных Docker контейнеров: {e}")
-            return []
-
-    def get_remote_docker_containers(self, server_alias):
-        """Получение Docker контейнеров с удаленного сервера"""
-        try:
-            import subprocess
-            cmd = f'ssh {server_alias} "docker ps -a --format json" 2>/dev/null'
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=15)
-            
-            if result.returncode == 0:
-                containers = []
-                for line in result.stdout.strip().split('\n'):
-                    if line:
-                        try:
-                            container = json.loads(line)
-                            containers.append({
-                                'id': container.get('ID', ''),
-                                'name': container.get('Names', ''),
-                                'image': container.get('Image', ''),
-                                'status': container.get('Status', ''),
-                                'state': container.get('State', ''),
-                                'ports': container.get('Ports', ''),
-                                'created': container.get('CreatedAt', ''),
-                                'server': server_alias
-                            })
-                        except json.JSONDecodeError:
-                            continue
-                return containers
-            else:
-                print(f"⚠️ Не удалось подключиться к {server_alias} или Docker недоступен")
-                return []
+                if event is None:
+                    break
+                topic, seq, payload = event
+                self.wfile.write(f'id: {seq}\nevent: {topic}\ndata: {payload}\n\n'.encode())
+                self.wfile.flush()
                 
-        except Exception as e:
-            print(f"⚠️ Ошибка получения Docker контейнеров с {server_alias}: {e}")
-            return []
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            stream_broker.unsubscribe(subscription)
+            log.info("📡 SSE клиент отключён")
+    
+    def serve_cached(self, key, loader, transform=None):
+        """Отдаёт ответ дорогого эндпоинта через кеш stale-while-revalidate
 
-    def get_remote_server_processes(self, server_alias):
-        """Получение процессов с удаленного сервера"""
+        transform дополняет закешированный ответ живыми данными, не меняя кеш.
+        """
         try:
-            import subprocess
-            # Получаем топ процессов с сервера
-            cmd = f'ssh -o ConnectTimeout=5 {server_alias} "ps aux --sort=-%cpu | head -10" 2>/dev/null'
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=10)
+            data, cache_state, age = response_cache.get(key, loader)
+            if transform is not None:
+                data = transform(data)
+            self.send_json(data, etag_data=without_poll_timing(data), headers={
+                'X-Cache': cache_state,
+                'X-Cache-Age': f'{age:.3f}',
+                'Age': str(int(age))
+            })
+            log.debug(f"📦 {key}: {cache_state} (возраст {age:.1f} с)")
             
-            if result.returncode == 0:
-                processes = []
-                lines = result.stdout.strip().split('\n')[1:]  # Пропускаем заголовок
-                for i, line in enumerate(lines[:8]):  # Берем топ 8 процессов
-                    if line.strip():
-                        parts = line.split(None, 10)  # Разбиваем на максимум 11 частей
-                        if len(parts) >= 11:
-                            processes.append({
-                                'protocol': f'{server_alias} Process',
-                                'local_address': f"CPU: {parts[2]}%",
-                                'remote_address': f"{parts[10][:50]}..." if len(parts[10]) > 50 else parts[10],
-                                'status': f"MEM: {parts[3]}%"
-                            })
-                return processes
-            else:
-                return []
-                
         except Exception as e:
-            print(f"⚠️ Ошибка получения процессов с {server_alias}: {e}")
-            return []
+            log.error(f"❌ Ошибка обработки {key}: {e}")
+            self.send_response(500)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
 
-    def get_local_ssh_connections(self):
-        """Получение процессов с удаленных серверов"""
-        ssh_connections = []
-        
-        try:
-            # Получаем процессы с каждого сервера
-            servers = ['got_is_tod', 'azure-aluminium']
-            
-            for server in servers:
-                server_processes = self.get_remote_server_processes(server)
-                ssh_connections.extend(server_processes)
-            
-            return ssh_connections
-            
-        except Exception as e:
-            print(f"⚠️ Ошибка получения процессов серверов: {e}")
-            return []
+    def log_message(self, format, *args):
+        """Сообщения базового обработчика (send_error) - статус уже есть в access-логе"""
+        log.debug(f"🚀 [{self.log_date_time_string()}] {format % args}")
 
-    def check_server_status(self, server_alias):
-        """Проверка статуса удаленного сервера"""
+class ThreadPoolHTTPServer(http.server.HTTPServer):
+    """HTTP сервер, обрабатывающий запросы в ограниченном пуле потоков"""
+    
+    allow_reuse_address = True
+    
+    def __init__(self, server_address, handler_class, max_workers=MAX_WORKERS):
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='http-worker')
+        self.slow_endpoint_slots = threading.BoundedSemaphore(
+            min(SLOW_ENDPOINT_WORKERS, max_workers))
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+    
+    def process_request(self, request, client_address):
+        future = self.executor.submit(self.process_request_worker, request, client_address)
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._forget_future)
+    
+    def process_request_worker(self, request, client_address):
         try:
-            import subprocess
-            import time
-            
-            start_time = time.time()
-            # Простая проверка подключения
-            cmd = f'ssh -o ConnectTimeout=5 -o BatchMode=yes {server_alias} "echo connected" 2>/dev/null'
-            result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=10)
-            
-            ping_time = round((time.time() - start_time) * 1000, 1)  # в миллисекундах
-            
-            if result.returncode == 0 and 'connected' in result.stdout:
-                # Получаем дополнительную информацию о сервере
-                uptime_cmd = f'ssh -o ConnectTimeout=3 {server_alias} "uptime; df -h / | tail -1; free -m | grep Mem" 2>/dev/null'
-                uptime_result = subprocess.run(uptime_cmd, shell=True, capture_output=True, text=True, timeout=8)
-                
-                server_info = {'ping': ping_time}
-                if uptime_result.returncode == 0:
-                    lines = uptime_result.stdout.strip().split('\n')
-                    if len(lines) >= 3:
-                        server_info['uptime'] = lines[0].strip()
-                        server_info['disk'] = lines[1].strip()
-                        server_info['memory'] = lines[2].strip()
-                
-                return {
-                    'status': 'online',
-                    'ping': ping_time,
-                    'info': server_info
-                }
-            else:
-                return {
-                    'status': 'offline',
-                    'ping': None,
-                    'error': 'Connection failed'
-                }
-                
-        except Exception as e:
-            return {
-                'status': 'error',
-                'ping': None,
-                'error': str(e)
-            }
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+    
+    def _forget_future(self, future):
+        with self._pending_lock:
+            self._pending.discard(future)
+    
+    def server_close(self):
+        """Закрывает сокет и даёт активным запросам завершиться"""
+        super().server_close()
+        with self._pending_lock:
+            pending = list(self._pending)
+        if pending:
+            log.info(f"⏳ Ожидаю завершения {len(pending)} активных запросов...")
+            wait_futures(pending, timeout=SHUTDOWN_TIMEOUT)
+        self.executor.shutdown(wait=False)
 
-    def log_message(self, format, *args):
-        """Красивые логи в стиле Cyberkitty"""
-        print(f"🚀 [{self.log_date_time_string()}] {format % args}")
 
 def main():
     """Запуск сервера разработки"""
     
+    log_listener = setup_logging()
+    
     # Проверяем, что мы в правильной директории
     if not Path(PUBLIC_DIR).exists():
-        print("❌ Папка 'public' не найдена!")
-        print("   Убедитесь, что вы запускаете сервер из корня проекта")
+        log.error("❌ Папка 'public' не найдена!")
+        log.error("   Убедитесь, что вы запускаете сервер из корня проекта")
+        log_listener.stop()
         sys.exit(1)
     
+    # Сжимаем статику до первого запроса браузера
+    count, raw, compressed = static_assets.warm()
+    log.info(f"🗜️  Статика: {count} файлов, {raw // 1024} КБ -> {compressed // 1024} КБ"
+          f"{' (сборка styles/bundle.css, js/bundle.js)' if static_assets.bundle else ''}")
+    
+    # Архив открывается до сборщика - первый же снимок попадёт на диск
+    if metric_archive is not None:
+        metric_archive.open()
+    
+    # Запускаем фоновый сбор метрик до приёма первых запросов
+    metrics_collector.start()
+    docker_engine.start()
+    for agent in remote_agents.values():
+        agent.start()
+    host_scheduler.start()
+    stream_broker.start()
+    
     # Создаем сервер
     try:
-        with socketserver.TCPServer((HOST, PORT), CyberkittyHTTPRequestHandler) as httpd:
+        with ThreadPoolHTTPServer((HOST, PORT), CyberkittyHTTPRequestHandler) as httpd:
             server_url = f"http://{HOST}:{PORT}"
             
-            print("\n" + "="*50)
-            print("🚀 CYBERKITTY DASHBOARD SERVER")
-            print("="*50)
-            print(f"📡 Сервер запущен: {server_url}")
-            print(f"📁 Директория: {os.path.abspath(PUBLIC_DIR)}")
-            print("🌐 Открываю браузер...")
-            print("\n💡 Для остановки нажмите Ctrl+C")
-            print("="*50 + "\n")
+            # SIGTERM (stop-dashboard.sh) останавливает сервер так же мягко, как Ctrl+C.
+            # shutdown() блокируется до выхода из serve_forever, поэтому вызываем его в отдельном потоке
+            signal.signal(signal.SIGTERM,
+                          lambda signum, frame: threading.Thread(target=httpd.shutdown).start())
+            
+            log.info("\n" + "="*50)
+            log.info("🚀 CYBERKITTY DASHBOARD SERVER")
+            log.info("="*50)
+            log.info(f"📡 Сервер запущен: {server_url}")
+            log.info(f"📁 Директория: {os.path.abspath(PUBLIC_DIR)}")
+            log.info(f"🧵 Воркеров: {MAX_WORKERS} (медленных эндпоинтов: {SLOW_ENDPOINT_WORKERS})")
+            log.info(f"🌐 Удалённых хостов: {len(REMOTE_HOSTS)} "
+                     f"({HOSTS_FILE if Path(HOSTS_FILE).exists() else 'встроенный список, см. hosts.example.json'})")
+            log.info("🌐 Открываю браузер...")
+            log.info("\n💡 Для остановки нажмите Ctrl+C")
+            log.info("="*50 + "\n")
             
             # Браузер запускается только через лончер по запросу
             # try:
@@ -789,20 +4212,40 @@ def main():
             # except Exception as e:
             #     print(f"⚠️  Не удалось открыть браузер: {e}")
             #     print(f"   Откройте вручную: {server_url}")
-            print(f"   Запустите браузер через лончер: ./launch-transparent.sh")
+            log.info(f"   Запустите браузер через лончер: ./launch-transparent.sh")
             
             # Запускаем сервер
-            httpd.serve_forever()
+            try:
+                httpd.serve_forever()
+            finally:
+                # SSE потоки держат воркеров - закрываем их до ожидания активных запросов
+                stream_broker.stop()
+        
+        log.info("\n\n🛑 Сервер остановлен")
             
     except KeyboardInterrupt:
-        print("\n\n🛑 Сервер остановлен")
+        log.info("\n\n🛑 Сервер остановлен")
     except OSError as e:
         if e.errno == 98:  # Address already in use
-            print(f"❌ Порт {PORT} уже занят!")
-            print(f"   Попробуйте другой порт или завершите процесс на порту {PORT}")
+            log.error(f"❌ Порт {PORT} уже занят!")
+            log.info(f"   Попробуйте другой порт или завершите процесс на порту {PORT}")
         else:
-            print(f"❌ Ошибка запуска сервера: {e}")
+            log.error(f"❌ Ошибка запуска сервера: {e}")
         sys.exit(1)
+    finally:
+        metrics_collector.stop()
+        docker_engine.stop()
+        docker_stats.shutdown()
+        host_scheduler.stop()
+        for agent in remote_agents.values():
+            agent.stop()
+        if metric_archive is not None:
+            metric_archive.close()
+        response_cache.shutdown()
+        remote_queries.shutdown()
+        ssh_pool.close_all()
+        # Дописываем очередь лога до выхода
+        log_listener.stop()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""Тесты DockerEngine на поддельном Docker Engine API поверх unix сокета
+
+Запуск: python3 -m unittest discover tests (или python3 -m pytest tests)
+"""
+
+import json
+import os
+import queue
+import shutil
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.parse
+from http.server import BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+
+
+def container(container_id, name, created):
+    return {
+        'Id': container_id,
+        'Names': [f'/{name}'],
+        'Image': 'nginx:latest',
+        'Status': 'Up 1 second',
+        'State': 'running',
+        'Ports': [{'PrivatePort': 80, 'PublicPort': 8080, 'IP': '0.0.0.0', 'Type': 'tcp'}],
+        'Created': created
+    }
+
+
+class FakeDocker(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Минимальный Docker Engine API: /containers/json и /events"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path):
+        self.containers = {}
+        self.events = queue.Queue()
+        self.full_lists = 0
+        self.lock = threading.Lock()
+        super().__init__(socket_path, FakeDockerHandler)
+
+    def emit(self, action, container_id):
+        self.events.put({'Type': 'container', 'Action': action, 'Actor': {'ID': container_id}})
+
+
+class FakeDockerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        query = {key: values[0] for key, values in urllib.parse.parse_qs(url.query).items()}
+        if url.path == '/containers/json':
+            self.list_containers(query)
+        elif url.path == '/events':
+            self.stream_events(float(query['until']))
+        else:
+            self.send_error(404)
+
+    def list_containers(self, query):
+        ids = json.loads(query.get('filters', '{}')).get('id')
+        with self.server.lock:
+            if ids is None:
+                self.server.full_lists += 1
+            found = [c for c in self.server.containers.values()
+                     if ids is None or any(c['Id'].startswith(prefix) for prefix in ids)]
+        body = json.dumps(found).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def stream_events(self, until):
+        # Как у Docker: поток без длины, закрывается после until
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        while time.time() < until:
+            try:
+                event = self.server.events.get(timeout=0.05)
+            except queue.Empty:
+                continue
+            self.wfile.write(json.dumps(event).encode() + b'\n')
+            self.wfile.flush()
+
+
+class DockerEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        socket_path = os.path.join(self.directory, 'docker.sock')
+        self.docker = FakeDocker(socket_path)
+        self.docker.containers['aaa111'] = container('aaa111', 'web', 100)
+        threading.Thread(target=self.docker.serve_forever, daemon=True).start()
+
+        self.resync_interval = server.DOCKER_RESYNC_INTERVAL
+        server.DOCKER_RESYNC_INTERVAL = 0.5
+        self.engine = server.DockerEngine(socket_path)
+        self.engine.start()
+
+    def tearDown(self):
+        self.engine.stop()
+        self.engine.join(5)
+        server.DOCKER_RESYNC_INTERVAL = self.resync_interval
+        self.docker.shutdown()
+        self.docker.server_close()
+        shutil.rmtree(self.directory)
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.02)
+        return False
+
+    def names(self):
+        return [c['name'] for c in self.engine.containers()]
+
+    def test_initial_sync(self):
+        self.assertTrue(self.wait_for(self.engine.ready))
+        self.assertEqual(self.engine.containers(), [{
+            'id': 'aaa111',
+            'name': 'web',
+            'image': 'nginx:latest',
+            'status': 'Up 1 second',
+            'state': 'running',
+            'ports': '0.0.0.0:8080->80/tcp',
+            'created': '1970-01-01 00:01:40 +0000 UTC'
+        }])
+
+    def test_start_and_destroy_events(self):
+        self.assertTrue(self.wait_for(self.engine.ready))
+
+        with self.docker.lock:
+            self.docker.containers['bbb222'] = container('bbb222', 'db', 200)
+        self.docker.emit('start', 'bbb222')
+        self.assertTrue(self.wait_for(lambda: self.names() == ['db', 'web']))
+
+        with self.docker.lock:
+            del self.docker.containers['aaa111']
+        self.docker.emit('destroy', 'aaa111')
+        self.assertTrue(self.wait_for(lambda: self.names() == ['db']))
+
+    def test_periodic_resync(self):
+        self.assertTrue(self.wait_for(self.engine.ready))
+
+        # Изменение без события подхватывается только пересинхронизацией
+        with self.docker.lock:
+            self.docker.containers['ccc333'] = container('ccc333', 'cache', 300)
+        self.assertTrue(self.wait_for(lambda: self.names() == ['cache', 'web']))
+        self.assertGreaterEqual(self.docker.full_lists, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+"""Тесты прореживания истории метрик (LTTB и min/max)
+
+Запуск: python3 -m unittest discover tests (или python3 -m pytest tests)
+"""
+
+import math
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+
+
+class DownsampleTest(unittest.TestCase):
+    def setUp(self):
+        self.timestamps = [float(index) for index in range(10000)]
+        self.values = [math.sin(index / 50) * 50 + 50 for index in range(10000)]
+
+    def test_output_never_exceeds_points(self):
+        for mode, downsample in server.DOWNSAMPLERS.items():
+            for points in (2, 3, 4, 5, 7, 300, server.HISTORY_MAX_POINTS):
+                with self.subTest(mode=mode, points=points):
+                    sampled = downsample(self.timestamps, self.values, points)
+                    self.assertLessEqual(len(sampled), points)
+                    self.assertGreater(len(sampled), 0)
+
+    def test_lttb_keeps_endpoints(self):
+        for points in (2, 3, 300):
+            with self.subTest(points=points):
+                sampled = server.downsample_lttb(self.timestamps, self.values, points)
+                self.assertEqual(len(sampled), points)
+                self.assertEqual(sampled[0], (0.0, self.values[0]))
+                self.assertEqual(sampled[-1], (9999.0, self.values[-1]))
+
+    def test_short_series_is_returned_as_is(self):
+        for mode, downsample in server.DOWNSAMPLERS.items():
+            with self.subTest(mode=mode):
+                self.assertEqual(downsample(self.timestamps[:5], self.values[:5], 300),
+                                 list(zip(self.timestamps[:5], self.values[:5])))
+
+    def test_minmax_keeps_peaks(self):
+        sampled = server.downsample_minmax(self.timestamps, self.values, 100)
+        values = [value for _, value in sampled]
+        self.assertEqual(max(values), max(self.values))
+        self.assertEqual(min(values), min(self.values))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+"""Тесты истории метрик: кольцевой буфер в памяти и архив на диске
+
+Запуск: python3 -m unittest discover tests (или python3 -m pytest tests)
+"""
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+
+
+class TimeSeriesRingTest(unittest.TestCase):
+    def test_since_before_wrap(self):
+        ring = server.TimeSeriesRing(capacity=5)
+        for index in range(3):
+            ring.append(float(index), index * 10.0)
+        timestamps, values = ring.since(1.0)
+        self.assertEqual(list(timestamps), [1.0, 2.0])
+        self.assertEqual(list(values), [10.0, 20.0])
+
+    def test_wrap_keeps_latest_in_order(self):
+        ring = server.TimeSeriesRing(capacity=5)
+        for index in range(12):
+            ring.append(float(index), index * 10.0)
+        self.assertEqual(ring.count, 5)
+        timestamps, values = ring.since(0.0)
+        self.assertEqual(list(timestamps), [7.0, 8.0, 9.0, 10.0, 11.0])
+        self.assertEqual(list(values), [70.0, 80.0, 90.0, 100.0, 110.0])
+        # Граница внутри перенесённой части кольца
+        self.assertEqual(list(ring.since(9.5)[0]), [10.0, 11.0])
+        self.assertEqual(list(ring.since(100.0)[0]), [])
+
+
+class MetricHistoryTest(unittest.TestCase):
+    def test_covers_only_from_oldest_point(self):
+        history = server.MetricHistory(capacity=100)
+        now = time.time()
+        history.record(now - 60, {'cpu': 10, 'swap': None})
+        history.record(now, {'cpu': 20})
+        self.assertTrue(history.covers('cpu', now - 60))
+        self.assertFalse(history.covers('cpu', now - 3600))
+        self.assertFalse(history.covers('swap', now - 60))
+        self.assertEqual([value for _, value in history.query('cpu', 120)], [10.0, 20.0])
+        self.assertIsNone(history.query('gpu', 120))
+
+    def test_metric_limit(self):
+        history = server.MetricHistory(capacity=10, max_metrics=2)
+        history.record(time.time(), {'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(history.metrics(), ['a', 'b'])
+
+
+class MetricArchiveTest(unittest.TestCase):
+    # Сегмент на 10 записей, в каталоге не больше 3 сегментов
+    SEGMENT_BYTES = server.MetricArchive.HEADER_SIZE + 10 * server.MetricArchive.RECORD.size
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.archive = self.open_archive()
+        self.base = time.time() - 1000
+
+    def tearDown(self):
+        self.archive.close()
+        shutil.rmtree(self.directory)
+
+    def open_archive(self):
+        archive = server.MetricArchive(self.directory, segment_bytes=self.SEGMENT_BYTES, max_segments=3)
+        self.assertTrue(archive.open())
+        return archive
+
+    def fill(self, archive, first, last):
+        for index in range(first, last):
+            archive.append(self.base + index, {'cpu': index, 'memory': index + 0.25})
+
+    def values(self, archive, name='cpu'):
+        return [value for _, value in archive.query(name, 2000, points=1000)]
+
+    def test_record_packing(self):
+        self.archive.append(self.base, {'cpu': 12.5, 'memory': 1 / 3})
+        with open(self.archive.segments()[-1], 'rb') as handle:
+            data = handle.read()
+        magic, version, record_size, count, first, last = server.MetricArchive.HEADER.unpack_from(data, 0)
+        self.assertEqual((magic, version, record_size, count), (b'CKMA', 1, 16, 2))
+        self.assertEqual((first, last), (self.base, self.base))
+
+        records = list(server.MetricArchive.RECORD.iter_unpack(
+            data[server.MetricArchive.HEADER_SIZE:server.MetricArchive.HEADER_SIZE + 32]))
+        self.assertEqual(records[0], (self.base, 0, 12.5))
+        # Значение хранится как float32
+        self.assertEqual(records[1][:2], (self.base, 1))
+        self.assertEqual(records[1][2], struct.unpack('<f', struct.pack('<f', 1 / 3))[0])
+
+    def test_query_across_segments(self):
+        # 12 отметок по 2 метрики - 24 записи, три сегмента
+        self.fill(self.archive, 0, 12)
+        self.assertEqual(len(self.archive.segments()), 3)
+        self.assertEqual(self.values(self.archive), [float(index) for index in range(12)])
+        self.assertEqual(self.values(self.archive, 'memory'), [index + 0.25 for index in range(12)])
+        self.assertIsNone(self.archive.query('gpu', 2000))
+
+        # Диапазон, начинающийся внутри второго сегмента
+        recent = self.archive.query('cpu', time.time() - (self.base + 7.5), points=1000)
+        self.assertEqual([value for _, value in recent], [8.0, 9.0, 10.0, 11.0])
+
+    def test_rotation_drops_oldest_segments(self):
+        self.fill(self.archive, 0, 25)
+        segments = self.archive.segments()
+        self.assertEqual(len(segments), 3)
+        self.assertEqual(segments[-1].name, 'metrics-000005.seg')
+        # 50 записей в сегментах по 10: в трёх последних - отметки 10..24
+        self.assertEqual(self.values(self.archive), [float(index) for index in range(10, 25)])
+
+    def test_reopen_appends_to_last_segment(self):
+        self.fill(self.archive, 0, 3)
+        self.archive.close()
+
+        reopened = self.open_archive()
+        try:
+            self.assertEqual(len(reopened.segments()), 1)
+            self.assertEqual(reopened.metrics(), ['cpu', 'memory'])
+            self.fill(reopened, 3, 6)
+            self.assertEqual(self.values(reopened), [float(index) for index in range(6)])
+            self.assertEqual(len(reopened.segments()), 2)
+        finally:
+            reopened.close()
+
+    def test_damaged_segment_starts_new_one(self):
+        self.fill(self.archive, 0, 2)
+        self.archive.close()
+        with open(self.archive.segments()[-1], 'r+b') as handle:
+            handle.write(b'JUNK')
+
+        reopened = self.open_archive()
+        try:
+            self.assertEqual([path.name for path in reopened.segments()],
+                             ['metrics-000001.seg', 'metrics-000002.seg'])
+            reopened.append(self.base + 5, {'cpu': 5})
+            # Повреждённый сегмент в чтении пропускается
+            self.assertEqual(self.values(reopened), [5.0])
+        finally:
+            reopened.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
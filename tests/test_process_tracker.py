@@ -0,0 +1,121 @@
+"""Тесты ProcessTracker: разбор procfs и изменения топа по ?since=
+
+Запуск: python3 -m unittest discover tests (или python3 -m pytest tests)
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'procfs бэкенд есть только на Linux')
+class ProcessTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.proc_dir = tempfile.mkdtemp()
+        # Память на 1000 страниц: процент памяти процесса - rss_pages / 10
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        self.write('meminfo', f'MemTotal: {page_size * 1000 // 1024} kB\n')
+        self.write('stat', 'cpu  0 0 0 0 0 0 0 0 0 0\n')
+        self.write_process(1, 'systemd', 10)
+        self.write_process(2, 'postgres', 50)
+        self.write_process(3, 'nginx', 30)
+        self.write_process(4, 'kworker/0:1', 5, state='I')
+        self.tracker = server.ProcessTracker(backend='procfs', proc_dir=self.proc_dir)
+        self.tracker.sample()
+        self.tracker.sample()
+
+    def tearDown(self):
+        shutil.rmtree(self.proc_dir)
+
+    def write(self, name, text):
+        with open(os.path.join(self.proc_dir, name), 'w') as f:
+            f.write(text)
+
+    def write_process(self, pid, name, rss_pages, state='S'):
+        os.makedirs(os.path.join(self.proc_dir, str(pid)), exist_ok=True)
+        # Время CPU не растёт - проценты CPU остаются нулевыми и не мешают сравнению
+        fields = [state, '1', str(pid), str(pid), '0', '-1', '4194560', '0', '0', '0', '0',
+                  '100', '50', '0', '0', '20', '0', '1', '0', str(1000 + pid), '0', str(rss_pages)]
+        self.write(f'{pid}/stat', f'{pid} ({name}) ' + ' '.join(fields + ['0'] * 30) + '\n')
+        self.write(f'{pid}/statm', f'{rss_pages * 4} {rss_pages} 0 0 0 {rss_pages} 0\n')
+
+    def remove_process(self, pid):
+        shutil.rmtree(os.path.join(self.proc_dir, str(pid)))
+
+    def test_procfs_rows(self):
+        self.assertEqual(self.tracker.backend, 'procfs')
+        self.write_process(5, 'tmux: server (1) )', 20, state='D')
+        self.tracker.sample()
+        self.assertEqual(self.tracker.top('memory', 10), [
+            {'pid': 2, 'name': 'postgres', 'cpu': 0.0, 'memory': 5.0, 'status': 'sleeping'},
+            {'pid': 3, 'name': 'nginx', 'cpu': 0.0, 'memory': 3.0, 'status': 'sleeping'},
+            {'pid': 5, 'name': 'tmux: server (1) )', 'cpu': 0.0, 'memory': 2.0, 'status': 'disk-sleep'},
+            {'pid': 1, 'name': 'systemd', 'cpu': 0.0, 'memory': 1.0, 'status': 'sleeping'},
+            {'pid': 4, 'name': 'kworker/0:1', 'cpu': 0.0, 'memory': 0.5, 'status': 'idle'}
+        ])
+
+    def test_unknown_since_returns_full_list(self):
+        result = self.tracker.diff(12345, 'memory', 3)
+        self.assertTrue(result['full'])
+        self.assertEqual((result['seq'], result['total'], result['sort'], result['limit']), (2, 4, 'memory', 3))
+        self.assertEqual(result['order'], [2, 3, 1])
+        self.assertEqual([row['pid'] for row in result['processes']], [2, 3, 1])
+        self.assertNotIn('added', result)
+
+    def test_diff_since_known_seq(self):
+        seq = self.tracker.diff(0, 'memory', 3)['seq']
+
+        self.remove_process(1)
+        self.write_process(3, 'nginx', 60)
+        self.write_process(6, 'java', 40)
+        self.write_process(4, 'kworker/0:1', 6, state='I')
+        self.tracker.sample()
+
+        result = self.tracker.diff(seq, 'memory', 3)
+        self.assertFalse(result['full'])
+        self.assertEqual(result['seq'], seq + 1)
+        self.assertEqual(result['order'], [3, 2, 6])
+        self.assertEqual(result['added'], [{'pid': 6, 'name': 'java', 'cpu': 0.0, 'memory': 4.0, 'status': 'sleeping'}])
+        self.assertEqual(result['changed'], [{'pid': 3, 'name': 'nginx', 'cpu': 0.0, 'memory': 6.0, 'status': 'sleeping'}])
+        # Пропавший процесс и изменения за пределами топа не попадают в ответ
+        self.assertEqual(result['removed'], [1])
+        self.assertNotIn('processes', result)
+
+    def test_diff_since_current_seq_is_empty(self):
+        seq = self.tracker.diff(0, 'cpu', 10)['seq']
+        result = self.tracker.diff(seq, 'cpu', 10)
+        self.assertEqual((result['full'], result['added'], result['changed'], result['removed']),
+                         (False, [], [], []))
+        # При равном CPU порядок по памяти
+        self.assertEqual(result['order'], [2, 3, 1, 4])
+
+    def test_views_are_kept_per_sort_and_limit(self):
+        seq = self.tracker.diff(0, 'memory', 3)['seq']
+        self.tracker.sample()
+        self.assertTrue(self.tracker.diff(seq, 'memory', 2)['full'])
+        self.assertTrue(self.tracker.diff(seq, 'cpu', 3)['full'])
+        self.assertFalse(self.tracker.diff(seq, 'memory', 3)['full'])
+
+    def test_forgotten_since_returns_full_list(self):
+        with mock.patch.object(server, 'PROCESS_VIEW_HISTORY', 2):
+            tracker = server.ProcessTracker(backend='procfs', proc_dir=self.proc_dir)
+            tracker.sample()
+            tracker.sample()
+            first = tracker.diff(0, 'memory', 3)['seq']
+            for _ in range(2):
+                tracker.sample()
+                tracker.diff(0, 'memory', 3)
+        result = tracker.diff(first, 'memory', 3)
+        self.assertTrue(result['full'])
+        self.assertEqual(result['seq'], first + 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,188 @@
+"""Тесты кеша дорогих эндпоинтов и ETag/304 у JSON ответов
+
+Запуск: python3 -m unittest discover tests (или python3 -m pytest tests)
+"""
+
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+
+
+class CountingLoader:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+            calls = self.calls
+        time.sleep(self.delay)
+        return {'version': calls}
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = server.ResponseCache({'hosts': (0.1, 0.3)})
+
+    def tearDown(self):
+        self.cache.shutdown()
+
+    def wait_for(self, condition, timeout=2):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if condition():
+                return True
+            time.sleep(0.01)
+        return False
+
+    def test_miss_then_hit(self):
+        loader = CountingLoader()
+        self.assertEqual(self.cache.get('hosts', loader)[:2], ({'version': 1}, 'MISS'))
+        self.assertEqual(self.cache.get('hosts', loader)[:2], ({'version': 1}, 'HIT'))
+        self.assertEqual(loader.calls, 1)
+
+    def test_stale_value_is_served_while_refreshing(self):
+        loader = CountingLoader(delay=0.05)
+        self.cache.get('hosts', loader)
+        time.sleep(0.12)
+
+        # Устаревшее значение отдаётся сразу, обновление одно на все запросы
+        self.assertEqual(self.cache.get('hosts', loader)[:2], ({'version': 1}, 'STALE'))
+        self.assertEqual(self.cache.get('hosts', loader)[:2], ({'version': 1}, 'STALE'))
+        self.assertTrue(self.wait_for(lambda: self.cache.get('hosts', loader)[1] == 'HIT'))
+        self.assertEqual(self.cache.get('hosts', loader)[0], {'version': 2})
+        self.assertEqual(loader.calls, 2)
+
+    def test_expired_value_is_reloaded(self):
+        loader = CountingLoader()
+        self.cache.get('hosts', loader)
+        time.sleep(0.45)
+        self.assertEqual(self.cache.get('hosts', loader)[:2], ({'version': 2}, 'MISS'))
+
+    def test_concurrent_misses_share_one_load(self):
+        loader = CountingLoader(delay=0.1)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get('hosts', loader)[0]))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [{'version': 1}] * 5)
+        self.assertEqual(loader.calls, 1)
+
+    def test_failed_load_raises_and_is_retried(self):
+        def broken():
+            raise OSError('ssh недоступен')
+
+        with self.assertRaises(OSError):
+            self.cache.get('hosts', broken)
+        self.assertEqual(self.cache.get('hosts', CountingLoader())[:2], ({'version': 1}, 'MISS'))
+
+
+class WithoutPollTimingTest(unittest.TestCase):
+    def test_strips_only_poll_timing(self):
+        data = {'servers': {'box': []},
+                'query_status': {'box': {'status': 'ok', 'updated': 1.0, 'failures': 0, 'next_poll': 4.5}}}
+        self.assertEqual(server.without_poll_timing(data), {
+            'servers': {'box': []},
+            'query_status': {'box': {'status': 'ok', 'failures': 0}}
+        })
+        # Исходный ответ не меняется
+        self.assertEqual(data['query_status']['box']['updated'], 1.0)
+
+    def test_none_without_query_status(self):
+        self.assertIsNone(server.without_poll_timing({'servers': {}}))
+        self.assertIsNone(server.without_poll_timing([1, 2]))
+
+
+class JsonETagTest(unittest.TestCase):
+    """ETag и 304 на /api/ssh-connections с подменённым сбором данных"""
+
+    def setUp(self):
+        self.data = {'servers': {'box': ['web']}}
+        patches = [
+            # Без свежего запаса - каждый запрос загружает данные заново
+            mock.patch.object(server, 'response_cache', server.ResponseCache({'/api/ssh-connections': (0.0, 0.0)})),
+            mock.patch.object(server, 'collect_ssh_connections', lambda: json.loads(json.dumps(self.data)))
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.httpd = server.ThreadPoolHTTPServer(('127.0.0.1', 0), server.CyberkittyHTTPRequestHandler,
+                                                 max_workers=4)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def request(self, etag=None):
+        connection = http.client.HTTPConnection('127.0.0.1', self.httpd.server_address[1], timeout=5)
+        try:
+            connection.request('GET', '/api/ssh-connections', headers={'If-None-Match': etag} if etag else {})
+            response = connection.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        finally:
+            connection.close()
+
+    def set_timing(self, updated, next_poll):
+        self.data['query_status'] = {'box': {'status': 'ok', 'updated': updated, 'failures': 0,
+                                             'next_poll': next_poll}}
+
+    def test_strong_etag_and_304(self):
+        status, headers, body = self.request()
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body), self.data)
+        self.assertRegex(headers['ETag'], r'^"[0-9a-f]{16}"$')
+        self.assertEqual(headers['Cache-Control'], 'no-cache')
+
+        status, headers_304, body = self.request(headers['ETag'])
+        self.assertEqual((status, body), (304, b''))
+        self.assertEqual(headers_304['ETag'], headers['ETag'])
+        self.assertNotIn('Content-Type', headers_304)
+
+    def test_changed_body_gets_new_etag(self):
+        etag = self.request()[1]['ETag']
+        self.data['servers']['box'].append('db')
+        status, headers, _ = self.request(etag)
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers['ETag'], etag)
+
+    def test_weak_etag_ignores_poll_timing(self):
+        self.set_timing(100.0, 5.0)
+        status, headers, _ = self.request()
+        self.assertEqual(status, 200)
+        self.assertTrue(headers['ETag'].startswith('W/"'))
+
+        # Только время опроса изменилось - 304
+        self.set_timing(105.0, 4.5)
+        self.assertEqual(self.request(headers['ETag'])[0], 304)
+
+        # Изменились сами данные хоста - 200 с новым ETag
+        self.data['query_status']['box']['failures'] = 1
+        status, changed, _ = self.request(headers['ETag'])
+        self.assertEqual(status, 200)
+        self.assertNotEqual(changed['ETag'], headers['ETag'])
+
+    def test_if_none_match_list_and_weak_comparison(self):
+        etag = self.request()[1]['ETag']
+        self.assertEqual(self.request(f'"0000000000000000", W/{etag}')[0], 304)
+        self.assertEqual(self.request('*')[0], 304)
+        self.assertEqual(self.request('"0000000000000000"')[0], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
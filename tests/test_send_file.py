@@ -0,0 +1,115 @@
+"""Тесты отдачи файлов: Range, If-Range и 304 на /api/wallpaper
+
+Запуск: python3 -m unittest discover tests (или python3 -m pytest tests)
+"""
+
+import http.client
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+
+CONTENT = bytes(range(100))
+
+
+class SendFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        wallpaper = os.path.join(self.directory, 'wallpaper.png')
+        with open(wallpaper, 'wb') as f:
+            f.write(CONTENT)
+        config = os.path.join(self.directory, 'bg-saved.cfg')
+        with open(config, 'w') as f:
+            f.write(f'[xin_-1]\nfile={wallpaper}\nmode=5\n')
+
+        source = server.WallpaperSource(config_path=config, cache_dir=os.path.join(self.directory, 'cache'))
+        patch = mock.patch.object(server, 'wallpaper_source', source)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        self.httpd = server.ThreadPoolHTTPServer(('127.0.0.1', 0), server.CyberkittyHTTPRequestHandler,
+                                                 max_workers=4)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        shutil.rmtree(self.directory)
+
+    def request(self, headers=None, method='GET'):
+        connection = http.client.HTTPConnection('127.0.0.1', self.httpd.server_address[1], timeout=5)
+        try:
+            connection.request(method, '/api/wallpaper', headers=headers or {})
+            response = connection.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        finally:
+            connection.close()
+
+    def get_range(self, value, **headers):
+        return self.request(dict(headers, Range=value))
+
+    def test_whole_file(self):
+        status, headers, body = self.request()
+        self.assertEqual((status, body), (200, CONTENT))
+        self.assertEqual(headers['Accept-Ranges'], 'bytes')
+        self.assertEqual(headers['Content-Type'], 'image/png')
+        self.assertNotIn('Content-Range', headers)
+
+    def test_byte_ranges(self):
+        cases = {
+            'bytes=10-19': (10, 19),
+            'bytes=90-': (90, 99),
+            'bytes=95-500': (95, 99),
+            'bytes=-5': (95, 99),
+            'bytes=-500': (0, 99),
+            'bytes=0-0': (0, 0)
+        }
+        for value, (first, last) in cases.items():
+            with self.subTest(range=value):
+                status, headers, body = self.get_range(value)
+                self.assertEqual(status, 206)
+                self.assertEqual(body, CONTENT[first:last + 1])
+                self.assertEqual(headers['Content-Range'], f'bytes {first}-{last}/100')
+                self.assertEqual(headers['Content-Length'], str(last - first + 1))
+
+    def test_unsatisfiable_range(self):
+        for value in ('bytes=100-', 'bytes=150-200', 'bytes=20-10', 'bytes=-0'):
+            with self.subTest(range=value):
+                status, headers, body = self.get_range(value)
+                self.assertEqual((status, body), (416, b''))
+                self.assertEqual(headers['Content-Range'], 'bytes */100')
+
+    def test_unsupported_range_gives_whole_file(self):
+        for value in ('bytes=0-1,5-6', 'items=0-5', 'bytes=a-b'):
+            with self.subTest(range=value):
+                self.assertEqual(self.get_range(value)[::2], (200, CONTENT))
+
+    def test_if_range(self):
+        headers = self.request()[1]
+        self.assertEqual(self.get_range('bytes=0-9', **{'If-Range': headers['ETag']})[::2], (206, CONTENT[:10]))
+        self.assertEqual(self.get_range('bytes=0-9', **{'If-Range': headers['Last-Modified']})[0], 206)
+        # Старый валидатор - файл изменился, отдаём целиком
+        self.assertEqual(self.get_range('bytes=0-9', **{'If-Range': '"0-0"'})[::2], (200, CONTENT))
+
+    def test_not_modified(self):
+        headers = self.request()[1]
+        status, not_modified, body = self.request({'If-None-Match': headers['ETag'], 'Range': 'bytes=0-9'})
+        self.assertEqual((status, body), (304, b''))
+        self.assertEqual(not_modified['ETag'], headers['ETag'])
+        self.assertEqual(self.request({'If-Modified-Since': headers['Last-Modified']})[0], 304)
+
+    def test_head_has_no_body(self):
+        status, headers, body = self.request(method='HEAD')
+        self.assertEqual((status, body), (200, b''))
+        self.assertEqual(headers['Content-Length'], '100')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""Тесты рассылки SSE тем в StreamBroker
+
+Запуск: python3 -m unittest discover tests (или python3 -m pytest tests)
+"""
+
+import json
+import os
+import queue
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+
+
+def hosts(updated, next_poll, containers):
+    return {
+        'servers': {'box': containers},
+        'query_status': {'box': {'status': 'ok', 'updated': updated, 'failures': 0, 'next_poll': next_poll}}
+    }
+
+
+class StreamBrokerTest(unittest.TestCase):
+    def setUp(self):
+        self.broker = server.StreamBroker({})
+        self.subscription = self.broker.subscribe(['docker', 'system'])
+
+    def events(self):
+        events = []
+        while True:
+            try:
+                events.append(self.subscription.get_nowait())
+            except queue.Empty:
+                return events
+
+    def test_poll_timing_alone_is_not_published(self):
+        self.broker.publish('docker', hosts(100.0, 5.0, ['web']))
+        self.broker.publish('docker', hosts(105.0, 4.5, ['web']))
+        self.assertEqual(len(self.events()), 1)
+
+        self.broker.publish('docker', hosts(110.0, 5.0, ['web', 'db']))
+        events = self.events()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(json.loads(events[0][2])['servers']['box'], ['web', 'db'])
+
+    def test_unchanged_topic_is_not_published(self):
+        self.broker.publish('system', {'cpu': 10})
+        self.broker.publish('system', {'cpu': 10})
+        self.broker.publish('system', {'cpu': 11})
+        self.assertEqual([json.loads(payload)['cpu'] for _, _, payload in self.events()], [10, 11])
+
+    def test_new_subscriber_gets_latest_payload(self):
+        self.broker.publish('docker', hosts(100.0, 5.0, ['web']))
+        self.broker.publish('docker', hosts(105.0, 4.5, ['web']))
+        late = self.broker.subscribe(['docker'])
+        topic, _, payload = late.get_nowait()
+        self.assertEqual(topic, 'docker')
+        self.assertEqual(json.loads(payload)['query_status']['box']['updated'], 105.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
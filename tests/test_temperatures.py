@@ -0,0 +1,70 @@
+"""Тесты чтения температур из sysfs (SysfsTemperatureReader)
+
+Запуск: python3 -m unittest discover tests (или python3 -m pytest tests)
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import server  # noqa: E402
+
+
+class SysfsTemperatureReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.class_dir = tempfile.mkdtemp()
+        self.device = os.path.join(self.class_dir, 'hwmon', 'hwmon0')
+        os.makedirs(self.device)
+        self.write('name', 'coretemp')
+        self.write('temp1_label', 'Package id 0')
+        self.write('temp1_input', '45000')
+        self.write('temp1_crit', '100000')
+        self.reader = server.SysfsTemperatureReader(self.class_dir)
+
+    def tearDown(self):
+        self.reader._close()
+        shutil.rmtree(self.class_dir)
+
+    def write(self, name, value):
+        with open(os.path.join(self.device, name), 'w') as f:
+            f.write(value + '\n')
+
+    def test_reads_labelled_sensor(self):
+        self.assertEqual(self.reader.read(), {
+            'coretemp_Package id 0': {'current': 45.0, 'high': None, 'critical': 100.0}
+        })
+
+    def test_no_sensors(self):
+        shutil.rmtree(os.path.join(self.class_dir, 'hwmon'))
+        self.assertIsNone(self.reader.read())
+
+    def test_read_error_forces_rescan(self):
+        self.reader.read()
+        # Узел hwmon на месте, но открытый файл датчика больше не читается
+        os.close(self.reader._sensors[0][1])
+        self.write('temp1_input', '52000')
+
+        self.assertEqual(self.reader.read(), {})
+        self.assertEqual(self.reader.read()['coretemp_Package id 0']['current'], 52.0)
+
+
+class FallbackSnapshotTest(unittest.TestCase):
+    def test_sysfs_temperatures_without_psutil(self):
+        collector = server.MetricsCollector()
+        sensors = {'acpitz': {'current': 38.0, 'high': None, 'critical': 95.0}}
+        with mock.patch.object(server, 'psutil', None), \
+                mock.patch.object(collector.temperature_sensors, 'read', return_value=sensors), \
+                mock.patch.object(server, 'record_metrics'):
+            collector.collect()
+        snapshot = collector.snapshot(timeout=0)
+        self.assertEqual(snapshot['temperatures'], sensors)
+        self.assertEqual(snapshot['system'], server.FALLBACK_SNAPSHOT['system'])
+
+
+if __name__ == '__main__':
+    unittest.main()